@@ -0,0 +1,124 @@
+import logging
+from time import time
+
+DEFAULT_MIN_INTERVAL = 0.5
+DEFAULT_MAX_INTERVAL = 30.0
+DEFAULT_INITIAL_INTERVAL = 2.0
+
+# Expected new listings per poll the interval is tuned for: polling about twice per
+# inter-arrival time keeps the polling part of the detection lag under half of it
+ARRIVALS_PER_POLL = 0.5
+
+# Weight of the latest cycle in the arrival-rate average
+SMOOTHING = 0.3
+
+
+# Poll interval that follows the listing arrival rate.
+# The rate is an exponentially weighted average of new tokens per second; the interval
+# shrinks during bursts and grows back towards max_interval while the list is quiet.
+class AdaptiveInterval:
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 initial_interval=DEFAULT_INITIAL_INTERVAL, smoothing=SMOOTHING):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.interval = min(max(initial_interval, min_interval), max_interval)
+        self.rate = ARRIVALS_PER_POLL / self.interval  # New tokens per second
+        self.last_update = None
+
+    # Record how many new tokens the last poll found and return the next interval.
+    # `saturated` means every visible row was new, so listings may have been missed.
+    def update(self, new_count, saturated=False):
+        now = time()
+        elapsed = now - self.last_update if self.last_update is not None else self.interval
+        self.last_update = now
+        self.rate = self.smoothing * (new_count / max(elapsed, 1e-3)) + (1 - self.smoothing) * self.rate
+
+        if saturated:
+            self.interval = self.min_interval
+        elif self.rate > 0:
+            self.interval = min(max(ARRIVALS_PER_POLL / self.rate, self.min_interval), self.max_interval)
+        else:
+            self.interval = self.max_interval
+        return self.interval
+
+
+# Same interface with a constant interval (legacy behaviour)
+class FixedInterval:
+    def __init__(self, interval=DEFAULT_INITIAL_INTERVAL):
+        self.interval = interval
+        self.rate = 0.0
+
+    def update(self, new_count, saturated=False):
+        return self.interval
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# Per-cycle cost and detection-lag metrics of the monitor loop, logged every `summary_every` cycles
+class MonitorMetrics:
+    def __init__(self, summary_every=30):
+        self.summary_every = summary_every
+        self.reset()
+
+    def reset(self):
+        self.cycles = 0
+        self.cycle_times = []
+        self.snapshot_times = []
+        self.parse_times = []
+        self.rows_parsed = 0
+        self.rows_skipped = 0
+        self.detections = 0
+        self.detection_lags = []
+        self.saturated_cycles = 0
+
+    def record_cycle(self, cycle_time, snapshot_time, parse_time, rows_parsed, rows_skipped, saturated=False):
+        self.cycles += 1
+        self.cycle_times.append(cycle_time)
+        self.snapshot_times.append(snapshot_time)
+        self.parse_times.append(parse_time)
+        self.rows_parsed += rows_parsed
+        self.rows_skipped += rows_skipped
+        self.saturated_cycles += saturated
+
+    # Lag between a listing's estimated creation and its detection, in seconds
+    def record_detection(self, lag):
+        self.detections += 1
+        if lag is not None:
+            self.detection_lags.append(lag)
+
+    def summary(self):
+        cycles = self.cycles or 1
+        return {
+            'cycles': self.cycles,
+            'cycle_ms': sum(self.cycle_times) / cycles * 1000,
+            'snapshot_ms': sum(self.snapshot_times) / cycles * 1000,
+            'parse_ms': sum(self.parse_times) / cycles * 1000,
+            'rows_parsed': self.rows_parsed,
+            'rows_skipped': self.rows_skipped,
+            'detections': self.detections,
+            'lag_p50_s': percentile(self.detection_lags, 0.5),
+            'lag_p95_s': percentile(self.detection_lags, 0.95),
+            'saturated_cycles': self.saturated_cycles,
+        }
+
+    # Log and restart the aggregation once enough cycles have been recorded
+    def maybe_log(self, poll_interval):
+        if self.cycles < self.summary_every:
+            return
+        s = self.summary()
+        logging.info(
+            f"Monitor: {s['cycles']} cycles, {s['cycle_ms']:.0f} ms/cycle "
+            f"(snapshot {s['snapshot_ms']:.0f} ms, parse {s['parse_ms']:.2f} ms), "
+            f"rows parsed {s['rows_parsed']} / skipped {s['rows_skipped']}, "
+            f"{s['detections']} detections, lag p50 {s['lag_p50_s']:.0f}s p95 {s['lag_p95_s']:.0f}s, "
+            f"arrival rate {poll_interval.rate * 60:.2f}/min, interval {poll_interval.interval:.1f}s"
+        )
+        if s['saturated_cycles']:
+            logging.warning(f"{s['saturated_cycles']} cycles found only new rows; listings may have been missed")
+        self.reset()
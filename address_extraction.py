@@ -0,0 +1,134 @@
+import logging
+import re
+
+import requests
+
+import dexscreener_api
+from chain_registry import default_registry
+
+# Full on-chain addresses as shown by the app (EVM/Sui hex, Solana/Tron base58, TON base64url)
+FULL_ADDRESS_PATTERN = re.compile(
+    r'\b(0x[0-9a-fA-F]{40,64}|[1-9A-HJ-NP-Za-km-z]{32,44}|[EU]Q[0-9A-Za-z_-]{46})\b'
+)
+
+# Truncated addresses such as "0x12ab...cd34" or "7xKX…8kAs"
+TRUNCATED_ADDRESS_PATTERN = re.compile(
+    r'\b(0x[0-9a-fA-F]{2,10}|[0-9A-Za-z]{3,10})(?:\.{2,3}|…)([0-9A-Za-z]{3,10})\b'
+)
+
+# Number of nodes after a label ("Pair", token name) that belong to its address row
+LABEL_WINDOW = 6
+
+# Labels recorded in "Hash Source" for each extraction path
+SOURCE_SNAPSHOT = 'snapshot'
+SOURCE_SEARCH_API = 'search-api'
+SOURCE_CLIPBOARD = 'clipboard'
+
+
+# Address hint read next to a label: the full address if exposed, else its truncated prefix/suffix
+class AddressHint:
+    __slots__ = ('full', 'prefix', 'suffix')
+
+    def __init__(self, full=None, prefix=None, suffix=None):
+        self.full = full
+        self.prefix = prefix
+        self.suffix = suffix
+
+    # Whether the hint carries enough of an address to confirm a candidate
+    def informative(self):
+        return bool(self.full) or self.prefix is not None
+
+    def matches(self, address):
+        if not address:
+            return False
+        if self.full:
+            return address.lower() == self.full.lower()
+        if self.prefix is None:
+            return True
+        return address.lower().startswith(self.prefix.lower()) and address.lower().endswith(self.suffix.lower())
+
+    def __repr__(self):
+        return f"AddressHint(full={self.full!r}, prefix={self.prefix!r}, suffix={self.suffix!r})"
+
+
+# Look for an address in the few nodes that follow a TextView label
+def address_hint_after_label(nodes, label):
+    for position, node in enumerate(nodes):
+        if node.class_name == 'android.widget.TextView' and node.text == label:
+            break
+    else:
+        return None
+
+    truncated = None
+    for node in nodes[position + 1:position + 1 + LABEL_WINDOW]:
+        matched = False
+        for value in (node.content_desc, node.text):
+            if not value:
+                continue
+            full_match = FULL_ADDRESS_PATTERN.search(value)
+            if full_match:
+                return AddressHint(full=full_match.group(1))
+            truncated_match = TRUNCATED_ADDRESS_PATTERN.search(value)
+            if truncated_match:
+                matched = True
+                if truncated is None:
+                    truncated = AddressHint(prefix=truncated_match.group(1), suffix=truncated_match.group(2))
+        # Another text label starts the next row
+        if node.class_name == 'android.widget.TextView' and node.text and not matched:
+            break
+    return truncated
+
+
+# Pair and token address hints from a detail-page snapshot
+def address_hints_from_snapshot(nodes, token_name):
+    return address_hint_after_label(nodes, "Pair"), address_hint_after_label(nodes, token_name)
+
+
+# Resolve full pair/token addresses through the DexScreener search API.
+# Candidates are restricted to the chain and symbol, then to the truncated hints. Symbols are
+# routinely reused by copycat tokens, so at least one hint must confirm the candidate; without
+# any the lookup is not attempted. Returns (pair_address, token_address) or None.
+def lookup_addresses_via_search(token_name, chain_id, pair_hint=None, token_hint=None):
+    if not any(hint is not None and hint.informative() for hint in (pair_hint, token_hint)):
+        logging.info(f"No address hint for '{token_name}', not resolving it by symbol alone")
+        return None
+    try:
+        data = dexscreener_api.api_get('/latest/dex/search', params={'q': token_name})
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Search API lookup failed for '{token_name}': {e}")
+        return None
+
+    default_registry().learn_chain_ids(pair.get('chainId') for pair in data.get('pairs') or [])
+    candidates = [
+        pair for pair in data.get('pairs') or []
+        if pair.get('chainId') == chain_id
+        and (pair.get('baseToken') or {}).get('symbol', '').upper() == token_name.upper()
+    ]
+    if pair_hint is not None:
+        candidates = [pair for pair in candidates if pair_hint.matches(pair.get('pairAddress'))]
+    if token_hint is not None:
+        candidates = [pair for pair in candidates if token_hint.matches((pair.get('baseToken') or {}).get('address'))]
+    if not candidates:
+        logging.warning(f"Search API returned no pair matching '{token_name}' on '{chain_id}'")
+        return None
+    if len(candidates) > 1:
+        logging.info(f"{len(candidates)} search candidates for '{token_name}' match the hints, keeping the most recent pair")
+
+    pair = max(candidates, key=lambda candidate: candidate.get('pairCreatedAt') or 0)
+    return pair.get('pairAddress'), (pair.get('baseToken') or {}).get('address')
+
+
+# Chain ID of a pair from its full address, for pages whose chain label is not known yet
+def lookup_chain_via_search(pair_address):
+    try:
+        data = dexscreener_api.api_get('/latest/dex/search', params={'q': pair_address})
+    except requests.exceptions.RequestException as e:
+        logging.warning(f"Search API lookup failed for pair '{pair_address}': {e}")
+        return None
+    pairs = data.get('pairs') or []
+    default_registry().learn_chain_ids(pair.get('chainId') for pair in pairs)
+    for pair in pairs:
+        if (pair.get('pairAddress') or '').lower() == pair_address.lower():
+            return pair.get('chainId')
+    logging.warning(f"Search API returned no pair with address '{pair_address}'")
+    return None
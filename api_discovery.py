@@ -0,0 +1,365 @@
+import argparse
+import logging
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from time import perf_counter, sleep, time
+
+import requests
+
+import dexscreener_api
+from adaptive_polling import percentile
+from dedupe_index import DedupeIndex
+from token_identity import DATE_FORMAT, creation_time, observed_at, pair_identity, token_identities
+from token_store import DEFAULT_DB_PATH, open_token_store
+
+# Listing feeds polled for new tokens: source name -> API path
+SOURCES = {
+    'profiles': '/token-profiles/latest/v1',
+    'boosts': '/token-boosts/latest/v1',
+}
+
+# Published DexScreener quota shared by the token profile and boost endpoints
+FEED_REQUESTS_PER_MINUTE = 60
+
+# Maximum number of token addresses accepted per call on /tokens/v1
+MAX_TOKENS_PER_REQUEST = 30
+
+DEFAULT_INTERVAL = 5.0
+DEFAULT_MAX_PAIR_AGE = 86_400  # Seconds; tokens whose pair is older are not new listings
+MAX_RESOLVE_ATTEMPTS = 5  # Polls during which a feed entry without any indexed pair is retried
+MAX_CREATION_TIMES = 20_000  # Pair creation times kept to measure the lag of later sightings
+
+# Seconds of detections loaded back from the store at startup
+SEEN_WINDOW = 86_400
+
+# "Source" of the rows read from the app's Newest list, which do not record one
+DEVICE_SOURCE = 'device'
+
+# "Hash Source" of the records built from API pairs
+SOURCE_TOKENS_API = 'tokens-api'
+
+
+# Age as displayed in the token list: 45 -> "45s", 200 -> "3m"
+def format_age(seconds):
+    seconds = max(0, int(seconds))
+    for unit, size in (('d', 86_400), ('h', 3_600), ('m', 60)):
+        if seconds >= size:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+# Amount as displayed in the token list: 12345 -> "$12.3K"
+def format_usd(value):
+    for suffix, size in (('B', 1e9), ('M', 1e6), ('K', 1e3)):
+        if value >= size:
+            return f"${value / size:.1f}{suffix}"
+    return f"${value:,.0f}"
+
+
+# Token record in the layout of a parsed Newest-list row, built from an API pair.
+# The chain and addresses a drill-down would read are filled in as well.
+def token_record(pair, source, detected_at):
+    base_token = pair.get('baseToken') or {}
+    created = (pair.get('pairCreatedAt') or 0) / 1000 or None
+    change = (pair.get('priceChange') or {}).get('h24')
+    price_text = pair.get('priceUsd') or ''
+    liquidity = float((pair.get('liquidity') or {}).get('usd') or 0.0)
+    volume = float((pair.get('volume') or {}).get('h24') or 0.0)
+    market_cap = float(pair.get('marketCap') or pair.get('fdv') or 0.0)
+    return {
+        "Token Name": base_token.get('symbol'),
+        "Time": format_age(detected_at - created) if created else '',
+        "Price": f"${price_text}" if price_text else '',
+        "Additional Value": '',
+        "Change Indicator": '' if change is None else ('▼' if change < 0 else '▲'),
+        "Change": '' if change is None else f"{abs(change):g}%",
+        "Project Name": base_token.get('name'),
+        "Liquidity": format_usd(liquidity),
+        "Volume": format_usd(volume),
+        "Market Cap": format_usd(market_cap),
+        "Price USD": float(price_text) if price_text else None,
+        "Liquidity USD": liquidity,
+        "Volume USD": volume,
+        "Market Cap USD": market_cap,
+        "Analyzed Date": datetime.fromtimestamp(detected_at).strftime(DATE_FORMAT),
+        "Chain ID": pair.get('chainId'),
+        "Full Hash 1": pair.get('pairAddress'),
+        "Full Hash 2": base_token.get('address'),
+        "Hash Source": SOURCE_TOKENS_API,
+        "Pair Created At": datetime.fromtimestamp(created).strftime(DATE_FORMAT) if created else None,
+        "Source": source,
+    }
+
+
+# Creation time of the pair of a stored token: from the API for API sources,
+# estimated from the displayed age (to the minute) for device rows
+def listing_time(token):
+    created = token.get("Pair Created At")
+    if created:
+        return datetime.strptime(created, DATE_FORMAT).timestamp()
+    return creation_time(token)
+
+
+# Poll cost and detection lag of one feed
+class SourceMetrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.polls = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.poll_times = []
+        self.entries = 0
+        self.new_entries = 0
+        self.detection_lags = []
+
+    # poll_time is the wall time of the poll, waits for the feed quota included
+    def record_poll(self, poll_time, changed, entries=0, new_entries=0):
+        self.polls += 1
+        self.not_modified += not changed
+        self.poll_times.append(poll_time)
+        self.entries += entries
+        self.new_entries += new_entries
+
+    # Lag between the creation of a pair and the first time this feed listed its token, in seconds
+    def record_detection(self, lag):
+        self.detection_lags.append(lag)
+
+    def summary(self):
+        polls = self.polls or 1
+        return {
+            'polls': self.polls,
+            'not_modified': self.not_modified,
+            'errors': self.errors,
+            'poll_ms': sum(self.poll_times) / polls * 1000,
+            'entries': self.entries,
+            'new_entries': self.new_entries,
+            'detections': len(self.detection_lags),
+            'lag_p50_s': percentile(self.detection_lags, 0.5),
+            'lag_p95_s': percentile(self.detection_lags, 0.95),
+        }
+
+
+# Discovers new tokens from the listing feeds of the DexScreener API instead of the app.
+# Each feed is fetched with a conditional request, so an unchanged feed costs a 304 and no
+# parsing. Feed entries are remembered per feed in a seen-set; new tokens are resolved to
+# their most liquid pair with one /tokens/v1 call per chain and 30 addresses, and tokens
+# without an indexed pair yet are retried on the next polls. Each feed's detection lag is
+# measured against the pair creation time reported by the API.
+class ApiDiscovery:
+    def __init__(self, sources=None, max_pair_age=DEFAULT_MAX_PAIR_AGE, feed_limiter=None):
+        self.sources = sources or dict(SOURCES)
+        self.max_pair_age = max_pair_age
+        self.feed_limiter = feed_limiter or dexscreener_api.TokenBucket(FEED_REQUESTS_PER_MINUTE)
+        self.validators = {}  # source -> ETag / Last-Modified of its last response
+        self.seen_entries = DedupeIndex(window=SEEN_WINDOW)
+        self.pending = {}  # token identity -> {'chain_id', 'address', 'sightings': {source: time}, 'attempts'}
+        self.creation_times = OrderedDict()  # token identity -> pair creation time, most recent last
+        self.metrics = {name: SourceMetrics() for name in self.sources}
+
+    # Fetch one feed and queue the tokens it lists for the first time
+    def poll_source(self, name, now):
+        metrics = self.metrics[name]
+        start = perf_counter()
+        try:
+            data, self.validators[name] = dexscreener_api.api_get_if_changed(
+                self.sources[name], self.validators.get(name), self.feed_limiter)
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Could not poll the {name} feed: {e}")
+            metrics.errors += 1
+            return
+        if data is None:
+            metrics.record_poll(perf_counter() - start, changed=False)
+            return
+
+        entries = data if isinstance(data, list) else [data]
+        new_entries = 0
+        for entry in entries:
+            chain_id, address = entry.get('chainId'), entry.get('tokenAddress')
+            if not chain_id or not address:
+                continue
+            key = pair_identity(chain_id, address)
+            if not self.seen_entries.claim(f"{name}|{key}"):
+                continue
+            new_entries += 1
+            if key in self.creation_times:
+                # Already resolved from another feed: only this feed's lag is missing
+                lag = now - self.creation_times[key]
+                if lag <= self.max_pair_age:
+                    metrics.record_detection(lag)
+                continue
+            pending = self.pending.setdefault(key, {'chain_id': chain_id, 'address': address,
+                                                    'sightings': {}, 'attempts': 0})
+            pending['sightings'].setdefault(name, now)
+        metrics.record_poll(perf_counter() - start, changed=True, entries=len(entries), new_entries=new_entries)
+
+    # Resolve the queued tokens to token records
+    def resolve_pending(self, now):
+        by_chain = defaultdict(list)
+        for key, pending in self.pending.items():
+            by_chain[pending['chain_id']].append(key)
+
+        records = []
+        for chain_id, keys in by_chain.items():
+            for i in range(0, len(keys), MAX_TOKENS_PER_REQUEST):
+                batch = keys[i:i + MAX_TOKENS_PER_REQUEST]
+                addresses = ','.join(self.pending[key]['address'] for key in batch)
+                try:
+                    pairs = dexscreener_api.api_get(f'/tokens/v1/{chain_id}/{addresses}') or []
+                except requests.exceptions.RequestException as e:
+                    logging.warning(f"Could not resolve {len(batch)} tokens on {chain_id}: {e}")
+                    continue
+                records.extend(self._resolve_batch(chain_id, batch, pairs, now))
+        return records
+
+    def _resolve_batch(self, chain_id, keys, pairs, now):
+        best_pairs = {}
+        for pair in pairs:
+            key = pair_identity(chain_id, (pair.get('baseToken') or {}).get('address') or '')
+            liquidity = (pair.get('liquidity') or {}).get('usd') or 0.0
+            if key not in best_pairs or liquidity > ((best_pairs[key].get('liquidity') or {}).get('usd') or 0.0):
+                best_pairs[key] = pair
+
+        records = []
+        for key in keys:
+            pending = self.pending[key]
+            pair = best_pairs.get(key)
+            if pair is None or not pair.get('pairCreatedAt'):
+                pending['attempts'] += 1
+                if pending['attempts'] >= MAX_RESOLVE_ATTEMPTS:
+                    logging.info(f"No pair found for {key} after {pending['attempts']} attempts, giving up")
+                    del self.pending[key]
+                continue
+            del self.pending[key]
+
+            created = pair['pairCreatedAt'] / 1000
+            self.creation_times[key] = created
+            if len(self.creation_times) > MAX_CREATION_TIMES:
+                self.creation_times.popitem(last=False)
+            if now - created > self.max_pair_age:
+                continue  # An older token getting a profile or a boost, not a new listing
+
+            for source, seen_at in pending['sightings'].items():
+                self.metrics[source].record_detection(seen_at - created)
+            source, detected_at = min(pending['sightings'].items(), key=lambda item: item[1])
+            records.append(token_record(pair, source, detected_at))
+        return records
+
+    # One discovery cycle: poll every feed, then resolve the new tokens
+    def poll(self):
+        for name in self.sources:
+            self.poll_source(name, time())
+        return self.resolve_pending(time())
+
+    # Per-feed metrics side by side, then restart the aggregation
+    def log_summary(self):
+        if not any(metrics.polls or metrics.errors for metrics in self.metrics.values()):
+            return
+        lines = [f"{'source':<12}{'polls':>7}{'304':>6}{'errors':>8}{'poll ms':>9}{'new':>6}"
+                 f"{'detected':>10}{'lag p50':>9}{'lag p95':>9}"]
+        for name, metrics in self.metrics.items():
+            s = metrics.summary()
+            lines.append(f"{name:<12}{s['polls']:>7}{s['not_modified']:>6}{s['errors']:>8}{s['poll_ms']:>9.0f}"
+                         f"{s['new_entries']:>6}{s['detections']:>10}{s['lag_p50_s']:>8.0f}s{s['lag_p95_s']:>8.0f}s")
+            metrics.reset()
+        logging.info("API discovery:\n" + '\n'.join(lines))
+
+
+# Store the tokens that are not known yet and return them. A token the device already stored
+# under its own identity is rejected by the store (see TokenStore.append) and not returned.
+def store_new_tokens(tokens, token_store, seen):
+    new_tokens = [token for token in tokens if seen.claim(*token_identities(token))]
+    if not new_tokens:
+        return []
+    inserted = token_store.append(new_tokens)
+    for token in inserted:
+        logging.info(f"New token '{token['Token Name']}' on {token['Chain ID']} from {token['Source']} "
+                     f"(listed {token['Time']} ago, liquidity {token['Liquidity']})")
+    logging.info(f"Added {len(inserted)} new tokens to {token_store.path}"
+                 f" ({len(new_tokens) - len(inserted)} already stored).")
+    return inserted
+
+
+# Poll the feeds every `interval` seconds and store the new tokens
+def run_discovery(discovery, token_store, seen, interval=DEFAULT_INTERVAL, max_cycles=None, summary_every=60):
+    cycle = 0
+    while max_cycles is None or cycle < max_cycles:
+        cycle += 1
+        cycle_start = perf_counter()
+        store_new_tokens(discovery.poll(), token_store, seen)
+        if cycle % summary_every == 0:
+            discovery.log_summary()
+        sleep(max(0.0, interval - (perf_counter() - cycle_start)))
+
+
+# Detection lag of the stored tokens per source, for the device and API discovery side by side.
+# Tokens listed more than max_pair_age before their detection are left out.
+def lag_report(token_store, max_pair_age=DEFAULT_MAX_PAIR_AGE):
+    lags = defaultdict(list)
+    for token in token_store.iter_tokens():
+        created = listing_time(token)
+        if created is None:
+            continue
+        lag = observed_at(token) - created
+        if lag <= max_pair_age:
+            lags[token.get('Source', DEVICE_SOURCE)].append(lag)
+    return {source: {
+        'tokens': len(values),
+        'lag_p50_s': percentile(values, 0.5),
+        'lag_p95_s': percentile(values, 0.95),
+        'lag_max_s': max(values),
+    } for source, values in sorted(lags.items())}
+
+
+def print_lag_report(report):
+    print(f"{'source':<12}{'tokens':>8}{'lag p50':>10}{'lag p95':>10}{'lag max':>10}")
+    for source, s in report.items():
+        print(f"{source:<12}{s['tokens']:>8}{s['lag_p50_s']:>9.0f}s{s['lag_p95_s']:>9.0f}s{s['lag_max_s']:>9.0f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Discover new tokens from the DexScreener API and store them.')
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES),
+                        help='Listing feeds to poll')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='Seconds between two polls')
+    parser.add_argument('--max-pair-age', type=float, default=DEFAULT_MAX_PAIR_AGE,
+                        help='Tokens whose pair was created longer ago (seconds) are not stored')
+    parser.add_argument('--cycles', type=int, default=None, help='Stop after this many polls')
+    parser.add_argument('--summary-every', type=int, default=60, help='Log the per-feed metrics every N polls')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite token store path')
+    parser.add_argument('--api-base-url', default=None, help='Poll another server, e.g. a local stand-in')
+    parser.add_argument('--report', action='store_true',
+                        help='Print the detection lag of the stored tokens per source and exit')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Set up logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.api_base_url:
+        dexscreener_api.API_BASE_URL = args.api_base_url.rstrip('/')
+
+    # Open the same token store as the device monitor and load the recent detections
+    token_store = open_token_store(args.db)
+    try:
+        if args.report:
+            print_lag_report(lag_report(token_store, args.max_pair_age))
+            return
+        seen = DedupeIndex(window=SEEN_WINDOW)
+        seen.seed(token_store.recent_keys(SEEN_WINDOW))
+        discovery = ApiDiscovery({name: SOURCES[name] for name in args.sources}, args.max_pair_age)
+        try:
+            run_discovery(discovery, token_store, seen, args.interval, args.cycles, args.summary_every)
+        except KeyboardInterrupt:
+            logging.info("Discovery stopped by user")
+        discovery.log_summary()
+    finally:
+        token_store.close()
+
+
+if __name__ == '__main__':
+    main()
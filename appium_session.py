@@ -0,0 +1,62 @@
+import logging
+from time import time
+
+from appium import webdriver
+from appium.options.android import UiAutomator2Options
+
+DEFAULT_DEVICE_NAME = '4672d93b'  # Replace by your device ID
+DEFAULT_SERVER_URL = 'http://localhost:4725/wd/hub'
+
+
+# Build the UiAutomator2 options for one device.
+# system_port must differ between sessions that run on the same Appium host.
+def build_options(device_name=DEFAULT_DEVICE_NAME, udid=None, system_port=None, new_command_timeout=None):
+    options = UiAutomator2Options()
+    options.platformName = 'Android'
+    options.deviceName = device_name
+    options.appPackage = 'com.dexscreener'
+    options.appActivity = 'com.dexscreener.MainActivity'
+    options.noReset = True
+
+    # Additional capabilities
+    additional_caps = {
+        'skipUnlock': True,
+        'disableWindowAnimation': True,
+        'uiautomator2ServerInstallTimeout': 60000,
+        'ignoreHiddenApiPolicyError': True
+    }
+    if udid:
+        additional_caps['udid'] = udid
+    if system_port:
+        additional_caps['systemPort'] = system_port
+    if new_command_timeout is not None:
+        # Seconds of inactivity before Appium ends the session (0 keeps it alive)
+        additional_caps['newCommandTimeout'] = new_command_timeout
+    options.load_capabilities(additional_caps)
+    return options
+
+
+# Start an Appium session and log how long it took
+def create_driver(device_name=DEFAULT_DEVICE_NAME, server_url=DEFAULT_SERVER_URL, udid=None, system_port=None,
+                  new_command_timeout=None):
+    logging.info(f"Initializing the Appium driver for device '{device_name}' on {server_url}")
+    start_time = time()
+    driver = webdriver.Remote(server_url, options=build_options(device_name, udid, system_port, new_command_timeout))
+    logging.info(f"Driver initialized for '{device_name}' (session {driver.session_id}). "
+                 f"Time taken: {time() - start_time:.2f} seconds")
+    return driver
+
+
+# Attach to a session that is already running on the Appium server instead of creating one
+def attach_driver(session_id, server_url=DEFAULT_SERVER_URL):
+    class AttachedRemote(webdriver.Remote):
+        def start_session(self, capabilities, browser_profile=None):
+            self.session_id = session_id
+            self.caps = {}
+
+    logging.info(f"Attaching to Appium session {session_id} on {server_url}")
+    start_time = time()
+    driver = AttachedRemote(server_url, options=build_options())
+    driver.get_window_size()  # Fails fast if the session no longer exists
+    logging.info(f"Attached to session {session_id}. Time taken: {time() - start_time:.2f} seconds")
+    return driver
@@ -0,0 +1,244 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import ColumnarStore, row_columns
+from get_updated_token_price import iter_purchases
+from portfolio_analytics import load_history, load_history_from_store, local_dates_to_timestamps, pair_keys
+
+DEFAULT_PAIRS_PATH = 'pair_hash.json'
+DEFAULT_PURCHASES_PATH = 'simulated_purchases.json'
+DEFAULT_HISTORY_PATH = 'price_history.csv'
+DEFAULT_OUTPUT_PATH = 'backtest_results.csv'
+
+# Observations kept per listing; longer paths are truncated
+MAX_STEPS = 2000
+
+# Parameter grid searched when no --grid file is given. Entry filters select listings,
+# exit rules decide when a position is closed.
+DEFAULT_GRID = {
+    'min_liquidity': [1, 1_000, 5_000, 20_000],
+    'min_mcap': [0, 10_000, 50_000],
+    'max_mcap': [1_000_000, 10_000_000, float('inf')],
+    'max_age_s': [300, 900, 3_600, float('inf')],
+    'min_buy_sell_ratio': [0, 1, 1.5],
+    'take_profit': [0.2, 0.5, 1.0, 3.0],
+    'stop_loss': [0.2, 0.5, 0.9],
+    'max_hold_s': [3_600, 6 * 3_600, 24 * 3_600, float('inf')],
+}
+FILTER_PARAMS = ('min_liquidity', 'min_mcap', 'max_mcap', 'max_age_s', 'min_buy_sell_ratio')
+EXIT_PARAMS = ('take_profit', 'stop_loss', 'max_hold_s')
+
+
+# Listings captured by the listener: row features from pair_hash.json, detection time from
+# simulated_purchases.json, joined on the pair identity. Row features missing from a record are
+# read from its displayed text, as columnar_store does.
+def load_listings(pairs_path=DEFAULT_PAIRS_PATH, purchases_path=DEFAULT_PURCHASES_PATH):
+    pairs = pd.DataFrame(row_columns(list(iter_purchases(pairs_path)),
+                                     ['chain_id', 'pair_id', 'liquidity_usd', 'market_cap_usd', 'age_s']))
+    purchases = pd.DataFrame.from_records(list(iter_purchases(purchases_path)))
+    purchases = purchases.reindex(columns=['Chain ID', 'Full Hash 1', 'Purchase Date'])
+
+    pairs['pair_key'] = pair_keys(pairs['chain_id'], pairs['pair_id'])
+    purchases['pair_key'] = pair_keys(purchases['Chain ID'], purchases['Full Hash 1'])
+    purchases['entry_at'] = local_dates_to_timestamps(purchases['Purchase Date'])
+    listings = pairs.drop_duplicates('pair_key', keep='last').merge(
+        purchases[['pair_key', 'entry_at']].drop_duplicates('pair_key'), on='pair_key')
+
+    return pd.DataFrame({
+        'pair_key': listings['pair_key'],
+        'chain_id': listings['chain_id'],
+        'entry_at': listings['entry_at'],
+        'liquidity': listings['liquidity_usd'].fillna(0.0),
+        'mcap': listings['market_cap_usd'].fillna(0.0),
+        'age_s': listings['age_s'],
+    }).dropna(subset=['entry_at'])
+
+
+# Same listings from a columnar store written by columnar_store.py
+def load_listings_from_store(store):
+    pairs = store.to_frame('pairs', ['chain_id', 'pair_id', 'liquidity_usd', 'market_cap_usd', 'age_s'])
+    purchases = store.to_frame('purchases', ['chain_id', 'pair_id', 'purchased_at'])
+
+    pairs['pair_key'] = pair_keys(pairs['chain_id'], pairs['pair_id'])
+    purchases['pair_key'] = pair_keys(purchases['chain_id'], purchases['pair_id'])
+    listings = pairs.drop_duplicates('pair_key', keep='last').merge(
+        purchases[['pair_key', 'purchased_at']].drop_duplicates('pair_key'), on='pair_key')
+
+    return pd.DataFrame({
+        'pair_key': listings['pair_key'],
+        'chain_id': listings['chain_id'],
+        'entry_at': listings['purchased_at'],
+        'liquidity': listings['liquidity_usd'].fillna(0.0),
+        'mcap': listings['market_cap_usd'].fillna(0.0),
+        'age_s': listings['age_s'],
+    }).dropna(subset=['entry_at'])
+
+
+# Padded NumPy arrays of the price path after each entry:
+# prices[i, t] and elapsed[i, t] (seconds since entry), NaN after the last observation.
+# The first observation at or after the entry is the fill price; its 24h buy/sell ratio
+# is the listing's order-flow feature.
+def build_paths(listings, history, max_steps=MAX_STEPS):
+    observations = listings[['pair_key', 'entry_at']].reset_index(drop=True).reset_index().merge(
+        history[['pair_key', 'timestamp', 'price_usd', 'buys_h24', 'sells_h24']], on='pair_key')
+    observations = observations[observations['timestamp'] >= observations['entry_at']]
+    observations = observations.sort_values(['index', 'timestamp'])
+    observations['step'] = observations.groupby('index').cumcount()
+    observations = observations[observations['step'] < max_steps]
+
+    count = len(listings)
+    steps = int(observations['step'].max()) + 1 if len(observations) else 1
+    prices = np.full((count, steps), np.nan)
+    elapsed = np.full((count, steps), np.nan)
+    rows, columns = observations['index'].to_numpy(), observations['step'].to_numpy()
+    prices[rows, columns] = observations['price_usd'].to_numpy()
+    elapsed[rows, columns] = (observations['timestamp'] - observations['entry_at']).to_numpy()
+
+    first = observations[observations['step'] == 0]
+    buy_sell_ratio = np.zeros(count)
+    buys, sells = first['buys_h24'].fillna(0).to_numpy(), first['sells_h24'].fillna(0).to_numpy()
+    buy_sell_ratio[first['index'].to_numpy()] = np.where(sells > 0, buys / np.maximum(sells, 1), np.where(buys > 0, np.inf, 0))
+    return prices, elapsed, buy_sell_ratio
+
+
+# Return of every listing under one exit rule: the first observation reaching the take-profit
+# or stop-loss level closes the trade, otherwise the last observation within max_hold_s.
+# Listings without any observation get NaN.
+def exit_returns(prices, elapsed, take_profit, stop_loss, max_hold_s):
+    returns = prices / prices[:, :1] - 1
+    in_window = ~np.isnan(returns) & (elapsed <= max_hold_s)
+    triggered = in_window & ((returns >= take_profit) | (returns <= -stop_loss))
+    has_trigger = triggered.any(axis=1)
+    last_in_window = in_window.shape[1] - 1 - np.argmax(in_window[:, ::-1], axis=1)
+    exit_step = np.where(has_trigger, np.argmax(triggered, axis=1), last_in_window)
+    result = returns[np.arange(len(returns)), exit_step]
+    result[~in_window.any(axis=1)] = np.nan
+    return result
+
+
+# Trade statistics of one strategy from the per-listing returns it selected, ordered by entry time
+def strategy_metrics(returns):
+    returns = returns[~np.isnan(returns)]
+    if len(returns) == 0:
+        return {'trades': 0, 'total_return': 0.0, 'mean_return': 0.0, 'hit_rate': 0.0,
+                'max_drawdown': 0.0, 'sharpe': 0.0}
+    equity = np.cumsum(returns)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity
+    std = returns.std()
+    return {
+        'trades': int(len(returns)),
+        'total_return': float(returns.sum()),
+        'mean_return': float(returns.mean()),
+        'hit_rate': float((returns > 0).mean()),
+        'max_drawdown': float(drawdown.max()),
+        'sharpe': float(returns.mean() / std * np.sqrt(len(returns))) if std > 0 else 0.0,
+    }
+
+
+# Worker state, set once per process by the pool initializer instead of being pickled with every task
+_worker = {}
+
+
+def _init_worker(features, prices, elapsed, filter_grid):
+    _worker.update(features=features, prices=prices, elapsed=elapsed, filter_grid=filter_grid)
+
+
+# Evaluate one exit rule against every entry-filter combination.
+# The exit returns are computed once for all listings; each filter is then a boolean mask.
+def _evaluate_exit_rule(exit_rule):
+    features, filter_grid = _worker['features'], _worker['filter_grid']
+    returns = exit_returns(_worker['prices'], _worker['elapsed'], *exit_rule)
+    results = []
+    for min_liquidity, min_mcap, max_mcap, max_age_s, min_ratio in filter_grid:
+        if min_mcap >= max_mcap:
+            continue
+        mask = ((features['liquidity'] >= min_liquidity) & (features['mcap'] >= min_mcap)
+                & (features['mcap'] <= max_mcap) & (features['age_s'] <= max_age_s)
+                & (features['buy_sell_ratio'] >= min_ratio))
+        metrics = strategy_metrics(returns[mask])
+        metrics.update(zip(FILTER_PARAMS, (min_liquidity, min_mcap, max_mcap, max_age_s, min_ratio)))
+        metrics.update(zip(EXIT_PARAMS, exit_rule))
+        results.append(metrics)
+    return results
+
+
+# Grid search over entry filters x exit rules, fanned out across a process pool
+def run_grid(listings, prices, elapsed, buy_sell_ratio, grid=None, workers=None):
+    grid = grid or DEFAULT_GRID
+    order = np.argsort(listings['entry_at'].to_numpy(), kind='stable')
+    features = {
+        'liquidity': listings['liquidity'].to_numpy()[order],
+        'mcap': listings['mcap'].to_numpy()[order],
+        # Unknown age never excludes a listing
+        'age_s': np.nan_to_num(listings['age_s'].to_numpy()[order], nan=0.0),
+        'buy_sell_ratio': buy_sell_ratio[order],
+    }
+    filter_grid = list(itertools.product(*(grid[name] for name in FILTER_PARAMS)))
+    exit_grid = list(itertools.product(*(grid[name] for name in EXIT_PARAMS)))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(features, prices[order], elapsed[order], filter_grid)) as executor:
+        for exit_results in executor.map(_evaluate_exit_rule, exit_grid):
+            results.extend(exit_results)
+    return pd.DataFrame(results)
+
+
+def load_grid(path):
+    with open(path, 'r') as f:
+        grid = dict(DEFAULT_GRID, **json.load(f))
+    # JSON has no infinity; null means "no limit"
+    return {name: [float('inf') if value is None else value for value in values] for name, values in grid.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backtest entry filters and exit rules on recorded listings.')
+    parser.add_argument('--pairs', default=DEFAULT_PAIRS_PATH, help='Listings written by dexscreenerlistener.py')
+    parser.add_argument('--purchases', default=DEFAULT_PURCHASES_PATH, help='Detection times of the listings')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH, help='Price time series (price_history.csv)')
+    parser.add_argument('--grid', default=None, help='JSON object of parameter lists overriding the default grid')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--min-trades', type=int, default=10, help='Hide strategies with fewer trades')
+    parser.add_argument('--top', type=int, default=20, help='Strategies to print')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='CSV with the metrics of every strategy')
+    parser.add_argument('--store', default=None,
+                        help='Read listings and price history from this columnar store (columnar_store.py export)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    start_time = perf_counter()
+    if args.store:
+        store = ColumnarStore(args.store)
+        listings = load_listings_from_store(store)
+        history = load_history_from_store(store)
+    else:
+        listings = load_listings(args.pairs, args.purchases)
+        history = load_history(args.history)
+    prices, elapsed, buy_sell_ratio = build_paths(listings, history)
+    logging.info(f"{len(listings)} listings, paths of up to {prices.shape[1]} observations, "
+                 f"loaded in {perf_counter() - start_time:.2f} seconds")
+
+    grid = load_grid(args.grid) if args.grid else DEFAULT_GRID
+    search_start = perf_counter()
+    results = run_grid(listings, prices, elapsed, buy_sell_ratio, grid, args.workers)
+    logging.info(f"{len(results)} strategies evaluated in {perf_counter() - search_start:.2f} seconds "
+                 f"({args.workers or os.cpu_count()} workers)")
+
+    results = results.sort_values('total_return', ascending=False)
+    results.to_csv(args.output, index=False)
+    ranked = results[results['trades'] >= args.min_trades].head(args.top)
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 200):
+        print(ranked.to_string(index=False))
+    logging.info(f"All results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+from collections import Counter
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dexscreener_api  # noqa: E402
+from dedupe_index import DedupeIndex  # noqa: E402
+from dexscreenerlistener import extract_basic_token_data, process_token  # noqa: E402
+from get_newest_tokens import extract_token_data, record_new_tokens  # noqa: E402
+from replay_driver import ReplayDriver  # noqa: E402
+from token_store import TokenStore  # noqa: E402
+
+DEFAULT_RECORDING = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings', 'sample_session.jsonl')
+
+
+# Run function against the replay driver and return (result, (wall seconds, round trips by command))
+def measure(driver, function, *args):
+    command_counts = Counter(driver.command_counts)
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args)
+    return result, (perf_counter() - start, driver.command_counts - command_counts)
+
+
+def summarize(name, samples):
+    walls = [wall for wall, _ in samples]
+    commands = Counter()
+    for _, command_counts in samples:
+        commands.update(command_counts)
+    count = len(samples) or 1
+    return {
+        'stage': name,
+        'count': len(samples),
+        'mean_wall_s': sum(walls) / count,
+        'max_wall_s': max(walls, default=0.0),
+        'mean_round_trips': sum(commands.values()) / count,
+        'round_trips_by_command': {command: total / count for command, total in sorted(commands.items())},
+    }
+
+
+def run_benchmark(recording, latency_scale, cycles):
+    driver = ReplayDriver(recording, latency_scale=latency_scale)
+    results = []
+
+    # Listener discovery cycle: one screen of rows
+    samples = []
+    for _ in range(cycles):
+        driver.reset()
+        _, sample = measure(driver, extract_basic_token_data, driver)
+        samples.append(sample)
+    results.append(summarize('extract_basic_token_data (per cycle)', samples))
+
+    # Listener drill-down: one detail page per token
+    driver.reset()
+    rows, _ = measure(driver, extract_basic_token_data, driver)
+    samples = []
+    for _, token_info in rows:
+        _, sample = measure(driver, process_token, driver, token_info)
+        samples.append(sample)
+    results.append(summarize('process_token (per token)', samples))
+
+    # Newest-list monitor cycle, storing into a throwaway token store
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = TokenStore(os.path.join(tmp_dir, 'tokens.sqlite'))
+        seen = DedupeIndex()
+        samples = []
+        driver.reset()
+        for _ in range(cycles):
+            def monitor_cycle():
+                return record_new_tokens(extract_token_data(driver), store, seen)
+            _, sample = measure(driver, monitor_cycle)
+            samples.append(sample)
+        store.close()
+    results.append(summarize('monitor_token_changes (per cycle)', samples))
+
+    return results, driver.unknown_transitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the capture pipeline over a recorded session.')
+    parser.add_argument('--recording', default=DEFAULT_RECORDING, help='Recording written by replay_driver.RecordingDriver')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='Multiplier applied to the recorded command latencies (0 = no injected latency)')
+    parser.add_argument('--cycles', type=int, default=3, help='Discovery/monitor cycles to run')
+    parser.add_argument('--online', action='store_true', help='Allow real DexScreener API calls (search fallback)')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the results to this JSON file')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.online:
+        # Unreachable API: the search fallback fails fast and the clipboard path is exercised
+        dexscreener_api.API_BASE_URL = 'http://127.0.0.1:9'
+
+    results, unknown_transitions = run_benchmark(args.recording, args.latency_scale, args.cycles)
+
+    print(f"Recording: {args.recording} (latency scale {args.latency_scale})")
+    print(f"{'stage':<36} {'n':>4} {'mean wall':>10} {'max wall':>10} {'round trips':>12}")
+    for result in results:
+        print(f"{result['stage']:<36} {result['count']:>4} {result['mean_wall_s']:>9.3f}s "
+              f"{result['max_wall_s']:>9.3f}s {result['mean_round_trips']:>12.1f}")
+        print('    ' + ', '.join(f"{command}={count:g}" for command, count in result['round_trips_by_command'].items()))
+    if unknown_transitions:
+        print(f"Warning: {unknown_transitions} actions had no recorded transition (the app stayed on the same screen)")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'recording': args.recording, 'latency_scale': args.latency_scale, 'results': results}, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
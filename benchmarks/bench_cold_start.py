@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from cli import COMMANDS  # noqa: E402
+
+CLI = os.path.join(ROOT, 'cli.py')
+
+# Heavy dependencies whose presence at start-up is reported for each subcommand
+HEAVY_PACKAGES = ('appium', 'selenium', 'pandas', 'numpy', 'lxml', 'requests')
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \| *(\S+)$')
+
+
+# Wall time of one fresh interpreter parsing the subcommand's options (--help exits right after)
+def cold_start(command):
+    start = perf_counter()
+    subprocess.run([sys.executable, CLI, command, '--help'], cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return perf_counter() - start
+
+
+# Import time, in seconds, spent in the modules of each heavy package loaded by the subcommand
+def heavy_imports(command):
+    result = subprocess.run([sys.executable, '-X', 'importtime', CLI, command, '--help'], cwd=ROOT, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    loaded = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and match.group(2).split('.')[0] in HEAVY_PACKAGES:
+            package = match.group(2).split('.')[0]
+            loaded[package] = loaded.get(package, 0.0) + int(match.group(1)) / 1e6
+    return loaded
+
+
+def run_benchmark(commands, repeat):
+    results = []
+    for command in commands:
+        cold_start(command)  # Warm the filesystem cache and the bytecode files
+        samples = [cold_start(command) for _ in range(repeat)]
+        results.append({
+            'command': command,
+            'min_s': min(samples),
+            'median_s': median(samples),
+            'heavy_imports': heavy_imports(command),
+        })
+    return results
+
+
+# Subcommands whose median start-up grew by more than `tolerance` (relative) since the baseline
+def regressions(results, baseline, tolerance):
+    previous = {entry['command']: entry for entry in baseline['results']}
+    return [(entry['command'], previous[entry['command']]['median_s'], entry['median_s'])
+            for entry in results
+            if entry['command'] in previous
+            and entry['median_s'] > previous[entry['command']]['median_s'] * (1 + tolerance)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cold-start time of every cli.py subcommand.')
+    parser.add_argument('commands', nargs='*', default=list(COMMANDS), help='Subcommands to measure (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters started per subcommand')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the results to this JSON file')
+    parser.add_argument('--baseline', default=None, help='Results of a previous run (--json) to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Relative slowdown against the baseline reported as a regression')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.commands, args.repeat)
+    print(f"{'command':<16}{'min':>9}{'median':>9}  heavy imports (own modules)")
+    for entry in results:
+        imports = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in sorted(entry['heavy_imports'].items()))
+        print(f"{entry['command']:<16}{entry['min_s']:>8.3f}s{entry['median_s']:>8.3f}s  {imports or '-'}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        for command, before, after in slower:
+            print(f"Regression: '{command}' start-up {before:.3f}s -> {after:.3f}s")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dexscreener_api  # noqa: E402
+from api_discovery import ApiDiscovery, SOURCES, lag_report, print_lag_report, run_discovery  # noqa: E402
+from dedupe_index import DedupeIndex  # noqa: E402
+from token_store import TokenStore  # noqa: E402
+
+BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# Entries returned by one feed request, newest first
+FEED_SIZE = 30
+
+
+# Synthetic listings: tokens are created at random (Poisson) times, appear on the profiles
+# feed profile_delay seconds later and, for a fraction of them, on the boosts feed
+# boost_delay seconds later.
+class SimulatedMarket:
+    def __init__(self, rate_per_minute=30, profile_delay=2.0, boost_delay=5.0, boost_fraction=0.3, seed=0):
+        self.rate = rate_per_minute / 60.0
+        self.delays = {'profiles': profile_delay, 'boosts': boost_delay}
+        self.boost_fraction = boost_fraction
+        self.random = random.Random(seed)
+        self.listings = []
+        self.tokens = {}  # (chain ID, token address) -> listing
+        self.next_listing = time() + self.random.expovariate(self.rate)
+        self.lock = threading.Lock()
+
+    def _new_listing(self, created):
+        chain_id = self.random.choice(('solana', 'base'))
+        if chain_id == 'solana':
+            token_address, pair_address = (''.join(self.random.choices(BASE58, k=44)) for _ in range(2))
+        else:
+            token_address, pair_address = (f"0x{self.random.getrandbits(160):040x}" for _ in range(2))
+        listing = {
+            'chain_id': chain_id,
+            'token_address': token_address,
+            'pair_address': pair_address,
+            'symbol': f"SIM{len(self.listings)}",
+            'created': created,
+            'boosted': self.random.random() < self.boost_fraction,
+            'liquidity': round(self.random.lognormvariate(9, 1.5), 2),
+        }
+        self.listings.append(listing)
+        self.tokens[(chain_id, token_address)] = listing
+
+    def _advance(self, now):
+        while self.next_listing <= now:
+            self._new_listing(self.next_listing)
+            self.next_listing += self.random.expovariate(self.rate)
+
+    def feed(self, name, now):
+        with self.lock:
+            self._advance(now)
+            visible = [listing for listing in self.listings
+                       if listing['created'] + self.delays[name] <= now and (name != 'boosts' or listing['boosted'])]
+        return [{'url': f"https://dexscreener.com/{listing['chain_id']}/{listing['token_address']}",
+                 'chainId': listing['chain_id'], 'tokenAddress': listing['token_address']}
+                for listing in reversed(visible[-FEED_SIZE:])]
+
+    def pairs(self, chain_id, addresses, now):
+        with self.lock:
+            self._advance(now)
+            listings = [self.tokens[(chain_id, address)] for address in addresses if (chain_id, address) in self.tokens]
+        return [{
+            'chainId': listing['chain_id'],
+            'pairAddress': listing['pair_address'],
+            'baseToken': {'address': listing['token_address'], 'name': f"Simulated {listing['symbol']}",
+                          'symbol': listing['symbol']},
+            'priceUsd': '0.0001234',
+            'priceChange': {'h24': 12.5},
+            'liquidity': {'usd': listing['liquidity']},
+            'volume': {'h24': listing['liquidity'] * 2},
+            'fdv': listing['liquidity'] * 10,
+            'pairCreatedAt': int(listing['created'] * 1000),
+        } for listing in listings]
+
+
+# Stand-in for the DexScreener API endpoints used by api_discovery.py, with ETag support on the feeds
+class StubHandler(BaseHTTPRequestHandler):
+    market = None
+    responses = Counter()  # (endpoint, status) -> count
+
+    def do_GET(self):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        now = time()
+        if parts[:1] in (['token-profiles'], ['token-boosts']):
+            endpoint = 'profiles' if parts[0] == 'token-profiles' else 'boosts'
+            body = json.dumps(self.market.feed(endpoint, now)).encode()
+        elif parts[:2] == ['tokens', 'v1'] and len(parts) == 4:
+            endpoint = 'tokens'
+            body = json.dumps(self.market.pairs(parts[2], parts[3].split(','), now)).encode()
+        else:
+            self.responses[(self.path, 404)] += 1
+            self.send_error(404)
+            return
+
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        if endpoint != 'tokens' and self.headers.get('If-None-Match') == etag:
+            self.responses[(endpoint, 304)] += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.responses[(endpoint, 200)] += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(market, port=0):
+    StubHandler.market = market
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the API discovery against a local stand-in server.')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of discovery to run')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between two polls')
+    parser.add_argument('--rate', type=float, default=30.0, help='Simulated listings per minute')
+    parser.add_argument('--profile-delay', type=float, default=2.0, help='Seconds before a listing has a profile')
+    parser.add_argument('--boost-delay', type=float, default=5.0, help='Seconds before a listing is boosted')
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help='Only serve the stand-in on this port, for api_discovery.py --api-base-url')
+    args = parser.parse_args()
+
+    market = SimulatedMarket(args.rate, args.profile_delay, args.boost_delay)
+    if args.serve is not None:
+        start_stub_server(market, args.serve)
+        print(f"Serving the stand-in API on http://127.0.0.1:{args.serve} (Ctrl+C to stop)")
+        try:
+            while True:
+                sleep(3600)
+        except KeyboardInterrupt:
+            return
+
+    server = start_stub_server(market)
+    dexscreener_api.API_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TokenStore(os.path.join(tmp, 'tokens.sqlite'))
+        discovery = ApiDiscovery(dict(SOURCES), feed_limiter=dexscreener_api.TokenBucket(10_000))
+        cycles = max(1, int(args.duration / args.interval))
+        run_discovery(discovery, store, DedupeIndex(), args.interval, cycles, summary_every=cycles + 1)
+
+        print(f"{len(market.listings)} simulated listings, {len(store)} tokens stored\n")
+        print(f"{'source':<12}{'polls':>7}{'304':>6}{'detected':>10}{'lag p50':>9}{'lag p95':>9}")
+        for name, metrics in discovery.metrics.items():
+            s = metrics.summary()
+            print(f"{name:<12}{s['polls']:>7}{s['not_modified']:>6}{s['detections']:>10}"
+                  f"{s['lag_p50_s']:>8.1f}s{s['lag_p95_s']:>8.1f}s")
+        print()
+        print_lag_report(lag_report(store))
+        print('\nstand-in responses: ' + ', '.join(f"{endpoint} {status}: {count}"
+                                                  for (endpoint, status), count in sorted(StubHandler.responses.items())))
+        store.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
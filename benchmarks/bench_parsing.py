@@ -0,0 +1,116 @@
+import argparse
+import os
+import random
+import re
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from token_parsing import parse_amount, parse_price, parse_rows  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content_desc_corpus.txt')
+
+DIGITS = re.compile(r'\d')
+
+
+# Previous implementation (split, filtered list, dict of strings, then a separate liquidity parse),
+# kept here as the baseline the shared parser is measured against
+def legacy_parse(content_desc):
+    filtered_data = [d for d in content_desc.split(', ') if d.strip() and d.strip() != "?"]
+    cleaned_data = {
+        "Token Name": filtered_data[0] if len(filtered_data) > 0 else "N/A",
+        "Time": filtered_data[1] if len(filtered_data) > 1 else "N/A",
+        "Price": filtered_data[2] if len(filtered_data) > 2 else "N/A",
+        "Additional Value": "", "Change Indicator": "", "Change": "", "Project Name": "",
+        "Liquidity": "", "Volume": "", "Market Cap": ""
+    }
+    index = 3
+    if len(filtered_data) > index and filtered_data[index].isdigit():
+        cleaned_data["Additional Value"] = filtered_data[index]
+        index += 1
+    for key in ("Change Indicator", "Change", "Project Name"):
+        cleaned_data[key] = filtered_data[index] if len(filtered_data) > index else ""
+        index += 1
+    while index < len(filtered_data):
+        value = filtered_data[index + 1] if index + 1 < len(filtered_data) else ""
+        key = {"LIQ": "Liquidity", "VOL": "Volume", "MCAP": "Market Cap"}.get(filtered_data[index])
+        if key:
+            cleaned_data[key] = value
+        index += 2
+
+    liquidity_str = cleaned_data["Liquidity"].strip().upper()
+    if liquidity_str and '<' not in liquidity_str:
+        liquidity_str = liquidity_str.replace('$', '').replace(',', '')
+        multiplier = 1
+        for suffix, factor in (('K', 1_000), ('M', 1_000_000), ('B', 1_000_000_000)):
+            if suffix in liquidity_str:
+                multiplier = factor
+                liquidity_str = liquidity_str.replace(suffix, '')
+                break
+        try:
+            float(liquidity_str) * multiplier
+        except ValueError:
+            pass
+    return cleaned_data
+
+
+def load_corpus(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip() and not line.startswith('#')]
+
+
+# Rows with the layout of the recorded ones but their own prices, amounts and ages, as a live
+# list shows: each digit is redrawn, so almost no two rows or values repeat
+def distinct_rows(corpus, count, seed=0):
+    rng = random.Random(seed)
+    return [DIGITS.sub(lambda _: str(rng.randrange(10)), corpus[index % len(corpus)]) for index in range(count)]
+
+
+def clear_caches():
+    parse_amount.cache_clear()
+    parse_price.cache_clear()
+
+
+# Best time of `repeat` runs; `setup` is called before each run, outside the timing
+def time_runs(function, repeat, setup=None):
+    best = float('inf')
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark content-desc parsing over a corpus of recorded rows.')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--rows', type=int, default=100_000, help='Rows parsed per run')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per parser; the best run is reported')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    rows = distinct_rows(corpus, args.rows)
+    cycled = (corpus * (args.rows // len(corpus) + 1))[:args.rows]
+
+    # parse_amount and parse_price are memoized: the distinct rows, with the caches cleared before
+    # each run, give the cost on fresh rows; the cycled corpus gives the cost once the caches are warm
+    results = {
+        'shared parser, distinct rows': time_runs(lambda: parse_rows(rows), args.repeat, setup=clear_caches),
+        'legacy, distinct rows': time_runs(lambda: [legacy_parse(row) for row in rows], args.repeat),
+        'shared parser, cycled rows': time_runs(lambda: parse_rows(cycled), args.repeat),
+        'legacy, cycled rows': time_runs(lambda: [legacy_parse(row) for row in cycled], args.repeat),
+    }
+    print(f"{len(rows)} rows per run, best of {args.repeat} runs; distinct rows are generated from "
+          f"the {len(corpus)} recorded strings, cycled rows repeat them")
+    for name, elapsed in results.items():
+        print(f"{name:<30} {elapsed * 1000:9.1f} ms  {elapsed / len(rows) * 1e6:6.2f} us/row  {len(rows) / elapsed:12,.0f} rows/s")
+    for kind in ('distinct', 'cycled'):
+        speedup = results[f'legacy, {kind} rows'] / results[f'shared parser, {kind} rows']
+        print(f"Speedup on {kind} rows: {speedup:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
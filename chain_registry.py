@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import re
+import threading
+
+DEFAULT_CACHE_PATH = 'chain_registry.json'
+
+# Chain labels shown by the app and the chain IDs used by the DexScreener API
+CHAINS = (
+    ('ETHEREUM', 'ethereum'),
+    ('BASE', 'base'),
+    ('BSC', 'bsc'),
+    ('SOLANA', 'solana'),
+    ('ARBITRUM', 'arbitrum'),
+    ('AVALANCHE', 'avalanche'),
+    ('POLYGON', 'polygon'),
+    ('OPTIMISM', 'optimism'),
+    ('SUI', 'sui'),
+    ('TON', 'ton'),
+    ('CELO', 'celo'),
+    ('PULSECHAIN', 'pulsechain'),
+    ('OSMOSIS', 'osmosis'),
+    ('MANTLE', 'mantle'),
+    ('SEIV2', 'seiv2'),
+    ('FANTOM', 'fantom'),
+    ('BLAST', 'blast'),
+    ('APTOS', 'aptos'),
+    ('LINEA', 'linea'),
+    ('CRONOS', 'cronos'),
+    ('STARKNET', 'starknet'),
+    ('CORE', 'core'),
+    ('TRON', 'tron'),
+    ('HEDERA', 'hedera'),
+    ('MOONBEAM', 'moonbeam'),
+    ('SCROLL', 'scroll'),
+    ('METIS', 'metis'),
+    ('CARDANO', 'cardano'),
+    ('ZKSYNC', 'zksync'),
+    ('GNOSIS CHAIN', 'gnosischain'),
+    ('NEAR', 'near'),
+    ('ALGORAND', 'algorand'),
+    ('MULTIVERSX', 'multiversx'),
+    ('POLYGON ZKEVM', 'polygonzkevm'),
+    ('MANTA', 'manta'),
+    ('HYPER LIQUID', 'hyperliquid'),
+    ('MERLIN CHAIN', 'merlinchain'),
+    ('FLARE', 'flare'),
+    ('WORLD CHAIN', 'worldchain'),
+    ('KAVA', 'kava'),
+    ('IOTEX', 'iotex'),
+    ('OPBNB', 'opbnb'),
+    ('AURORA', 'aurora'),
+    ('CONFLUX', 'conflux'),
+    ('CANTO', 'canto'),
+    ('MODE', 'mode'),
+    ('APECHAIN', 'apechain'),
+    ('ICP', 'icp'),
+    ('ASTAR', 'astar'),
+    ('INJECTIVE', 'injective'),
+    ('BEAM', 'beam'),
+    ('BOUNCEBIT', 'bouncebit'),
+    ('MOONRIVER', 'moonriver'),
+    ('FILECOIN', 'filecoin'),
+)
+
+CHAIN_ID_PATTERN = re.compile(r'^[a-z0-9]+$')
+
+MAX_GENERIC_LABELS = 1000  # Labels remembered as "not a chain name"
+
+
+def normalize_label(label):
+    return ' '.join(label.upper().split())
+
+
+# Normalized label -> chain ID. Duplicate labels and malformed IDs are errors, not silent overrides.
+def build_label_index(chains):
+    labels = {}
+    for label, chain_id in chains:
+        if not CHAIN_ID_PATTERN.match(chain_id):
+            raise ValueError(f"Invalid chain ID '{chain_id}' for label '{label}'")
+        key = normalize_label(label)
+        if key in labels:
+            raise ValueError(f"Chain label '{label}' is listed twice")
+        labels[key] = chain_id
+    return labels
+
+
+# Maps the chain label of a detail page to a DexScreener chain ID.
+# A page matches when one of its labels is a registered label. Chains missing from CHAINS are learned:
+# IDs from the `chainId` of API responses, labels from the pages of tokens whose chain was
+# resolved through the API. Learned entries are cached in a JSON file.
+class ChainRegistry:
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, chains=CHAINS):
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self.labels = build_label_index(chains)
+        self.builtin_chain_ids = frozenset(self.labels.values())
+        self.chain_ids = set(self.builtin_chain_ids)
+        self.learned_labels = {}  # normalized label -> chain ID, learned at run time
+        self.pending = {}  # chain ID -> labels present on every page of that chain seen so far
+        self.generic = set()  # Labels seen next to another chain's label, so not chain names
+        self._load()
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Could not read the chain cache {self.cache_path}: {e}")
+            return
+        self.chain_ids.update(chain_id for chain_id in cache.get('chain_ids', []) if CHAIN_ID_PATTERN.match(chain_id))
+        for label, chain_id in cache.get('labels', {}).items():
+            if CHAIN_ID_PATTERN.match(chain_id) and normalize_label(label) not in self.labels:
+                self.learned_labels[normalize_label(label)] = chain_id
+        self.labels.update(self.learned_labels)
+        self.pending = {chain_id: set(labels) for chain_id, labels in cache.get('pending', {}).items()}
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        cache = {
+            'chain_ids': sorted(self.chain_ids - self.builtin_chain_ids),
+            'labels': dict(sorted(self.learned_labels.items())),
+            'pending': {chain_id: sorted(labels) for chain_id, labels in sorted(self.pending.items())},
+        }
+        tmp_path = f'{self.cache_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=4)
+        os.replace(tmp_path, self.cache_path)
+
+    # (label, chain ID) of the registered label that names a chain, or ("", "") when none does.
+    # A label that merely spells a chain ID is not accepted: a token or DEX button such as "Sonic"
+    # would be taken for the chain. Such pages are resolved through the API and their label learned.
+    def match(self, labels):
+        with self.lock:
+            found = next(((label, self.labels[normalize_label(label)]) for label in labels
+                          if normalize_label(label) in self.labels), None)
+            if found is not None:
+                if len(self.generic) < MAX_GENERIC_LABELS:
+                    self.generic.update(normalize_label(label) for label in labels if label != found[0])
+                return found
+        logging.warning(f"No known chain among the page labels {labels}; it will be resolved through the API")
+        return "", ""
+
+    # Record chain IDs seen in API responses
+    def learn_chain_ids(self, chain_ids):
+        with self.lock:
+            new_ids = {chain_id for chain_id in chain_ids
+                       if chain_id and CHAIN_ID_PATTERN.match(chain_id) and chain_id not in self.chain_ids}
+            if not new_ids:
+                return
+            self.chain_ids.update(new_ids)
+            self._save()
+        logging.info(f"Learned chain IDs from the API: {', '.join(sorted(new_ids))}")
+
+    # Learn the label of a chain resolved through the API from the labels of one of its pages.
+    # A label is adopted once it is the only one present on every page of that chain and never
+    # seen next to another chain's label.
+    def learn_label(self, chain_id, labels):
+        self.learn_chain_ids([chain_id])
+        with self.lock:
+            candidates = {normalize_label(label) for label in labels}
+            # Without candidates left from earlier pages (none yet, or the layout changed), start over from this page
+            candidates &= self.pending.get(chain_id) or candidates
+            candidates -= self.generic
+            label = None
+            if len(candidates) == 1:
+                label = candidates.pop()
+                self.learned_labels[label] = self.labels[label] = chain_id
+                self.pending.pop(chain_id, None)
+            elif candidates:
+                self.pending[chain_id] = candidates
+            else:
+                self.pending.pop(chain_id, None)
+            self._save()
+        if label is not None:
+            logging.info(f"Learned chain label '{label}' for '{chain_id}'")
+        return label
+
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+# Registry shared by the capture code, cached in chain_registry.json
+def default_registry():
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = ChainRegistry()
+        return _default_registry
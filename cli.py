@@ -0,0 +1,35 @@
+import argparse
+import importlib
+import sys
+
+# Subcommand -> (module, help). A module is imported only when its subcommand runs, so the
+# API-only commands never load Appium or Selenium and no driver is created before `listen`,
+# `monitor` or `coordinate` actually needs one.
+COMMANDS = {
+    'listen': ('dexscreenerlistener', 'Capture hashes and simulated purchases for the newest tokens (phone)'),
+    'monitor': ('get_newest_tokens', 'Monitor the Newest list and store new tokens (phone)'),
+    'discover': ('api_discovery', 'Discover new tokens from the DexScreener API and store them (no phone)'),
+    'coordinate': ('multi_device_coordinator', 'Share capture between several phones or emulators'),
+    'update-prices': ('get_updated_token_price', 'Update the simulated purchases from the DexScreener API'),
+    'analyze': ('portfolio_analytics', 'Portfolio analytics over simulated purchases and tracked prices'),
+    'latency': ('latency_report', 'Listing-to-purchase latency percentiles and SLO check'),
+    'backtest': ('backtester', 'Backtest entry filters and exit rules on recorded listings'),
+    'store': ('columnar_store', 'Export the capture history to a columnar, memory-mapped store'),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DexScreener token capture and analysis.')
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='command')
+    for name, (_, help_text) in COMMANDS.items():
+        # Options are parsed by the subcommand's own module, including --help
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    args, remaining = parser.parse_known_args(argv)
+
+    # Shown by the subcommand's parser as "usage: cli.py <command> ..."
+    sys.argv[0] = f'{parser.prog} {args.command}'
+    return importlib.import_module(COMMANDS[args.command][0]).main(remaining)
+
+
+if __name__ == '__main__':
+    main()
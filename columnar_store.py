@@ -0,0 +1,403 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+
+from chain_registry import CHAIN_ID_PATTERN
+from drilldown_scheduler import parse_change
+from get_updated_token_price import iter_purchases
+from price_history import read_observations
+from token_identity import DATE_FORMAT, parse_age
+from token_parsing import parse_amount, parse_price
+from token_store import TokenStore
+
+DEFAULT_ROOT = 'history_store'
+MANIFEST_NAME = '_manifest.json'
+ROWS_PER_PART = 100_000  # Rows buffered per partition before a part is written
+MAX_BUFFERED_ROWS = 200_000  # Rows buffered over all partitions before every buffer is written
+UNKNOWN = 'unknown'  # Partition of rows without a date or a known chain
+
+# Columns of a Newest-list row, shared by the tokens and pairs datasets: (column, kind, source fields).
+# Numeric columns take the parsed value when the record has one, else parse the displayed text.
+ROW_COLUMNS = [
+    ('token_name', 'str', ('Token Name',)),
+    ('project_name', 'str', ('Project Name',)),
+    ('chain_id', 'str', ('Chain ID',)),
+    ('pair_id', 'str', ('Full Hash 1',)),
+    ('token_address', 'str', ('Full Hash 2',)),
+    ('age_s', 'age', ('Time',)),
+    ('price_usd', 'price', ('Price USD',)),
+    ('change_pct', 'change', ()),
+    ('liquidity_usd', 'float', ('Liquidity USD', 'Liquidity')),
+    ('volume_usd', 'float', ('Volume USD', 'Volume')),
+    ('market_cap_usd', 'float', ('Market Cap USD', 'Market Cap')),
+]
+
+# Exported datasets: default source, column partitioned by day, and typed columns
+DATASETS = {
+    'tokens': {
+        'source': 'tokens_data.sqlite',
+        'time': 'detected_at',
+        'columns': [('detected_at', 'time', ('Analyzed Date', 'Detected At'))] + ROW_COLUMNS + [
+            ('source', 'str', ('Source',)),
+        ],
+    },
+    'pairs': {
+        'source': 'pair_hash.json',
+        'time': 'detected_at',
+        'columns': [('detected_at', 'time', ('Detected At', 'Analyzed Date', 'Drill Started At'))] + ROW_COLUMNS + [
+            ('hash_source', 'str', ('Hash Source',)),
+        ],
+    },
+    'purchases': {
+        'source': 'simulated_purchases.json',
+        'time': 'purchased_at',
+        'columns': [
+            ('purchased_at', 'time', ('Purchase Date',)),
+            ('token_name', 'str', ('Token Name',)),
+            ('chain_id', 'str', ('Chain ID',)),
+            ('pair_id', 'str', ('Full Hash 1',)),
+            ('token_address', 'str', ('Full Hash 2',)),
+            ('purchase_price', 'float', ('Purchase Price',)),
+            ('amount_usd', 'float', ('Purchase Amount ($)',)),
+            ('tokens', 'float', ('Amount of Tokens Purchased',)),
+            ('age_s', 'age', ('Time',)),
+            ('detected_at', 'time', ('Detected At',)),
+            ('drill_started_at', 'time', ('Drill Started At',)),
+        ],
+    },
+    'results': {
+        'source': 'purchase_results.json',
+        'time': 'updated_at',
+        'columns': [
+            ('updated_at', 'time', ('Last Updated',)),
+            ('token_name', 'str', ('Token Name',)),
+            ('chain_id', 'str', ('Chain ID',)),
+            ('pair_id', 'str', ('Pair ID',)),
+            ('purchased_at', 'time', ('Purchase Date',)),
+            ('purchase_price', 'float', ('Purchase Price',)),
+            ('current_price', 'float', ('Current Price',)),
+            ('amount_usd', 'float', ('Purchase Amount ($)',)),
+            ('value_usd', 'float', ('Current Investment Value ($)',)),
+            ('profit_loss_usd', 'float', ('Profit/Loss Amount ($)',)),
+            ('profit_loss_pct', 'float', ('Profit/Loss Percentage (%)',)),
+            ('liquidity_usd', 'float', ('Liquidity USD',)),
+            ('fdv', 'float', ('Market Cap (FDV)',)),
+            ('volume_h24', 'float', ('Volume 24h',)),
+            ('buys_h24', 'float', ('Buys 24h',)),
+            ('sells_h24', 'float', ('Sells 24h',)),
+        ],
+    },
+    'prices': {
+        'source': 'price_history.csv',
+        'time': 'timestamp',
+        'columns': [
+            ('timestamp', 'time', ('timestamp',)),
+            ('chain_id', 'str', ('chain_id',)),
+            ('pair_id', 'str', ('pair_id',)),
+            ('price_usd', 'float', ('price_usd',)),
+            ('liquidity_usd', 'float', ('liquidity_usd',)),
+            ('fdv', 'float', ('fdv',)),
+            ('volume_h24', 'float', ('volume_h24',)),
+            ('buys_h24', 'float', ('buys_h24',)),
+            ('sells_h24', 'float', ('sells_h24',)),
+        ],
+    },
+}
+
+
+def _first(record, fields):
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, '', 'N/A'):
+            return value
+    return None
+
+
+# Number from an API or parsed value, or from displayed text such as "$12.3K"; NaN when missing
+def _number(value):
+    if value is None or isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return parse_amount(value) if '$' in str(value) else np.nan
+
+
+# Local "%Y-%m-%d %H:%M:%S" dates and Unix timestamps to Unix timestamps; NaN when missing
+def _timestamp(value):
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, DATE_FORMAT).timestamp()
+        except ValueError:
+            pass
+    return _number(value)
+
+
+def column_value(record, kind, fields):
+    if kind == 'str':
+        value = _first(record, fields)
+        return '' if value is None else str(value)
+    if kind == 'time':
+        return _timestamp(_first(record, fields))
+    if kind == 'age':
+        age = parse_age(_first(record, fields))
+        return np.nan if age is None else float(age)
+    if kind == 'change':
+        change = parse_change(record)
+        return np.nan if change is None else change
+    if kind == 'price':
+        price = _number(_first(record, fields))
+        if np.isnan(price):
+            price = parse_price(record.get('Price') or '', record.get('Additional Value') or '')
+        return np.nan if price is None else price
+    return _number(_first(record, fields))
+
+
+# Typed ROW_COLUMNS of Newest-list records, as arrays like ColumnarStore.read returns. Fields a
+# record lacks are read from the displayed text, as in the exported datasets.
+def row_columns(records, columns):
+    spec = {column: (kind, fields) for column, kind, fields in ROW_COLUMNS}
+    return {column: np.array([column_value(record, *spec[column]) for record in records],
+                             dtype=object if spec[column][0] == 'str' else np.float64)
+            for column in columns}
+
+
+# (day, chain) partition of a row, from its time column (local date) and chain ID
+def partition_of(timestamp, chain_id):
+    day = UNKNOWN if np.isnan(timestamp) else datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
+    chain = chain_id if chain_id and CHAIN_ID_PATTERN.match(chain_id) else UNKNOWN
+    return day, chain
+
+
+# Writes one dataset into a temporary directory, one .npy file per column and part, and
+# replaces the previous export only once every part and the manifest are written.
+# String columns are dictionary-encoded per part: the distinct values, UTF-8 encoded, in
+# <column>.values.npy and the smallest integer codes that fit in <column>.npy.
+class DatasetWriter:
+    def __init__(self, root, name, rows_per_part=ROWS_PER_PART):
+        self.root = root
+        self.name = name
+        self.spec = DATASETS[name]
+        self.rows_per_part = rows_per_part
+        self.tmp_path = os.path.join(root, f'{name}.tmp')
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.buffers = {}  # (day, chain) -> column -> values
+        self.buffered = 0
+        self.parts = []
+
+    def add(self, record):
+        values = {column: column_value(record, kind, fields) for column, kind, fields in self.spec['columns']}
+        key = partition_of(values[self.spec['time']], values.get('chain_id'))
+        buffer = self.buffers.setdefault(key, {column: [] for column in values})
+        for column, value in values.items():
+            buffer[column].append(value)
+        self.buffered += 1
+        if len(buffer[self.spec['time']]) >= self.rows_per_part:
+            self._flush(key)
+        elif self.buffered >= MAX_BUFFERED_ROWS:
+            for key in list(self.buffers):
+                self._flush(key)
+
+    def _flush(self, key):
+        buffer = self.buffers.pop(key)
+        day, chain = key
+        rows = len(buffer[self.spec['time']])
+        self.buffered -= rows
+        index = sum(1 for part in self.parts if (part['date'], part['chain']) == key)
+        relative_path = f'date={day}/chain={chain}/part-{index:05d}'
+        os.makedirs(os.path.join(self.tmp_path, relative_path))
+        for column, kind, _ in self.spec['columns']:
+            path = os.path.join(self.tmp_path, relative_path, column)
+            if kind == 'str':
+                values, codes = np.unique(np.array(buffer[column], dtype=str), return_inverse=True)
+                np.save(f'{path}.values.npy', np.char.encode(values, 'utf-8'))
+                np.save(f'{path}.npy', codes.astype(np.min_scalar_type(len(values) - 1)))
+            else:
+                np.save(f'{path}.npy', np.array(buffer[column], dtype=np.float64))
+        self.parts.append({'path': relative_path, 'date': day, 'chain': chain, 'rows': rows})
+
+    def close(self, source):
+        for key in list(self.buffers):
+            self._flush(key)
+        self.parts.sort(key=lambda part: (part['date'], part['chain'], part['path']))
+        manifest = {
+            'dataset': self.name,
+            'source': source,
+            'exported_at': datetime.now().strftime(DATE_FORMAT),
+            'rows': sum(part['rows'] for part in self.parts),
+            'time_column': self.spec['time'],
+            'columns': {column: kind for column, kind, _ in self.spec['columns']},
+            'parts': self.parts,
+        }
+        with open(os.path.join(self.tmp_path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=4)
+
+        final_path = os.path.join(self.root, self.name)
+        old_path = os.path.join(self.root, f'{self.name}.old')
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(final_path):
+            os.replace(final_path, old_path)
+        os.replace(self.tmp_path, final_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return manifest
+
+
+# Records of a dataset's source file, streamed
+def iter_source(name, path):
+    if name == 'tokens':
+        if path.endswith('.json'):
+            yield from iter_purchases(path)
+            return
+        store = TokenStore(path)
+        try:
+            yield from store.iter_tokens()
+        finally:
+            store.close()
+    elif name == 'prices':
+        yield from read_observations(path)
+    else:
+        # JSON arrays, or JSON Lines for the results of update-prices --stream
+        yield from iter_purchases(path)
+
+
+def export_dataset(name, source=None, root=DEFAULT_ROOT, rows_per_part=ROWS_PER_PART):
+    source = source or DATASETS[name]['source']
+    if name == 'results' and not os.path.exists(source) and os.path.exists(source + 'l'):
+        source += 'l'  # purchase_results.jsonl written by the streaming mode
+    os.makedirs(root, exist_ok=True)
+    writer = DatasetWriter(root, name, rows_per_part)
+    try:
+        for record in iter_source(name, source):
+            writer.add(record)
+    except BaseException:
+        shutil.rmtree(writer.tmp_path, ignore_errors=True)
+        raise
+    return writer.close(source)
+
+
+# Reader of the exported datasets. Partitions are selected from the manifest by day and chain,
+# and only the requested columns are opened, memory-mapped: nothing else is read from disk.
+class ColumnarStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.manifests = {}
+
+    def datasets(self):
+        return [name for name in DATASETS if os.path.exists(os.path.join(self.root, name, MANIFEST_NAME))]
+
+    def manifest(self, dataset):
+        if dataset not in self.manifests:
+            with open(os.path.join(self.root, dataset, MANIFEST_NAME), 'r') as f:
+                self.manifests[dataset] = json.load(f)
+        return self.manifests[dataset]
+
+    # Parts whose day is within [start, end] ('YYYY-MM-DD', inclusive) and whose chain is in chains.
+    # Rows without a date are only selected when no date bound is given.
+    def parts(self, dataset, start=None, end=None, chains=None):
+        selected = []
+        for part in self.manifest(dataset)['parts']:
+            if (start or end) and part['date'] == UNKNOWN:
+                continue
+            if (start and part['date'] < start) or (end and part['date'] > end):
+                continue
+            if chains is not None and part['chain'] not in chains:
+                continue
+            selected.append(part)
+        return selected
+
+    # One dict of columns per selected part: numeric columns memory-mapped, string columns decoded
+    def iter_parts(self, dataset, columns=None, start=None, end=None, chains=None):
+        kinds = self.manifest(dataset)['columns']
+        columns = list(columns or kinds)
+        missing = [column for column in columns if column not in kinds]
+        if missing:
+            raise KeyError(f"Unknown columns for '{dataset}': {', '.join(missing)}")
+        for part in self.parts(dataset, start, end, chains):
+            path = os.path.join(self.root, dataset, part['path'])
+            arrays = {}
+            for column in columns:
+                arrays[column] = np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r')
+                if kinds[column] == 'str':
+                    values = np.char.decode(np.load(os.path.join(path, f'{column}.values.npy')), 'utf-8')
+                    arrays[column] = values[arrays[column]]
+            yield arrays
+
+    # Selected columns over the selected parts. The numeric columns of a single part are
+    # returned as memory maps; several parts are concatenated.
+    def read(self, dataset, columns=None, start=None, end=None, chains=None):
+        kinds = self.manifest(dataset)['columns']
+        columns = list(columns or kinds)
+        parts = list(self.iter_parts(dataset, columns, start, end, chains))
+        if len(parts) == 1:
+            return parts[0]
+        return {column: np.concatenate([part[column] for part in parts]) if parts
+                else np.array([], dtype=str if kinds[column] == 'str' else np.float64)
+                for column in columns}
+
+    def to_frame(self, dataset, columns=None, start=None, end=None, chains=None):
+        import pandas as pd
+        return pd.DataFrame(self.read(dataset, columns, start, end, chains))
+
+
+def _directory_size(path):
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(path) for name in names)
+
+
+def print_info(store):
+    print(f"{'dataset':<12}{'rows':>10}{'parts':>7}{'chains':>8}  {'days':<25}{'size':>10}  exported")
+    for name in store.datasets():
+        manifest = store.manifest(name)
+        days = sorted({part['date'] for part in manifest['parts'] if part['date'] != UNKNOWN})
+        chains = {part['chain'] for part in manifest['parts']}
+        span = f"{days[0]} .. {days[-1]}" if days else '-'
+        size = _directory_size(os.path.join(store.root, name)) / 1e6
+        print(f"{name:<12}{manifest['rows']:>10}{len(manifest['parts']):>7}{len(chains):>8}  {span:<25}"
+              f"{size:>8.1f}MB  {manifest['exported_at']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Columnar, memory-mapped export of the capture history.')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='Directory of the columnar store')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Rebuild datasets from the JSON, CSV and SQLite files')
+    export_parser.add_argument('datasets', nargs='*', metavar='dataset',
+                               help=f"Datasets to export among {', '.join(DATASETS)} "
+                                    f"(default: every one whose source file exists)")
+    for name, spec in DATASETS.items():
+        export_parser.add_argument(f'--{name}-source', default=spec['source'], help=f'Source of the {name} dataset')
+    export_parser.add_argument('--rows-per-part', type=int, default=ROWS_PER_PART,
+                               help='Maximum rows per part file of a partition')
+    subparsers.add_parser('info', help='Show the exported datasets')
+    args = parser.parse_args(argv)
+    unknown = [name for name in getattr(args, 'datasets', []) if name not in DATASETS]
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(unknown)}")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.command == 'export':
+        for name in args.datasets or DATASETS:
+            source = getattr(args, f'{name}_source')
+            exists = os.path.exists(source) or (name == 'results' and os.path.exists(source + 'l'))
+            if not exists:
+                if args.datasets:
+                    logging.warning(f"Source {source} of the {name} dataset not found")
+                continue
+            start_time = perf_counter()
+            manifest = export_dataset(name, source, args.root, args.rows_per_part)
+            logging.info(f"Exported {manifest['rows']} rows of {manifest['source']} to {args.root}/{name} "
+                         f"in {len(manifest['parts'])} parts ({perf_counter() - start_time:.2f} seconds)")
+    print_info(ColumnarStore(args.root))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import hashlib
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import time
+
+DEFAULT_WINDOW = 7 * 86_400  # Seconds a claimed key is remembered in memory
+DEFAULT_MAX_ENTRIES = 20_000  # Keys held in the exact in-memory LRU
+DEFAULT_BLOOM_CAPACITY = 100_000  # Keys per Bloom filter generation
+DEFAULT_ERROR_RATE = 0.001
+
+
+# Fixed-size Bloom filter: no false negatives, false positives at about error_rate
+# while at most `capacity` keys have been added
+class BloomFilter:
+    def __init__(self, capacity=DEFAULT_BLOOM_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.started = time()
+
+    # Double hashing over one 128-bit digest
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+# Thread-safe "process once" index shared by capture workers.
+# claim() is atomic: exactly one caller gets True for a given key. With a
+# db_path, claims are stored in SQLite so separate processes and later runs
+# see the same set.
+#
+# Memory stays flat however long the process runs: exact keys live in an LRU bounded
+# by max_entries and by the time window, and two rotating Bloom filter generations
+# remember older keys. Without a database a key the filters report is treated as
+# seen; with one, the filters only decide whether the database needs to be checked,
+# and claim() still relies on the primary key so a key is never claimed twice.
+class DedupeIndex:
+    def __init__(self, db_path=None, window=DEFAULT_WINDOW, max_entries=DEFAULT_MAX_ENTRIES,
+                 bloom_capacity=DEFAULT_BLOOM_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.window = window
+        self.max_entries = max_entries
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self.recent = OrderedDict()  # key -> last claimed/seen time, oldest first
+        self.filters = [BloomFilter(bloom_capacity, error_rate)]
+        self.released = set()  # Released keys the Bloom filters still report, without a database
+        self.lock = threading.Lock()
+        self.db_hits = 0
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute('CREATE TABLE IF NOT EXISTS claims (token_key TEXT PRIMARY KEY, claimed_at REAL NOT NULL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS claims_claimed_at ON claims (claimed_at)')
+            self.seed(self.db.execute(
+                'SELECT token_key, claimed_at FROM claims WHERE claimed_at >= ? ORDER BY claimed_at',
+                (time() - window,)
+            ))
+
+    def __len__(self):
+        return len(self.recent)
+
+    def _remember(self, key, now):
+        self.recent[key] = now
+        self.recent.move_to_end(key)
+        while self.recent and (len(self.recent) > self.max_entries
+                               or next(iter(self.recent.values())) < now - self.window):
+            self.recent.popitem(last=False)
+
+        current = self.filters[-1]
+        if current.count >= self.bloom_capacity or now - current.started >= self.window:
+            # Keep the previous generation so keys are forgotten after one to two windows
+            self.filters = [current, BloomFilter(self.bloom_capacity, self.error_rate)]
+        if key not in self.filters[-1]:
+            self.filters[-1].add(key)
+
+    def _seen(self, key, now):
+        claimed_at = self.recent.get(key)
+        if claimed_at is not None and claimed_at >= now - self.window:
+            self.recent.move_to_end(key)
+            return True
+        if key in self.released or not any(key in bloom for bloom in self.filters):
+            return False
+        if self.db is None:
+            return True
+        self.db_hits += 1
+        if self.db.execute('SELECT 1 FROM claims WHERE token_key = ?', (key,)).fetchone() is None:
+            return False
+        self._remember(key, now)
+        return True
+
+    # Load keys already known elsewhere (e.g. a token store) without writing them.
+    # `keys` yields keys or (key, claimed_at) pairs, oldest first.
+    def seed(self, keys):
+        now = time()
+        with self.lock:
+            for item in keys:
+                key, claimed_at = item if isinstance(item, tuple) else (item, now)
+                self._remember(key, claimed_at)
+
+    def __contains__(self, key):
+        with self.lock:
+            return self._seen(key, time())
+
+    # Mark key as taken; returns False if it, or one of its aliases, was already claimed.
+    # A key whose alias was claimed is remembered too, so that the token is still recognised once
+    # its identity has moved on and that alias is no longer among its aliases.
+    def claim(self, key, aliases=()):
+        now = time()
+        with self.lock:
+            if self._seen(key, now):
+                return False
+            if any(self._seen(alias, now) for alias in aliases):
+                if self.db is not None:
+                    self.db.execute('INSERT OR IGNORE INTO claims (token_key, claimed_at) VALUES (?, ?)', (key, now))
+                self._remember(key, now)
+                return False
+            if self.db is not None:
+                cursor = self.db.execute(
+                    'INSERT OR IGNORE INTO claims (token_key, claimed_at) VALUES (?, ?)', (key, now)
+                )
+                if cursor.rowcount == 0:
+                    self._remember(key, now)
+                    return False
+            self.released.discard(key)
+            self._remember(key, now)
+            return True
+
+    # Give up a claim, e.g. for a token whose drill-down failed, so that it can be claimed again
+    def release(self, key):
+        if key is None:
+            return
+        with self.lock:
+            self.recent.pop(key, None)
+            if self.db is not None:
+                self.db.execute('DELETE FROM claims WHERE token_key = ?', (key,))
+            else:
+                self.released.add(key)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'recent': len(self.recent),
+                'bloom_keys': sum(bloom.count for bloom in self.filters),
+                'bloom_bytes': sum(len(bloom.bits) for bloom in self.filters),
+                'db_lookups': self.db_hits,
+            }
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,149 @@
+import threading
+from time import monotonic, sleep
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_BASE_URL = 'https://api.dexscreener.com'
+
+# Published DexScreener quota for the pairs/tokens/search endpoints
+REQUESTS_PER_MINUTE = 300
+
+# Seconds before a request is abandoned (connect, read)
+REQUEST_TIMEOUT = (5, 15)
+
+# Number of times a 429 response is retried after waiting for Retry-After
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+# Token bucket shared by every thread issuing API requests
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1, rate_per_minute // 60)
+        self.tokens = float(self.capacity)
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    # Block until a token is available, then consume it
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            sleep(wait_time)
+
+
+# Latency and throughput of the API requests issued during a run
+class RequestStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.started = None
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok=True):
+        with self.lock:
+            if self.started is None:
+                self.started = monotonic() - latency
+            self.latencies.append(latency)
+            if not ok:
+                self.errors += 1
+
+    def percentile(self, pct):
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        index = min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def summary(self):
+        elapsed = monotonic() - self.started if self.started is not None else 0.0
+        count = len(self.latencies)
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'elapsed_s': elapsed,
+            'requests_per_s': count / elapsed if elapsed > 0 else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+        }
+
+
+# Shared keep-alive session so concurrent workers reuse pooled connections
+def create_session(pool_size=16):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept': 'application/json'})
+    return session
+
+
+session = create_session()
+rate_limiter = TokenBucket(REQUESTS_PER_MINUTE)
+stats = RequestStats()
+
+# Callables notified of every request as observer(path, latency, ok), e.g. instrumentation.instrument_api
+request_observers = []
+
+
+# Resize the shared connection pool to match the number of worker threads
+def configure_pool(pool_size):
+    global session
+    session = create_session(pool_size)
+
+
+def _record(path, latency, ok):
+    stats.record(latency, ok)
+    for observer in request_observers:
+        observer(path, latency, ok)
+
+
+# GET an API path through the shared session and a rate limiter (the shared one by default),
+# retrying 429 responses, and return the response
+def _get(path, params=None, headers=None, limiter=None):
+    limiter = limiter or rate_limiter
+    url = f'{API_BASE_URL}{path}'
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        limiter.acquire()
+        start = monotonic()
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException:
+            _record(path, monotonic() - start, ok=False)
+            raise
+        _record(path, monotonic() - start, ok=response.ok or response.status_code == 304)
+        if response.status_code == 429 and attempt < MAX_RATE_LIMIT_RETRIES:
+            retry_after = response.headers.get('Retry-After', '')
+            sleep(float(retry_after) if retry_after.replace('.', '', 1).isdigit() else 2 ** attempt)
+            continue
+        response.raise_for_status()
+        return response
+
+
+# GET an API path through the shared session and rate limiter, returning the decoded JSON
+def api_get(path, params=None):
+    return _get(path, params).json()
+
+
+# Conditional GET. `validators` holds the ETag and Last-Modified of the previous response.
+# Returns (data, validators), with data None when the server answers 304 Not Modified.
+def api_get_if_changed(path, validators=None, limiter=None):
+    validators = validators or {}
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    response = _get(path, headers=headers, limiter=limiter)
+    if response.status_code == 304:
+        return None, validators
+    return response.json(), {'etag': response.headers.get('ETag'),
+                             'last_modified': response.headers.get('Last-Modified')}
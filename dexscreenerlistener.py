@@ -1,214 +1,52 @@
+import argparse
 import logging
+import os
 from datetime import datetime
-from appium import webdriver
-from appium.options.android import UiAutomator2Options
 from appium.webdriver.common.appiumby import AppiumBy
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import StaleElementReferenceException, NoSuchElementException
+from selenium.common.exceptions import (InvalidElementStateException, NoSuchElementException,
+                                        StaleElementReferenceException, TimeoutException, WebDriverException)
 from appium.webdriver.extensions.clipboard import Clipboard
 import json
+from statistics import median
 from time import sleep, time
 
-# Map blockchain name to chain ID used by DexScreener API
-blockchain_name_to_chain_id = {
-                'ETHEREUM': 'ethereum',
-                'BASE': 'base',
-                'BSC': 'bsc',
-                'SOLANA': 'solana',
-                'ARBITRUM': 'arbitrum',
-                'AVALANCHE': 'avalanche',
-                'POLYGON': 'polygon',
-                'OPTIMISM': 'optimism',
-                'SUI': 'sui',
-                'TON': 'ton',
-                'CELO': 'celo',
-                'PULSECHAIN': 'pulsechain',
-                'OSMOSIS': 'osmosis',
-                'MANTLE': 'mantle',
-                'SEIV2': 'seiv2',
-                'FANTOM': 'famtom',
-                'BLAST': 'blast',
-                'APTOS': 'aptos',
-                'LINEA': 'linea',
-                'CRONOS': 'cronos',
-                'STARKNET': 'starknet',
-                'CORE': 'core',
-                'TRON': 'tron',
-                'HEDERA': 'hedera',
-                'MOONBEAM': 'moonbeam',
-                'SCROLL': 'scroll',
-                'METIS': 'metis',
-                'CARDANO': 'cardano',
-                'ZKSYNC': 'zksync',
-                'GNOSIS CHAIN': 'gnosischain',
-                'NEAR': 'near',
-                'ALGORAND': 'algorand',
-                'MULTIVERSX': 'multiversx',
-                'POLYGON ZKEVM': 'polygonzkevm',
-                'MANTA': 'manta',
-                'HYPER LIQUID': 'hyperliquid',
-                'MERLIN CHAIN': 'merlinchain',
-                'FLARE': 'flare',
-                'WORLD CHAIN': 'worldchain',
-                'KAVA': 'kava',
-                'WORLD CHAIN': 'worldchain',
-                'IOTEX': 'iotex',
-                'OPBNB': 'opbnb',
-                'AURORA': 'aurora',
-                'CONFLUX': 'conflux',
-                'CANTO': 'canto',
-                'MODE': 'mode',
-                'APECHAIN': 'apechain',
-                'ICP': 'icp',
-                'ASTAR': 'astar',
-                'INJECTIVE': 'injective',
-                'BEAM': 'beam',
-                'BOUNCEBIT': 'bouncebit',
-                'MOONDRIVER': 'moondriver',
-                'FILECOIN': 'filecoin',
-                # Add more elements if needed
-            }
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# Set up the options
-options = UiAutomator2Options()
-options.platformName = 'Android'
-options.deviceName = '4672d93b' # Replace by your device ID
-options.appPackage = 'com.dexscreener'
-options.appActivity = 'com.dexscreener.MainActivity'
-options.noReset = True
-
-# Additional capabilities
-additional_caps = {
-    'skipUnlock': True,
-    'disableWindowAnimation': True,
-    'uiautomator2ServerInstallTimeout': 60000,
-    'ignoreHiddenApiPolicyError': True
-}
-options.load_capabilities(additional_caps)
-
-# Initialize the driver and start the timer
-logging.info("Initializing the Appium driver")
-start_time = time()
-driver = webdriver.Remote('http://localhost:4725/wd/hub', options=options)
-end_time = time()
-logging.info(f"Driver initialized. Time taken: {end_time - start_time:.2f} seconds")
-
-# Wait for the app to load
-sleep(8)
-def parse_liquidity(liquidity_str):
-    if not liquidity_str or liquidity_str in ['<', '<$1']:
-        return 0.0
-
-    liquidity_str = liquidity_str.replace('$', '').replace(',', '').strip().upper()
-    multiplier = 1
-    if 'K' in liquidity_str:
-        multiplier = 1_000
-        liquidity_str = liquidity_str.replace('K', '')
-    elif 'M' in liquidity_str:
-        multiplier = 1_000_000
-        liquidity_str = liquidity_str.replace('M', '')
-    elif 'B' in liquidity_str:
-        multiplier = 1_000_000_000
-        liquidity_str = liquidity_str.replace('B', '')
-
-    try:
-        return float(liquidity_str) * multiplier
-    except ValueError:
-        return 0.0
-
-# Function to clean and align the extracted data
-def clean_and_align_data(token_data):
-    # Retirer les éléments parasites comme "?" ou vides
-    filtered_data = [d for d in token_data if d.strip() and d.strip() != "?"]
-
-    cleaned_data = {
-        "Token Name": filtered_data[0] if len(filtered_data) > 0 else "N/A",
-        "Time": filtered_data[1] if len(filtered_data) > 1 else "N/A",
-        "Price": filtered_data[2] if len(filtered_data) > 2 else "N/A",
-        "Additional Value": "",
-        "Change Indicator": "",
-        "Change": "",
-        "Project Name": "",
-        "Liquidity": "",
-        "Volume": "",
-        "Market Cap": ""
-    }
-
-    index = 3
-
-    if len(filtered_data) > index and filtered_data[index].isdigit():
-        cleaned_data["Additional Value"] = filtered_data[index]
-        index += 1
-
-    cleaned_data["Change Indicator"] = filtered_data[index] if len(filtered_data) > index else ""
-    index += 1
-    cleaned_data["Change"] = filtered_data[index] if len(filtered_data) > index else ""
-    index += 1
-    cleaned_data["Project Name"] = filtered_data[index] if len(filtered_data) > index else ""
-    index += 1
-
-    while index < len(filtered_data):
-        key = filtered_data[index]
-        value = filtered_data[index + 1] if index + 1 < len(filtered_data) else ""
-        if key == "LIQ":
-            cleaned_data["Liquidity"] = value
-        elif key == "VOL":
-            cleaned_data["Volume"] = value
-        elif key == "MCAP":
-            cleaned_data["Market Cap"] = value
-        index += 2
-
-    return cleaned_data
-
-# Scroll function
+from appium_session import DEFAULT_DEVICE_NAME, DEFAULT_SERVER_URL, attach_driver, create_driver
+from dedupe_index import DedupeIndex
+from drilldown_scheduler import DEFAULT_MAX_ENTRY_AGE, DEFAULT_MIN_LIQUIDITY, DrillScheduler
+from address_extraction import (SOURCE_CLIPBOARD, SOURCE_SEARCH_API, SOURCE_SNAPSHOT, address_hints_from_snapshot,
+                                lookup_addresses_via_search, lookup_chain_via_search)
+from chain_registry import default_registry
+from token_parsing import parse_price, parse_row
+from token_identity import token_identities
+from hierarchy_snapshot import content_desc_view_groups, take_snapshot, token_rows
+from instrumentation import instrument, profile_cycle, profile_token
+from list_navigator import ListNavigator, swipe_vertical
+from waits import (clipboard_not_empty, log_wait_summary, text_view_present,
+                   token_list_present, wait_for)
+
+# Scroll function; the screen geometry is fetched once per session
 def scroll_down(driver):
     try:
-        # Get the screen size
-        window_size = driver.get_window_size()
-        start_x = window_size["width"] // 2
-        start_y = int(window_size["height"] * 0.8)
-        end_y = int(window_size["height"] * 0.2)
-
-        driver.swipe(start_x, start_y, start_x, end_y, 600)
+        swipe_vertical(driver, 0.8, 0.2)
     except Exception as e:
         logging.warning(f"Error during scrolling: {e}")
 
 # Scroll function adjusted for the home page to avoid bottom buttons
 def scroll_down_home_page(driver):
     try:
-        # Get the screen size
-        window_size = driver.get_window_size()
-        start_x = window_size["width"] // 2
-        start_y = int(window_size["height"] * 0.5)  # Start scroll higher on the screen
-        end_y = int(window_size["height"] * 0.2)    # End scroll higher to avoid bottom buttons
-
-        driver.swipe(start_x, start_y, start_x, end_y, 600)
+        # Start and end the scroll higher on the screen to avoid bottom buttons
+        swipe_vertical(driver, 0.5, 0.2)
     except Exception as e:
         logging.warning(f"Error during scrolling: {e}")
 
 # Scroll up function
 def scroll_up(driver):
     try:
-        # Get screen size
-        window_size = driver.get_window_size()
-        start_x = window_size["width"] // 2
-        start_y = int(window_size["height"] * 0.2)
-        end_y = int(window_size["height"] * 0.8)
-
-        driver.swipe(start_x, start_y, start_x, end_y, 600)
+        swipe_vertical(driver, 0.2, 0.8)
     except Exception as e:
         logging.warning(f"Error during scrolling up: {e}")
 
-# Scroll to the top of the app function
-def scroll_to_top(driver):
-    max_scroll_attempts = 10
-    for _ in range(max_scroll_attempts):
-        scroll_up(driver)
-        sleep(1)
-
 # Extract price info for a token
 def extract_price_from_detail_page(driver):
     try:
@@ -238,79 +76,34 @@ def extract_price_from_detail_page(driver):
         return None
 
 
-# Extract the last 8 tokens from the visible elements on the screen
+# Extract the last 8 tokens from the visible elements on the screen.
+# The hierarchy is fetched once and parsed locally; the returned rows are snapshot nodes.
 def extract_basic_token_data(driver):
     tokens_data = []
-    try:
-        logging.info("Sending request to locate ViewGroup elements with content-desc attribute")
-        request_time = datetime.now()
-        elements = driver.find_elements(AppiumBy.XPATH, '//android.view.ViewGroup[@content-desc]')
-        response_time = datetime.now()
-        logging.info(f"Response received. Request sent at: {request_time}, Response received at: {response_time}")
-
-        screen_bottom_y = 2040  # Start of the button area at the bottom of the screen
-        for element in elements:
-            try:
-                # Get the element's coordinates to ensure it is not in the button area
-                element_location = element.rect
-                if element_location['y'] >= screen_bottom_y:
-                    logging.info(f"Skipping element in button area: {element.get_attribute('content-desc')}")
-                    continue  # Skip this element as it is in the button area
-
-                content_desc = element.get_attribute('content-desc')
-                if content_desc and not any(keyword in content_desc for keyword in ["Trending", "Moonshot", "Newest"]):
-                    token_data = content_desc.split(', ')
-                    print(token_data)
-                    cleaned_data = clean_and_align_data(token_data)
-                    # Skip tokens with liquidity < $1
-                    liquidity_value = parse_liquidity(cleaned_data.get("Liquidity", ""))
-                    if liquidity_value < 1:
-                        logging.info(f"Token '{cleaned_data['Token Name']}' skipped due to low liquidity: {liquidity_value}")
-                        continue
-                    print(cleaned_data)
-                    tokens_data.append((element, cleaned_data))
-                    if len(tokens_data) >= 8:  # Stop after collecting 8 tokens
-                        break
-
-            except StaleElementReferenceException:
-                logging.warning("Encountered a stale element, skipping...")
-                continue
-
-    except StaleElementReferenceException:
-        logging.warning("Encountered a stale element reference, retrying...")
-        tokens_data = extract_basic_token_data(driver)
+    logging.info("Requesting page source snapshot")
+    request_time = datetime.now()
+    nodes = take_snapshot(driver)
+    response_time = datetime.now()
+    logging.info(f"Snapshot received. Request sent at: {request_time}, Response received at: {response_time}")
+
+    screen_bottom_y = 2040  # Start of the button area at the bottom of the screen
+    for node in token_rows(nodes, screen_bottom_y):
+        row = parse_row(node.content_desc)
+        # Skip tokens with liquidity < $1
+        if row.liquidity < 1:
+            logging.info(f"Token '{row.name}' skipped due to low liquidity: {row.liquidity}")
+            continue
+        cleaned_data = row.to_dict()
+        # The displayed age is relative to the snapshot, so the snapshot time is the detection time
+        cleaned_data["Detected At"] = response_time.strftime("%Y-%m-%d %H:%M:%S")
+        print(cleaned_data)
+        tokens_data.append((node, cleaned_data))
+        if len(tokens_data) >= 8:  # Stop after collecting 8 tokens
+            break
 
     return tokens_data
 
 
-# Function to ensure a token is visible by scrolling down until it's found
-def ensure_token_is_visible(driver, token_name):
-    max_scroll_attempts = 5  # Number of scroll attempts before giving up
-    scroll_attempts = 0
-
-    while scroll_attempts < max_scroll_attempts:
-        elements = driver.find_elements(AppiumBy.XPATH, '//android.view.ViewGroup[@content-desc]')
-        for element in elements:
-            try:
-                content_desc = element.get_attribute('content-desc')
-                if token_name in content_desc:
-                    logging.info(f"Token '{token_name}' found on attempt {scroll_attempts + 1}.")
-                    return element  # Token is found and returned
-
-            except StaleElementReferenceException:
-                logging.warning("Stale element encountered while searching for token, retrying...")
-
-        # If token is not found in the current view, scroll down and try again
-        logging.info(f"Token '{token_name}' not found, scrolling down (Attempt {scroll_attempts + 1})...")
-        scroll_down_home_page(driver)
-        sleep(3)  # Wait for new elements to load
-
-        scroll_attempts += 1
-
-    logging.warning(f"Token '{token_name}' not found after {max_scroll_attempts} attempts.")
-    return None  # Token wasn't found after the maximum number of scrolls
-
-
 # Function to check if the element is clearly visible and not obstructed by buttons
 def is_token_fully_visible(driver, element):
     try:
@@ -341,10 +134,11 @@ def clear_clipboard(driver):
     except Exception as e:
         logging.warning(f"Error while clearing clipboard: {e}")
 
-def extract_full_hashes_via_clipboard(driver, token_name, blockchain_name):
+def extract_full_hashes_via_clipboard(driver, token_name, blockchain_name, scroll=True):
     try:
-        scroll_down(driver)
-        sleep(2)
+        if scroll:
+            scroll_down(driver)
+            wait_for(driver, text_view_present("Pair"), 'pair_section')
         # Clear the clipboard before starting
         clear_clipboard(driver)
 
@@ -364,10 +158,9 @@ def extract_full_hashes_via_clipboard(driver, token_name, blockchain_name):
                 if pair_copy_button:
                     pair_copy_button.click()
                     logging.info("Clicked the first copy button after 'Pair'.")
-                    sleep(1)  # Wait for the hash to be copied to the clipboard
 
-                    # Retrieve the first hash from the clipboard
-                    first_hash = driver.get_clipboard_text()
+                    # Retrieve the first hash once the clipboard has been filled
+                    first_hash = wait_for(driver, clipboard_not_empty, 'clipboard') or "First hash not available"
                     logging.info(f"First hash retrieved from clipboard: {first_hash}")
                 else:
                     logging.warning("First copy button not found after 'Pair'.")
@@ -398,10 +191,9 @@ def extract_full_hashes_via_clipboard(driver, token_name, blockchain_name):
                 if token_copy_button:
                     token_copy_button.click()
                     logging.info("Clicked the second copy button after token name.")
-                    sleep(1)  # Wait for the hash to be copied to the clipboard
 
-                    # Retrieve the second hash from the clipboard
-                    second_hash = driver.get_clipboard_text()
+                    # Retrieve the second hash once the clipboard has been filled
+                    second_hash = wait_for(driver, clipboard_not_empty, 'clipboard') or "Second hash not available"
                     logging.info(f"Second hash retrieved from clipboard: {second_hash}")
                 else:
                     logging.warning("Second copy button not found after token name.")
@@ -419,147 +211,442 @@ def extract_full_hashes_via_clipboard(driver, token_name, blockchain_name):
         logging.warning(f"Error while extracting hashes via clipboard: {e}")
         return "Error retrieving hash", "Error retrieving hash"
 
-# Get the blockchain name of a token details page
-def get_blockchain_name(driver, token_info):
+# Retrieve the pair (first) and token (second) addresses of the open detail page.
+# Tries the hierarchy snapshot, then the DexScreener search API using the truncated
+# addresses as hints, and only falls back to the clipboard copy buttons last.
+# Returns (first_hash, second_hash, source).
+def extract_full_hashes(driver, token_name, blockchain_name, chain_id):
+    scroll_down(driver)
+    wait_for(driver, text_view_present("Pair"), 'pair_section')
+
+    pair_hint, token_hint = address_hints_from_snapshot(take_snapshot(driver), token_name)
+    if pair_hint is not None and pair_hint.full and token_hint is not None and token_hint.full:
+        logging.info(f"Addresses for '{token_name}' read from the hierarchy snapshot.")
+        return pair_hint.full, token_hint.full, SOURCE_SNAPSHOT
+
+    if chain_id:
+        addresses = lookup_addresses_via_search(token_name, chain_id, pair_hint, token_hint)
+        if addresses is not None and all(addresses):
+            logging.info(f"Addresses for '{token_name}' resolved through the search API.")
+            return addresses[0], addresses[1], SOURCE_SEARCH_API
+
+    logging.info(f"Falling back to the clipboard for '{token_name}'.")
+    first_hash, second_hash = extract_full_hashes_via_clipboard(driver, token_name, blockchain_name, scroll=False)
+    return first_hash, second_hash, SOURCE_CLIPBOARD
+
+# Get the blockchain name and chain ID of a token details page from one snapshot.
+# Returns (blockchain_name, chain_id, labels); labels are the page's clickable content-descs,
+# used to learn the name of a chain the registry does not know yet.
+def get_blockchain_name(driver, token_info, registry=None):
+    registry = registry or default_registry()
     try:
-        # Obtain all the android.view.ViewGroup with a non empty content-desc and clickable
-        elements = driver.find_elements(AppiumBy.XPATH, "//android.view.ViewGroup[@content-desc!='' and @clickable='true']")
-        logging.info(f"Found {len(elements)} elements with non-empty content-desc and clickable.")
-        blockchain_name = ""
-        for element in elements:
-            content_desc = element.get_attribute('content-desc')
-            logging.info(f"Found element with content-desc: '{content_desc}'")
-            # Verify if the content_desc is a known blockchain name
-            if content_desc.upper() in blockchain_name_to_chain_id:
-                blockchain_name = content_desc
-                logging.info(f"Blockchain name found: '{blockchain_name}'")
-                token_info["Blockchain Name"] = blockchain_name
-                break
-        if blockchain_name == "":
-            logging.warning("Blockchain name not found among elements with content-desc.")
-        return blockchain_name
+        # Obtain all the android.view.ViewGroup with a non empty content-desc and clickable from one snapshot
+        labels = [node.content_desc for node in content_desc_view_groups(take_snapshot(driver), clickable=True)]
+        logging.info(f"Found {len(labels)} elements with non-empty content-desc and clickable.")
+        blockchain_name, chain_id = registry.match(labels)
+        if chain_id:
+            logging.info(f"Blockchain name found: '{blockchain_name}'")
+            token_info["Blockchain Name"] = blockchain_name
+        return blockchain_name, chain_id, labels
     except Exception as e:
         logging.warning(f"Error retrieving blockchain name: {e}")
-        return ""
+        return "", "", []
+
+# Chain of a page whose label is unknown, from the API record of its pair; the registry learns
+# the page's chain label from it
+def resolve_unknown_chain(token_name, pair_address, labels, registry=None):
+    registry = registry or default_registry()
+    chain_id = lookup_chain_via_search(pair_address) if pair_address else None
+    if not chain_id:
+        logging.warning(f"Could not resolve the chain of '{token_name}' (page labels: {labels})")
+        return ''
+    logging.info(f"Chain of '{token_name}' resolved through the search API: '{chain_id}'")
+    registry.learn_label(chain_id, labels)
+    return chain_id
+
+# Errors about one element of a page (gone, moved or not ready yet): the token is skipped.
+# Any other WebDriverException is a failure of the session itself and is raised to the caller.
+ELEMENT_ERRORS = (NoSuchElementException, StaleElementReferenceException, TimeoutException,
+                  InvalidElementStateException)
+
+# Drill into one token's detail page, fill in its chain and addresses and simulate a $1 purchase.
+# Returns the purchase record, or None if the token could not be processed.
+# Raises WebDriverException when the session fails.
+def process_token(driver, token_info, navigator=None):
+    # Commands and API requests made for the token are attributed to it by the profiler
+    with profile_token(driver, token_info.get("Token Name", "Unknown")):
+        return drill_token(driver, token_info, navigator)
+
+def drill_token(driver, token_info, navigator=None):
+    token_name = token_info.get("Token Name", "Unknown")
+    navigator = navigator or ListNavigator(driver)
+    try:
+        logging.info(f"Processing token: {token_name}")
+        token_info["Drill Started At"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def process_tokens(driver, tokens_data):
-    simulated_purchases = []
-    for _, token_info in tokens_data:
-        try:
-            # Get the token name
-            token_name = token_info.get("Token Name", "Unknown")
-            logging.info(f"Processing token: {token_name}")
-
-            # Ensure the token is visible on the screen and get a fresh element reference
-            element = ensure_token_is_visible(driver, token_name)
-            if element is None:
-                logging.warning(f"Token '{token_name}' not found after scrolling. Skipping.")
-                logging.info("Scrolling back to the top before proceeding to the next token.")
-                scroll_to_top(driver)
-                continue  # Skip to the next token
-
-            # Click on the token element
-            element.click()
-            sleep(5)  # Wait for the detail page to load
-
-
-            # --- Retrieve Blockchain Name ---
-            blockchain_name = get_blockchain_name(driver, token_info)
-            print(blockchain_name)
-
-            # Get the chain_id from the mapping
-            chain_id = blockchain_name_to_chain_id.get(blockchain_name.upper(), '')
-            if chain_id:
-                logging.info(f"Mapped blockchain name '{blockchain_name}' to chain ID '{chain_id}'")
-            else:
-                logging.warning(f"Could not map blockchain name '{blockchain_name}' to a chain ID")
-            token_info['Chain ID'] = chain_id
+        # Find the token's row from the current list position and get a fresh element reference
+        element = navigator.find_row(token_name)
+        if element is None:
+            logging.warning(f"Token '{token_name}' not found after scrolling. Skipping.")
+            return None
 
-            # Extract the hashes using the updated function
-            first_hash, second_hash = extract_full_hashes_via_clipboard(driver, token_name, blockchain_name)
-            token_info["Full Hash 1"] = first_hash
-            token_info["Full Hash 2"] = second_hash
+        # Click on the token element
+        element.click()
+        wait_for(driver, text_view_present("PRICE USD", "Pair"), 'detail_page')
 
-            # Simulate the purchase
-            try:
-                # Get the price from token_info
-                price_str = token_info.get("Price", "0")
-                # Remove any currency symbols or commas
-                price_str = price_str.replace('$', '').replace(',', '').strip()
 
-                if price_str == '':
-                    price = 0.0
-                else:
-                    price = float(price_str)
-
-                # Check if there's a price adjustment
-                price_adjustment_str = token_info.get("Price Adjustment", "")
-                if price_adjustment_str.isdigit():
-                    zeros_missing = int(price_adjustment_str)
-                    price *= 10 ** (1 - zeros_missing + 1)
-                    logging.info(f"Adjusted price for '{token_name}' with {zeros_missing} missing zeros: {price}")
-                else:
-                    logging.info(f"No price adjustment needed for '{token_name}'.")
+        # --- Retrieve Blockchain Name ---
+        blockchain_name, chain_id, chain_labels = get_blockchain_name(driver, token_info)
+        print(blockchain_name)
+        if chain_id:
+            logging.info(f"Mapped blockchain name '{blockchain_name}' to chain ID '{chain_id}'")
 
-                if price > 0:
-                    # Calculate the amount of tokens purchased with $1
-                    amount_tokens = 1 / price
-                else:
-                    amount_tokens = 0.0
-
-                # Obtenir la date et l'heure actuelles
-                purchase_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                # Create a dictionary with the purchase data
-                purchase_data = {
-                    "Token Name": token_name,
-                    "Full Hash 1": first_hash,
-                    "Full Hash 2": second_hash,
-                    "Purchase Price": price,
-                    "Purchase Amount ($)": 1,
-                    "Amount of Tokens Purchased": amount_tokens,
-                    "Chain ID": chain_id,
-                    "Purchase Date": purchase_date
-                }
-                simulated_purchases.append(purchase_data)
-                logging.info(f"Simulated purchase for token '{token_name}': {purchase_data}")
-            except Exception as e:
-                logging.warning(f"Error simulating purchase for token '{token_name}': {e}")
-            # Navigate back to the previous page
-            driver.back()
-            sleep(3)  # Wait for the page to load
+        # Extract the hashes, recording which path provided them
+        first_hash, second_hash, hash_source = extract_full_hashes(driver, token_name, blockchain_name, chain_id)
+        if not chain_id:
+            chain_id = resolve_unknown_chain(token_name, first_hash, chain_labels)
+        token_info['Chain ID'] = chain_id
+        token_info["Full Hash 1"] = first_hash
+        token_info["Full Hash 2"] = second_hash
+        token_info["Hash Source"] = hash_source
 
+        # Simulate the purchase
+        purchase_data = None
+        try:
+            # Get the price parsed from the row, subscript-zero adjustment included
+            price = token_info.get("Price USD")
+            if price is None:
+                price = parse_price(token_info.get("Price", ""), token_info.get("Additional Value", ""))
+            if price is None:
+                raise ValueError(f"unparsable price '{token_info.get('Price')}'")
+            if token_info.get("Additional Value"):
+                logging.info(f"Adjusted price for '{token_name}' with {token_info['Additional Value']} leading zeros: {price}")
+
+            if price > 0:
+                # Calculate the amount of tokens purchased with $1
+                amount_tokens = 1 / price
+            else:
+                amount_tokens = 0.0
+
+            # Obtenir la date et l'heure actuelles
+            purchase_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            # Create a dictionary with the purchase data
+            purchase_data = {
+                "Token Name": token_name,
+                "Full Hash 1": first_hash,
+                "Full Hash 2": second_hash,
+                "Hash Source": hash_source,
+                "Purchase Price": price,
+                "Purchase Amount ($)": 1,
+                "Amount of Tokens Purchased": amount_tokens,
+                "Chain ID": chain_id,
+                "Purchase Date": purchase_date,
+                # Timeline of the capture, compared by latency_report.py
+                "Time": token_info.get("Time"),
+                "Detected At": token_info.get("Detected At"),
+                "Drill Started At": token_info["Drill Started At"]
+            }
+            logging.info(f"Simulated purchase for token '{token_name}': {purchase_data}")
         except Exception as e:
-            logging.warning(f"Error processing token '{token_name}': {e}")
-            continue
-
-    return tokens_data, simulated_purchases
-
-try:
-    # Record the start time for the extraction process
-    extraction_start_time = time()
+            logging.warning(f"Error simulating purchase for token '{token_name}': {e}")
+        # Navigate back to the previous page
+        driver.back()
+        wait_for(driver, token_list_present, 'list_after_back')
+        return purchase_data
+
+    except ELEMENT_ERRORS as e:
+        logging.warning(f"Error processing token '{token_name}': {e}")
+        return None
+    except WebDriverException:
+        raise
+    except Exception as e:
+        logging.warning(f"Error processing token '{token_name}': {e}")
+        return None
 
-    # Step 1: Extract basic token data
-    basic_token_data = extract_basic_token_data(driver)
+# Process tokens in on-screen order so the list only ever scrolls down, then fling back to the top
+# Only the rows chosen by the scheduler are drilled: as many as fit in `budget` seconds of device
+# time (all admissible rows when None); the others stay queued in the scheduler or are dropped.
+# Positions are only comparable within one snapshot: rows of the current snapshot are drilled
+# first, by position; rows deferred from earlier cycles follow after a rewind, newest detection
+# first, which is their order in the Newest list.
+# Returns the drilled rows and their simulated purchases. With `seen`, rows whose drill-down
+# fails have their claim released and are left out, so the token can be picked up again later.
+# When the session fails, the claims of the whole batch are released (nothing of it is saved)
+# and the WebDriverException is raised.
+def process_tokens(driver, tokens_data, navigator=None, scheduler=None, budget=None, seen=None):
+    navigator = navigator or ListNavigator(driver)
+    scheduler = scheduler if scheduler is not None else DrillScheduler()
+    for node, token_info in tokens_data:
+        if not scheduler.push(node, token_info):
+            # Filtered out for good (dust or rugging): the claim stands
+            token_info.pop("Claim Key", None)
+    batch = scheduler.next_batch(budget)
+    logging.info(scheduler.summary(len(batch)))
+
+    current = {id(token_info) for _, token_info in tokens_data}
+    current_rows = sorted((item for item in batch if id(item[1]) in current), key=lambda item: item[0].top)
+    deferred_rows = sorted((item for item in batch if id(item[1]) not in current),
+                           key=lambda item: (item[1].get("Detected At") or '', -item[0].top), reverse=True)
+
+    claim_keys = [token_info.pop("Claim Key", None) for _, token_info in current_rows + deferred_rows]
+    drilled = []
+    simulated_purchases = []
+    position = 0
+    for rows in (current_rows, deferred_rows):
+        if rows is deferred_rows and deferred_rows and not rewind(navigator):
+            break
+        for node, token_info in rows:
+            claim_key = claim_keys[position]
+            position += 1
+            start_time = time()
+            try:
+                purchase_data = process_token(driver, token_info, navigator)
+            except WebDriverException:
+                if seen is not None:
+                    for key in claim_keys:
+                        seen.release(key)
+                raise
+            scheduler.record_drill(time() - start_time)
+            if purchase_data is None and seen is not None:
+                seen.release(claim_key)
+                logging.info(f"Drill-down of '{token_info.get('Token Name')}' failed, claim released")
+                continue
+            drilled.append((node, token_info))
+            if purchase_data is not None:
+                simulated_purchases.append(purchase_data)
+    rewind(navigator)
 
-    # Step 2: Process each token and retrieve both full hashes
-    full_token_data, simulated_purchases = process_tokens(driver, basic_token_data)
+    return drilled, simulated_purchases
 
-    extraction_end_time = time()
-    logging.info(f"Data extraction completed. Time taken: {extraction_end_time - extraction_start_time:.2f} seconds")
+# Fling the list back to the top; returns False if Appium failed, the drills already done are kept
+def rewind(navigator):
+    try:
+        navigator.return_to_top()
+        return True
+    except WebDriverException as e:
+        logging.warning(f"Could not return to the top of the list: {e}")
+        return False
 
+# Move a results file that cannot be parsed out of the way instead of overwriting its history
+def set_aside(path):
+    aside_path = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    os.replace(path, aside_path)
+    logging.error(f"Could not parse {path}; moved it to {aside_path} and starting a new file")
+
+# Convert a results file written as a JSON array to JSON Lines, once, so that it can be appended to
+def migrate_to_json_lines(path):
+    with open(path, 'r') as f:
+        head = f.read(1024).lstrip()
+        if not head.startswith('['):
+            return
+        f.seek(0)
+        try:
+            records = json.load(f)
+        except json.JSONDecodeError:
+            records = None
+    if records is None:
+        set_aside(path)
+        return
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    os.replace(tmp_path, path)
+    logging.info(f"Converted {path} to JSON Lines ({len(records)} records)")
+
+# Write records to a JSON file: a JSON array, or one record per line appended to the file when
+# append is True. Appending only writes the new records, whatever the size of the history.
+def save_json_records(path, records, append=False):
+    if not append:
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(records, f, indent=4)
+        os.replace(tmp_path, path)
+        return
+
+    if os.path.exists(path):
+        migrate_to_json_lines(path)
+    with open(path, 'a+b') as f:
+        # Drop a last line left incomplete by an interrupted write
+        end = f.seek(0, os.SEEK_END)
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b'\n':
+                while end > 0:
+                    start = max(0, end - 65536)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b'\n')
+                    if newline >= 0:
+                        end = start + newline + 1
+                        break
+                    end = start
+                logging.warning(f"Dropping an incomplete last record in {path}")
+                f.truncate(end)
+                f.seek(end)
+        f.write(''.join(json.dumps(record) + '\n' for record in records).encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+# Rows of the tokens never claimed in `seen`. The claim key stays on the row until the token is
+# recorded, so that a token that ends up not drilled can be released and claimed again later.
+def claim_new_rows(seen, token_data):
+    new_rows = []
+    for node, token_info in token_data:
+        key, aliases = token_identities(token_info)
+        if seen.claim(key, aliases):
+            token_info["Claim Key"] = key
+            new_rows.append((node, token_info))
+    return new_rows
+
+# Scheduler hook releasing the claim of a row evicted from a full queue: it only lacked room, so the
+# token can be queued again when it is next seen. A stale row keeps its claim, its entry is past.
+def release_dropped_claims(seen):
+    def on_drop(token_info, reason):
+        claim_key = token_info.pop("Claim Key", None)
+        if reason == 'evicted':
+            seen.release(claim_key)
+    return on_drop
+
+# Save the processed tokens and simulated purchases
+def save_results(token_infos, simulated_purchases, append=False):
     # Save the token data to a JSON file
-    with open('pair_hash.json', 'w') as f:
-        json.dump([info for _, info in full_token_data], f, indent=4)
+    save_json_records('pair_hash.json', token_infos, append)
     logging.info("Token data successfully saved to pair_hash.json")
 
     # Save the simulated purchases to a JSON file
-    with open('simulated_purchases.json', 'w') as f:
-        json.dump(simulated_purchases, f, indent=4)
+    save_json_records('simulated_purchases.json', simulated_purchases, append)
     logging.info("Simulated purchase data successfully saved to simulated_purchases.json")
 
-finally:
-    # Close the driver and log the time taken for the entire script execution
-    driver.quit()
-    script_end_time = time()
-    logging.info(f"Script execution completed. Total time taken: {script_end_time - start_time:.2f} seconds")
+# Daemon mode: keep one warm session and run capture cycles until interrupted.
+# Only tokens never claimed in `seen` are queued for a drill-down. Each cycle drills the best
+# queued tokens that fit in the time left before the next cycle, or in drill_budget seconds.
+# An Appium error ends the cycle, not the daemon; it stops after max_failures failed cycles in a row.
+def run_daemon(driver, seen, interval=30, max_cycles=None, scheduler=None, drill_budget=None, max_failures=5):
+    scheduler = scheduler if scheduler is not None else DrillScheduler()
+    if scheduler.on_drop is None:
+        scheduler.on_drop = release_dropped_claims(seen)
+    cycle_times = []
+    cycle = 0
+    failures = 0
+    try:
+        while max_cycles is None or cycle < max_cycles:
+            cycle += 1
+            cycle_start = time()
+
+            try:
+                with profile_cycle(driver):
+                    basic_token_data = extract_basic_token_data(driver)
+                    new_token_data = claim_new_rows(seen, basic_token_data)
+                    logging.info(f"[Cycle {cycle}] {len(new_token_data)} new tokens out of {len(basic_token_data)} visible.")
+
+                    if new_token_data or len(scheduler):
+                        budget = drill_budget if drill_budget is not None else interval - (time() - cycle_start)
+                        full_token_data, simulated_purchases = process_tokens(driver, new_token_data, scheduler=scheduler,
+                                                                              budget=budget, seen=seen)
+                        save_results([info for _, info in full_token_data], simulated_purchases, append=True)
+                failures = 0
+            except WebDriverException as e:
+                failures += 1
+                logging.warning(f"[Cycle {cycle}] Appium error ({failures} failed cycles in a row): {e}")
+                if failures >= max_failures:
+                    logging.error(f"Stopping the daemon after {failures} failed cycles in a row.")
+                    break
+
+            cycle_time = time() - cycle_start
+            cycle_times.append(cycle_time)
+            logging.info(f"[Cycle {cycle}] Completed in {cycle_time:.2f} seconds "
+                         f"(steady state: median {median(cycle_times):.2f}s over {len(cycle_times)} cycles)")
+            if max_cycles is None or cycle < max_cycles:
+                sleep(max(0.0, interval - cycle_time))
+    except KeyboardInterrupt:
+        logging.info("Daemon interrupted.")
+    return cycle_times
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Capture hashes and simulated purchases for the newest DexScreener tokens.')
+    parser.add_argument('--daemon', action='store_true', help='Keep the session alive and capture continuously')
+    parser.add_argument('--interval', type=float, default=30, help='Seconds between two daemon cycles')
+    parser.add_argument('--max-cycles', type=int, default=None, help='Stop the daemon after this many cycles')
+    parser.add_argument('--session-id', default=None, help='Attach to an already running Appium session')
+    parser.add_argument('--keep-session', action='store_true', help='Do not end the Appium session on exit')
+    parser.add_argument('--device-name', default=DEFAULT_DEVICE_NAME, help='ADB device ID')
+    parser.add_argument('--server-url', default=DEFAULT_SERVER_URL, help='Appium server URL')
+    parser.add_argument('--seen-db', default='listener_seen.sqlite',
+                        help='SQLite file of tokens already processed in daemon mode')
+    parser.add_argument('--drill-budget', type=float, default=None,
+                        help='Seconds of device time for drill-downs per cycle (daemon default: the time left '
+                             'before the next cycle; otherwise every admissible token is drilled)')
+    parser.add_argument('--min-liquidity', type=float, default=DEFAULT_MIN_LIQUIDITY,
+                        help='Tokens with less liquidity (USD) are not drilled into')
+    parser.add_argument('--max-entry-age', type=float, default=DEFAULT_MAX_ENTRY_AGE,
+                        help='Seconds after listing past which a token is no longer worth a simulated entry')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve per-command timings on http://127.0.0.1:PORT/metrics (Prometheus format)')
+    parser.add_argument('--profile-json', default=None, help='Write the per-command timing profile to this file on exit')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Set up logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Initialize the driver and start the timer
+    start_time = time()
+    if args.session_id:
+        driver = attach_driver(args.session_id, args.server_url)
+    else:
+        driver = create_driver(args.device_name, args.server_url, new_command_timeout=0 if args.daemon else None)
+    keep_session = args.keep_session or bool(args.session_id)
+    driver = instrument(driver, args.metrics_port)
+    scheduler = DrillScheduler(min_liquidity=args.min_liquidity, max_entry_age=args.max_entry_age)
+
+    try:
+        # Wait for the app to load the token list
+        wait_for(driver, token_list_present, 'app_ready')
+        session_startup_time = time() - start_time
+        logging.info(f"Session {driver.session_id} ready. Startup time: {session_startup_time:.2f} seconds")
+
+        if args.daemon:
+            seen = DedupeIndex(args.seen_db)
+            try:
+                cycle_times = run_daemon(driver, seen, args.interval, args.max_cycles, scheduler, args.drill_budget)
+            finally:
+                seen.close()
+            if cycle_times:
+                logging.info(f"Session startup: {session_startup_time:.2f}s. Steady state: {len(cycle_times)} cycles, "
+                             f"median {median(cycle_times):.2f}s, max {max(cycle_times):.2f}s per cycle")
+            log_wait_summary()
+            return
+
+        # Record the start time for the extraction process
+        extraction_start_time = time()
+
+        # Step 1: Extract basic token data
+        basic_token_data = extract_basic_token_data(driver)
+
+        # Step 2: Process each token and retrieve both full hashes
+        full_token_data, simulated_purchases = process_tokens(driver, basic_token_data, scheduler=scheduler,
+                                                              budget=args.drill_budget)
+
+        extraction_end_time = time()
+        logging.info(f"Data extraction completed. Time taken: {extraction_end_time - extraction_start_time:.2f} seconds")
+        log_wait_summary()
+
+        save_results([info for _, info in full_token_data], simulated_purchases)
+
+    finally:
+        # Close the driver and log the time taken for the entire script execution
+        if keep_session:
+            logging.info(f"Leaving session {driver.session_id} running; reattach with --session-id {driver.session_id}")
+        else:
+            driver.quit()
+        if args.profile_json:
+            driver.profiler.dump(args.profile_json)
+            logging.info(f"Timing profile written to {args.profile_json}")
+        script_end_time = time()
+        logging.info(f"Script execution completed. Total time taken: {script_end_time - start_time:.2f} seconds")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+from collections import Counter
+from time import time
+
+from token_identity import parse_age
+
+DEFAULT_MIN_LIQUIDITY = 1_000  # Dollars; shallower pools are dust not worth a drill-down
+DEFAULT_MAX_DROP_PCT = 50  # Rows already down this much are treated as rugging
+DEFAULT_MAX_ENTRY_AGE = 30 * 60  # Seconds after listing past which a simulated entry price is too stale
+DEFAULT_DRILL_SECONDS = 15.0  # Initial estimate of one drill-down, refined from measured drills
+DEFAULT_MAX_PENDING = 100  # Deferred tokens kept; the lowest scored are evicted first
+
+# Weight of the latest drill in the duration average
+SMOOTHING = 0.3
+
+# Market cap above this multiple of the liquidity marks a pool too thin for its valuation
+MCAP_LIQUIDITY_RATIO = 20
+
+
+# Signed 24h change in percent from the row ("▼", "45%" -> -45.0), None when not shown
+def parse_change(token_info):
+    text = (token_info.get("Change") or '').replace(',', '').rstrip('%')
+    try:
+        change = float(text)
+    except ValueError:
+        return None
+    return -change if token_info.get("Change Indicator") == '▼' else change
+
+
+# Score of a parsed row, higher is drilled first: log-liquidity, plus turnover (volume relative
+# to depth), minus a penalty when the market cap is far above the liquidity.
+# Returns (score, None), or (None, reason) for rows that should not be drilled at all.
+def score_row(token_info, min_liquidity=DEFAULT_MIN_LIQUIDITY, max_drop_pct=DEFAULT_MAX_DROP_PCT):
+    liquidity = token_info.get("Liquidity USD") or 0.0
+    if liquidity < min_liquidity:
+        return None, 'dust'
+    change = parse_change(token_info)
+    if change is not None and change <= -max_drop_pct:
+        return None, 'rugging'
+    volume = token_info.get("Volume USD") or 0.0
+    market_cap = token_info.get("Market Cap USD") or 0.0
+    score = math.log10(liquidity) + 0.5 * math.log10(1 + volume / liquidity)
+    score -= 0.5 * math.log10(max(1.0, market_cap / (liquidity * MCAP_LIQUIDITY_RATIO)))
+    return score, None
+
+
+# Priority queue between discovery and drill-down.
+# Rows are scored on push; dust and rugging rows are dropped. Each row gets a deadline (listing
+# time plus max_entry_age) after which its simulated entry would be too stale, and a row whose
+# drill cannot finish before its deadline is dropped instead of drilled. Rows that do not fit
+# in the current batch stay queued for later cycles. Batches are sized from the device time
+# available and the measured duration of a drill. `on_drop(token_info, reason)` is called for
+# every queued row dropped later on ('stale' or 'evicted'), outside the scheduler lock.
+class DrillScheduler:
+    def __init__(self, min_liquidity=DEFAULT_MIN_LIQUIDITY, max_drop_pct=DEFAULT_MAX_DROP_PCT,
+                 max_entry_age=DEFAULT_MAX_ENTRY_AGE, drill_seconds=DEFAULT_DRILL_SECONDS,
+                 max_pending=DEFAULT_MAX_PENDING, smoothing=SMOOTHING, on_drop=None):
+        self.min_liquidity = min_liquidity
+        self.max_drop_pct = max_drop_pct
+        self.max_entry_age = max_entry_age
+        self.drill_seconds = drill_seconds
+        self.max_pending = max_pending
+        self.smoothing = smoothing
+        self.on_drop = on_drop
+        self.heap = []  # (-score, deadline, sequence, node, token_info)
+        self.sequence = itertools.count()
+        self.dropped = Counter()  # reason -> rows dropped since the last summary
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.heap)
+
+    # Queue a discovered row; returns False if it was dropped
+    def push(self, node, token_info, now=None):
+        now = time() if now is None else now
+        score, reason = score_row(token_info, self.min_liquidity, self.max_drop_pct)
+        if score is None:
+            logging.info(f"Token '{token_info.get('Token Name')}' not scheduled ({reason})")
+            with self.lock:
+                self.dropped[reason] += 1
+            return False
+        age = parse_age(token_info.get("Time")) or 0
+        deadline = now - age + self.max_entry_age
+        evicted = None
+        with self.lock:
+            heapq.heappush(self.heap, (-score, deadline, next(self.sequence), node, token_info))
+            if len(self.heap) > self.max_pending:
+                lowest = max(range(len(self.heap)), key=lambda index: self.heap[index][:3])
+                evicted = self.heap.pop(lowest)
+                heapq.heapify(self.heap)
+                self.dropped['evicted'] += 1
+                logging.info(f"Token '{evicted[4].get('Token Name')}' evicted from the drill queue")
+        if evicted is not None:
+            self._notify_drop([evicted[4]], 'evicted')
+        return evicted is None or evicted[4] is not token_info
+
+    def _notify_drop(self, token_infos, reason):
+        if self.on_drop is not None:
+            for token_info in token_infos:
+                self.on_drop(token_info, reason)
+
+    # Best queued row whose drill can finish before its deadline, as (node, token_info), or None.
+    # `lead` is the drill time already committed before this one starts.
+    def pop(self, now=None, lead=0.0):
+        now = time() if now is None else now
+        stale = []
+        item = None
+        with self.lock:
+            while self.heap:
+                _, deadline, _, node, token_info = heapq.heappop(self.heap)
+                if deadline >= now + lead + self.drill_seconds:
+                    item = node, token_info
+                    break
+                self.dropped['stale'] += 1
+                stale.append(token_info)
+                logging.info(f"Token '{token_info.get('Token Name')}' dropped: entry price would be stale")
+        self._notify_drop(stale, 'stale')
+        return item
+
+    # Rows to drill now: as many as fit in `budget` seconds of device time (at least one), or
+    # every admissible row when budget is None
+    def next_batch(self, budget=None, now=None):
+        now = time() if now is None else now
+        size = len(self.heap) if budget is None else max(1, int(budget // self.drill_seconds))
+        batch = []
+        while len(batch) < size:
+            item = self.pop(now, lead=len(batch) * self.drill_seconds)
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    # Feed back the measured duration of one drill-down
+    def record_drill(self, seconds):
+        with self.lock:
+            self.drill_seconds = self.smoothing * seconds + (1 - self.smoothing) * self.drill_seconds
+
+    def summary(self, scheduled):
+        with self.lock:
+            dropped = ', '.join(f"{reason} {count}" for reason, count in sorted(self.dropped.items())) or 'none'
+            self.dropped.clear()
+            return (f"Scheduled {scheduled} drill-downs, {len(self.heap)} deferred, dropped: {dropped} "
+                    f"(drill estimate {self.drill_seconds:.1f}s)")
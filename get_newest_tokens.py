@@ -1,157 +1,46 @@
+import argparse
 import logging
 from datetime import datetime
-from appium import webdriver
-from appium.options.android import UiAutomator2Options
-from appium.webdriver.common.appiumby import AppiumBy
-from selenium.common.exceptions import StaleElementReferenceException
-import json
-from time import sleep, time
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# Configure Appium options
-options = UiAutomator2Options()
-options.platformName = 'Android'
-options.deviceName = '4672d93b'  # Replace by your device ID
-options.appPackage = 'com.dexscreener'
-options.appActivity = 'com.dexscreener.MainActivity'
-options.noReset = True
-
-# Add additional Appium capabilities
-additional_caps = {
-    'skipUnlock': True,
-    'disableWindowAnimation': True,
-    'uiautomator2ServerInstallTimeout': 60000,
-    'ignoreHiddenApiPolicyError': True
-}
-options.load_capabilities(additional_caps)
-
-# Initialize the Appium driver and measure start-up time
-logging.info("Initializing the Appium driver")
-start_time = time()
-driver = webdriver.Remote('http://localhost:4725/wd/hub', options=options)
-end_time = time()
-logging.info(f"Driver initialized. Time taken: {end_time - start_time:.2f} seconds")
-
-# Allow time for the app to fully load
-sleep(10)
-
-# Load already saved tokens from JSON to avoid duplicates
-try:
-    with open('tokens_data.json', 'r') as f:
-        existing_tokens = json.load(f)
-        existing_token_names = {token['Token Name'] for token in existing_tokens}
-except (FileNotFoundError, json.JSONDecodeError):
-    existing_tokens = []
-    existing_token_names = set()
-
-# Clean and align raw token data into a structured format
-def clean_and_align_data(token_data):
-    # Remove junk items like empty strings or question marks
-    filtered_data = [d for d in token_data if d.strip() and d.strip() != "?"]
-
-    cleaned_data = {
-        "Token Name": filtered_data[0] if len(filtered_data) > 0 else "N/A",
-        "Time": filtered_data[1] if len(filtered_data) > 1 else "N/A",
-        "Price": filtered_data[2] if len(filtered_data) > 2 else "N/A",
-        "Additional Value": "",
-        "Change Indicator": "",
-        "Change": "",
-        "Project Name": "",
-        "Liquidity": "",
-        "Volume": "",
-        "Market Cap": ""
-    }
-
-    index = 3
-
-    # Parse optional additional fields
-    if len(filtered_data) > index and filtered_data[index].isdigit():
-        cleaned_data["Additional Value"] = filtered_data[index]
-        index += 1
-
-    cleaned_data["Change Indicator"] = filtered_data[index] if len(filtered_data) > index else ""
-    index += 1
-    cleaned_data["Change"] = filtered_data[index] if len(filtered_data) > index else ""
-    index += 1
-    cleaned_data["Project Name"] = filtered_data[index] if len(filtered_data) > index else ""
-    index += 1
-
-    # Loop through remaining key-value pairs
-    while index < len(filtered_data):
-        key = filtered_data[index]
-        value = filtered_data[index + 1] if index + 1 < len(filtered_data) else ""
-        if key == "LIQ":
-            cleaned_data["Liquidity"] = value
-        elif key == "VOL":
-            cleaned_data["Volume"] = value
-        elif key == "MCAP":
-            cleaned_data["Market Cap"] = value
-        index += 2
-
-    return cleaned_data
-
-# Extract token information from up to 8 visible ViewGroup elements
-def extract_token_data(driver):
+from time import perf_counter, sleep, time
+
+from adaptive_polling import (DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL, AdaptiveInterval, FixedInterval,
+                              MonitorMetrics)
+from appium_session import create_driver
+from dedupe_index import DedupeIndex
+from hierarchy_snapshot import content_desc_view_groups, take_snapshot, NON_TOKEN_KEYWORDS
+from instrumentation import instrument, profile_cycle
+from token_parsing import parse_row
+from token_identity import creation_time, observed_at, token_identities
+from token_store import open_token_store
+from waits import token_list_present, wait_for
+
+# Content-desc of the token rows among the first 8 content-desc ViewGroups, from one hierarchy snapshot
+def visible_row_descs(driver):
+    logging.info("Requesting page source snapshot")
+    nodes = content_desc_view_groups(take_snapshot(driver))[:8]
+    return [node.content_desc for node in nodes
+            if not any(keyword in node.content_desc for keyword in NON_TOKEN_KEYWORDS)]
+
+# Parse rows into token records, skipping those with liquidity < $1
+def parse_token_rows(content_descs):
     tokens_data = []
-    try:
-        logging.info("Sending request to locate ViewGroup elements with content-desc attribute")
-        elements = driver.find_elements(AppiumBy.XPATH, '//android.view.ViewGroup[@content-desc]')[:8]
-
-        for element in elements:
-            try:
-                content_desc = element.get_attribute('content-desc')
-                if content_desc and not any(keyword in content_desc for keyword in ["Trending", "Moonshot", "Newest"]):
-                    token_data = content_desc.split(', ')
-                    cleaned_data = clean_and_align_data(token_data)
-                    # Append timestamp of when data was extracted
-                    cleaned_data["Analyzed Date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                    # Parse liquidity and ensure it's >= $1
-                    liquidity_str = cleaned_data.get("Liquidity", "")
-                    liquidity_value = parse_liquidity(liquidity_str)
-
-                    if liquidity_value >= 1.0:
-                        tokens_data.append(cleaned_data)
-                    else:
-                        logging.info(f"Skipping token '{cleaned_data['Token Name']}' due to liquidity < $1")
-            except StaleElementReferenceException:
-                logging.warning("Encountered a stale element, skipping...")
-                continue
-
-    except StaleElementReferenceException:
-        logging.warning("Encountered a stale element reference, retrying...")
-        tokens_data = extract_token_data(driver)
+    for content_desc in content_descs:
+        row = parse_row(content_desc)
+
+        # Ensure liquidity is >= $1
+        if row.liquidity >= 1.0:
+            cleaned_data = row.to_dict()
+            # Append timestamp of when data was extracted
+            cleaned_data["Analyzed Date"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            tokens_data.append(cleaned_data)
+        else:
+            logging.info(f"Skipping token '{row.name}' due to liquidity < $1")
 
     return tokens_data
 
-# Convert liquidity strings to floats, handling K/M/B suffixes
-def parse_liquidity(liquidity_str):
-    if not liquidity_str:
-        return 0.0
-
-    liquidity_str = liquidity_str.strip().upper()
-    if '<' in liquidity_str:
-        return 0.0
-
-    liquidity_str = liquidity_str.replace('$', '').replace(',', '')
-    multiplier = 1
-    if 'K' in liquidity_str:
-        multiplier = 1_000
-        liquidity_str = liquidity_str.replace('K', '')
-    elif 'M' in liquidity_str:
-        multiplier = 1_000_000
-        liquidity_str = liquidity_str.replace('M', '')
-    elif 'B' in liquidity_str:
-        multiplier = 1_000_000_000
-        liquidity_str = liquidity_str.replace('B', '')
-
-    try:
-        return float(liquidity_str) * multiplier
-    except ValueError:
-        logging.warning(f"Could not parse liquidity value: '{liquidity_str}'")
-        return 0.0
+# Extract token information from up to 8 visible ViewGroup elements, parsed from one hierarchy snapshot
+def extract_token_data(driver):
+    return parse_token_rows(visible_row_descs(driver))
 
 # Print token data to the console
 def display_token_data(token_data):
@@ -168,41 +57,113 @@ def display_token_data(token_data):
         print(f"Volume: {token['Volume']}")
         print(f"Market Cap: {token['Market Cap']}\n")
 
-# Monitor for new token entries and update stored data
-def monitor_token_changes(driver):
-    last_extracted_tokens = []
-    while True:
-        # Get currently visible tokens
-        current_tokens = extract_token_data(driver)
-
-        # Identify new tokens not previously seen
-        new_tokens = [token for token in current_tokens if token['Token Name'] not in existing_token_names]
-
-        if new_tokens:
-            logging.info(f"Detected {len(new_tokens)} new tokens.")
-            display_token_data(new_tokens)
-
-            # Save new tokens to JSON file
-            existing_tokens.extend(new_tokens)
-            with open('tokens_data.json', 'w') as f:
-                json.dump(existing_tokens, f, indent=4)
-            logging.info(f"Added {len(new_tokens)} new tokens to the JSON file.")
-
-            # Update set of known token names
-            existing_token_names.update(token['Token Name'] for token in new_tokens)
-
-        # Save snapshot of last extracted tokens
-        last_extracted_tokens = current_tokens
+# Seconds of detections loaded back from the store at startup
+SEEN_WINDOW = 86_400
+
+# Store the tokens that are not known yet and return them
+def record_new_tokens(tokens, token_store, seen):
+    # Identify new tokens not previously seen; claiming also marks them as seen
+    new_tokens = [token for token in tokens if seen.claim(*token_identities(token))]
+
+    if new_tokens:
+        logging.info(f"Detected {len(new_tokens)} new tokens.")
+        display_token_data(new_tokens)
+
+        # Append only the new tokens to the store
+        inserted = token_store.append(new_tokens)
+        logging.info(f"Added {len(inserted)} new tokens to {token_store.path}.")
+
+    return new_tokens
+
+# Monitor for new token entries and update stored data.
+# In incremental mode rows whose content-desc is identical to the previous poll are
+# neither parsed nor deduplicated again. The poll interval follows poll_interval
+# (AdaptiveInterval by default) and cost/lag metrics are logged periodically.
+def monitor_token_changes(driver, token_store, seen, incremental=True, poll_interval=None, max_cycles=None):
+    poll_interval = poll_interval or AdaptiveInterval()
+    metrics = MonitorMetrics()
+    previous_descs = set()
+    cycle = 0
+    while max_cycles is None or cycle < max_cycles:
+        cycle += 1
+        cycle_start = perf_counter()
+
+        # Get currently visible rows and keep only those that changed since the last poll
+        with profile_cycle(driver):
+            descs = visible_row_descs(driver)
+        snapshot_time = perf_counter() - cycle_start
+        changed_descs = [desc for desc in descs if desc not in previous_descs] if incremental else descs
+        previous_descs = set(descs)
+
+        parse_start = perf_counter()
+        current_tokens = parse_token_rows(changed_descs)
+        parse_time = perf_counter() - parse_start
+
+        new_tokens = record_new_tokens(current_tokens, token_store, seen)
+        for token in new_tokens:
+            created = creation_time(token)
+            metrics.record_detection(None if created is None else observed_at(token) - created)
+
+        # Every visible row being new means the list may have moved past unseen listings
+        saturated = cycle > 1 and bool(descs) and len(new_tokens) >= len(descs)
+        cycle_time = perf_counter() - cycle_start
+        metrics.record_cycle(cycle_time, snapshot_time, parse_time, len(changed_descs),
+                             len(descs) - len(changed_descs), saturated)
 
         # Wait before scanning again
-        sleep(2)
-
-try:
-    # Start the monitoring loop
-    monitor_token_changes(driver)
+        interval = poll_interval.update(len(new_tokens), saturated)
+        metrics.maybe_log(poll_interval)
+        sleep(max(0.0, interval - cycle_time))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Monitor the DexScreener Newest list and store new tokens.')
+    parser.add_argument('--min-interval', type=float, default=DEFAULT_MIN_INTERVAL,
+                        help='Shortest poll interval in seconds, used during listing bursts')
+    parser.add_argument('--max-interval', type=float, default=DEFAULT_MAX_INTERVAL,
+                        help='Longest poll interval in seconds, used while the list is quiet')
+    parser.add_argument('--fixed-interval', type=float, default=None,
+                        help='Poll at a constant interval instead of adapting to the arrival rate')
+    parser.add_argument('--no-incremental', action='store_true', help='Re-parse every visible row on each poll')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve per-command timings on http://127.0.0.1:PORT/metrics (Prometheus format)')
+    parser.add_argument('--profile-json', default=None, help='Write the per-command timing profile to this file on exit')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Set up logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Initialize the Appium driver and measure start-up time
+    start_time = time()
+    driver = instrument(create_driver(), args.metrics_port)
+
+    # Open the append-only token store and load the recent detections into a bounded dedupe index
+    token_store = open_token_store()
+    seen = DedupeIndex(window=SEEN_WINDOW)
+    seen.seed(token_store.recent_keys(SEEN_WINDOW))
 
-finally:
-    # Clean up and log total script runtime
-    driver.quit()
-    script_end_time = time()
-    logging.info(f"Script execution completed. Total time taken: {script_end_time - start_time:.2f} seconds")
\ No newline at end of file
+    try:
+        # Wait until the app has rendered the token list
+        wait_for(driver, token_list_present, 'app_ready')
+
+        # Start the monitoring loop
+        if args.fixed_interval is not None:
+            poll_interval = FixedInterval(args.fixed_interval)
+        else:
+            poll_interval = AdaptiveInterval(args.min_interval, args.max_interval)
+        monitor_token_changes(driver, token_store, seen, incremental=not args.no_incremental,
+                              poll_interval=poll_interval)
+
+    finally:
+        # Clean up and log total script runtime
+        token_store.close()
+        driver.quit()
+        if args.profile_json:
+            driver.profiler.dump(args.profile_json)
+        script_end_time = time()
+        logging.info(f"Script execution completed. Total time taken: {script_end_time - start_time:.2f} seconds")
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,35 @@
+import argparse
 import requests
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from time import sleep, time
+
+import dexscreener_api
+from pair_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, PairCache
+from price_history import append_observations, observation_from_pair
+
+# Nombre maximum d'adresses de paires acceptées par appel sur /latest/dex/pairs
+MAX_PAIRS_PER_REQUEST = 30
+
+def get_pair_info(chain_id, pair_id, cache=None, max_staleness=None):
+    # Réutiliser la réponse en cache si elle est assez récente
+    if cache is not None:
+        pair = cache.get(pair_key(chain_id, pair_id), max_staleness)
+        if pair is not None:
+            return pair
 
-def get_pair_info(chain_id, pair_id):
-    url = f'https://api.dexscreener.com/latest/dex/pairs/{chain_id}/{pair_id}'
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
+        data = dexscreener_api.api_get(f'/latest/dex/pairs/{chain_id}/{pair_id}')
 
         # Vérifier si 'pairs' est dans la réponse et n'est pas None
         pairs = data.get('pairs')
         if pairs:
             pair = pairs[0]  # Comme nous demandons une seule paire, nous prenons le premier élément
+            if cache is not None:
+                cache.put(pair_key(chain_id, pair_id), pair)
+                cache.commit()
             return pair
         else:
             print("Aucune donnée trouvée pour l'adresse de la paire fournie.")
@@ -28,131 +45,272 @@ def get_pair_info(chain_id, pair_id):
     except requests.exceptions.RequestException as err:
         print(f"Erreur de requête: {err}")
 
-def process_simulated_purchases():
+# Clé de correspondance d'une paire : les adresses EVM (0x...) ne sont pas sensibles à la casse
+def pair_key(chain_id, pair_id):
+    pair_id = pair_id.strip()
+    if pair_id.startswith('0x'):
+        pair_id = pair_id.lower()
+    return chain_id, pair_id
+
+# Récupérer plusieurs paires d'une même chaîne en un seul appel (adresses séparées par des virgules)
+def get_pairs_info(chain_id, pair_ids):
     try:
-        # Lire le fichier simulated_purchases.json
-        with open('simulated_purchases.json', 'r') as f:
-            simulated_purchases = json.load(f)
+        data = dexscreener_api.api_get(f'/latest/dex/pairs/{chain_id}/{",".join(pair_ids)}')
+        return data.get('pairs') or []
+
+    except requests.exceptions.HTTPError as errh:
+        print(f"Erreur HTTP: {errh}")
+    except requests.exceptions.ConnectionError as errc:
+        print(f"Erreur de connexion: {errc}")
+    except requests.exceptions.Timeout as errt:
+        print(f"Erreur de délai d'attente: {errt}")
+    except requests.exceptions.RequestException as err:
+        print(f"Erreur de requête: {err}")
+    return []
+
+# Regrouper les achats par Chain ID, découper en lots de MAX_PAIRS_PER_REQUEST
+# et associer chaque paire retournée à son achat via 'pairAddress'.
+# Avec workers > 1, les lots sont récupérés en parallèle ; la fusion suit l'ordre des lots.
+# Les paires présentes dans le cache (et assez récentes) ne sont pas redemandées
+def fetch_pairs_for_purchases(purchases, workers=1, cache=None, max_staleness=None, verbose=True):
+    pairs_by_key = {}
+    pair_ids_by_chain = {}
+    requested = set()
+    for purchase in purchases:
+        chain_id = purchase.get('Chain ID', '')
+        pair_id = purchase.get('Full Hash 1', '')
+        if not chain_id or not pair_id:
+            continue
+        key = pair_key(chain_id, pair_id)
+        if key in pairs_by_key:
+            continue
+        if cache is not None:
+            cached_pair = cache.get(key, max_staleness)
+            if cached_pair is not None:
+                pairs_by_key[key] = cached_pair
+                continue
+        # Une même paire peut être écrite avec une casse ou des espaces différents : dédoublonner sur la clé
+        if key not in requested:
+            requested.add(key)
+            pair_ids_by_chain.setdefault(chain_id, []).append(key[1])
+
+    chunks = []
+    for chain_id, pair_ids in pair_ids_by_chain.items():
+        for start in range(0, len(pair_ids), MAX_PAIRS_PER_REQUEST):
+            chunks.append((chain_id, pair_ids[start:start + MAX_PAIRS_PER_REQUEST]))
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunk_results = list(executor.map(lambda chunk: get_pairs_info(*chunk), chunks))
+    else:
+        chunk_results = [get_pairs_info(chain_id, chunk) for chain_id, chunk in chunks]
+
+    for (chain_id, _), pairs in zip(chunks, chunk_results):
+        for pair in pairs:
+            pair_address = pair.get('pairAddress', '')
+            if pair_address:
+                key = pair_key(pair.get('chainId', chain_id), pair_address)
+                pairs_by_key[key] = pair
+                if cache is not None:
+                    cache.put(key, pair)
+    if cache is not None:
+        cache.commit()
+
+    if verbose:
+        print(f"{len(pairs_by_key)} paires récupérées en {len(chunks)} requête(s).")
+    return pairs_by_key
+
+# Afficher le débit et la latence des requêtes API de l'exécution
+def print_request_stats():
+    summary = dexscreener_api.stats.summary()
+    print(f"Requêtes API : {summary['requests']} (erreurs : {summary['errors']}) "
+          f"en {summary['elapsed_s']:.2f}s - {summary['requests_per_s']:.2f} req/s, "
+          f"p50 {summary['p50_ms']:.0f} ms, p95 {summary['p95_ms']:.0f} ms")
+
+# Afficher les compteurs du cache de paires
+def print_cache_stats(cache):
+    cache_stats = cache.stats()
+    print(f"Cache de paires : {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es) "
+          f"({cache_stats['hit_rate'] * 100:.1f}% de hits), {cache_stats['entries']} entrée(s) en mémoire")
+
+# Lire le fichier des achats simulés, tableau JSON ou JSON Lines (None en cas d'erreur)
+def load_simulated_purchases(path='simulated_purchases.json'):
+    try:
+        return list(iter_purchases(path))
     except Exception as e:
-        print(f"Erreur lors de la lecture de simulated_purchases.json: {e}")
+        print(f"Erreur lors de la lecture de {path}: {e}")
+        return None
+
+# Suivi continu : réinterroger toutes les paires suivies toutes les `interval` secondes
+# et ajouter chaque observation à la série temporelle (le fichier n'est jamais réécrit)
+def track_prices(interval=60, workers=1, history_path='price_history.csv'):
+    cycle = 0
+    try:
+        while True:
+            cycle_start = time()
+            cycle += 1
+
+            # Relire les achats à chaque cycle pour suivre les nouvelles paires
+            simulated_purchases = load_simulated_purchases() or []
+            pairs_by_key = fetch_pairs_for_purchases(simulated_purchases, workers=workers)
+
+            observations = [
+                observation_from_pair(pair, cycle_start, chain_id=chain_id, pair_id=pair_id)
+                for (chain_id, pair_id), pair in pairs_by_key.items()
+            ]
+            written = append_observations(history_path, observations)
+            elapsed = time() - cycle_start
+            print(f"[Cycle {cycle}] {written} observation(s) ajoutée(s) à '{history_path}' en {elapsed:.2f}s.")
+
+            sleep(max(0.0, interval - elapsed))
+    except KeyboardInterrupt:
+        print("Suivi des prix interrompu.")
+        print_request_stats()
+
+# Calculer le résultat d'un achat à partir des informations de sa paire
+# (None si le prix actuel n'est pas disponible)
+def build_result(purchase, pair_info):
+    token_name = purchase.get('Token Name', 'Unknown')
+    purchase_amount = purchase.get('Purchase Amount ($)', 0.0)
+    amount_of_tokens = purchase.get('Amount of Tokens Purchased', 0.0)
+
+    # Récupérer le prix actuel
+    current_price_usd = pair_info.get('priceUsd', 0.0)
+    if current_price_usd == 'N/A' or current_price_usd == '':
+        return None
+    current_price_usd = float(current_price_usd)
+
+    # Récupérer les informations supplémentaires
+    liquidity_usd = pair_info.get('liquidity', {}).get('usd', 0.0)
+    fdv = pair_info.get('fdv', 'N/A')
+    volume_24h = pair_info.get('volume', {}).get('h24', 0.0)
+    txns_24h_info = pair_info.get('txns', {}).get('h24', {})
+    buys_24h = txns_24h_info.get('buys', 0)
+    sells_24h = txns_24h_info.get('sells', 0)
+    txns_24h = buys_24h + sells_24h
+
+    # Convertir les valeurs en float si nécessaire
+    liquidity_usd = float(liquidity_usd) if liquidity_usd not in ['N/A', ''] else 0.0
+    volume_24h = float(volume_24h) if volume_24h not in ['N/A', ''] else 0.0
+    buys_24h = int(buys_24h) if buys_24h not in ['N/A', ''] else 0
+    sells_24h = int(sells_24h) if sells_24h not in ['N/A', ''] else 0
+    txns_24h = int(txns_24h) if txns_24h not in ['N/A', ''] else 0
+    fdv = float(fdv) if fdv not in ['N/A', ''] else 'N/A'
+
+    # Calculer la valeur actuelle de l'investissement
+    current_investment_value = amount_of_tokens * current_price_usd
+
+    # Calculer le gain ou la perte en montant absolu
+    profit_loss_amount = current_investment_value - purchase_amount
+
+    # Calculer le gain ou la perte en pourcentage
+    profit_loss_percentage = (profit_loss_amount / purchase_amount) * 100 if purchase_amount != 0 else 0
+
+    # Préparer les résultats
+    return {
+        "Token Name": token_name,
+        "Chain ID": purchase.get('Chain ID', ''),
+        "Pair ID": purchase.get('Full Hash 1', ''),
+        "Purchase Date": purchase.get('Purchase Date', ''),
+        "Purchase Price": purchase.get('Purchase Price', 0.0),
+        "Current Price": current_price_usd,
+        "Purchase Amount ($)": purchase_amount,
+        "Current Investment Value ($)": current_investment_value,
+        "Profit/Loss Amount ($)": profit_loss_amount,
+        "Profit/Loss Percentage (%)": profit_loss_percentage,
+        "Amount of Tokens Purchased": amount_of_tokens,
+        "Liquidity USD": liquidity_usd,
+        "Market Cap (FDV)": fdv,
+        "Volume 24h": volume_24h,
+        "Transactions 24h": txns_24h,
+        "Buys 24h": buys_24h,
+        "Sells 24h": sells_24h,
+        "Last Updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+# Afficher les résultats pour un token
+def print_result(result):
+    fdv = result["Market Cap (FDV)"]
+    print(f"--- Résultats pour le token '{result['Token Name']}' ---")
+    print(f"Acheté le : {result['Purchase Date']}")
+    print(f"Prix d'achat : ${result['Purchase Price']}")
+    print(f"Prix actuel : ${result['Current Price']}")
+    print(f"Montant investi : ${result['Purchase Amount ($)']}")
+    print(f"Valeur actuelle de l'investissement : ${result['Current Investment Value ($)']:.4f}")
+    if result["Profit/Loss Amount ($)"] >= 0:
+        print(f"Gain : ${result['Profit/Loss Amount ($)']:.4f} (+{result['Profit/Loss Percentage (%)']:.2f}%)")
+    else:
+        print(f"Perte : ${result['Profit/Loss Amount ($)']:.4f} ({result['Profit/Loss Percentage (%)']:.2f}%)")
+    print(f"Liquidité (USD) : ${result['Liquidity USD']}")
+    print(f"Market Cap (FDV) : {fdv if fdv != 'N/A' else 'Non Disponible'}")
+    print(f"Volume sur 24h : ${result['Volume 24h']}")
+    print(f"Transactions sur 24h : {result['Transactions 24h']} "
+          f"(Achats: {result['Buys 24h']}, Ventes: {result['Sells 24h']})")
+    print("-" * 40)
+
+# Afficher le gain ou la perte total
+def print_totals(total_purchase_amount, total_current_investment_value):
+    # Calculer le gain ou la perte total
+    total_profit_loss_amount = total_current_investment_value - total_purchase_amount
+    if total_purchase_amount != 0:
+        total_profit_loss_percentage = (total_profit_loss_amount / total_purchase_amount) * 100
+    else:
+        total_profit_loss_percentage = 0
+
+    print("\n=== Résultats Totaux ===")
+    print(f"Montant total investi : ${total_purchase_amount}")
+    print(f"Valeur totale actuelle des investissements : ${total_current_investment_value:.4f}")
+    if total_profit_loss_amount >= 0:
+        print(f"Gain total : ${total_profit_loss_amount:.4f} (+{total_profit_loss_percentage:.2f}%)")
+    else:
+        print(f"Perte totale : ${total_profit_loss_amount:.4f} ({total_profit_loss_percentage:.2f}%)")
+    print("========================\n")
+
+def process_simulated_purchases(workers=1, cache=None, max_staleness=None):
+    # Lire le fichier simulated_purchases.json
+    simulated_purchases = load_simulated_purchases()
+    if simulated_purchases is None:
         return
 
     results = []  # Pour stocker les résultats finaux
     total_purchase_amount = 0.0  # Montant total investi
     total_current_investment_value = 0.0  # Valeur actuelle totale des investissements
 
+    # Récupérer toutes les paires en lots avant de calculer les résultats
+    pairs_by_key = fetch_pairs_for_purchases(simulated_purchases, workers=workers,
+                                             cache=cache, max_staleness=max_staleness)
+
     for purchase in simulated_purchases:
         token_name = purchase.get('Token Name', 'Unknown')
         chain_id = purchase.get('Chain ID', '')
         pair_id = purchase.get('Full Hash 1', '')
-        purchase_price = purchase.get('Purchase Price', 0.0)
-        purchase_amount = purchase.get('Purchase Amount ($)', 0.0)
-        amount_of_tokens = purchase.get('Amount of Tokens Purchased', 0.0)
-        purchase_date = purchase.get('Purchase Date', '')
-        
+
         if not chain_id or not pair_id:
             print(f"Skipping token '{token_name}' due to missing chain ID or pair ID.")
             continue
 
-        print(f"Retrieving data for token '{token_name}' with chain ID '{chain_id}' and pair ID '{pair_id}'")
-        pair_info = get_pair_info(chain_id, pair_id)
+        pair_info = pairs_by_key.get(pair_key(chain_id, pair_id))
         if pair_info:
-            # Récupérer le prix actuel
-            current_price_usd = pair_info.get('priceUsd', 0.0)
-            if current_price_usd == 'N/A' or current_price_usd == '':
+            result = build_result(purchase, pair_info)
+            if result is None:
                 print(f"Le prix actuel pour le token '{token_name}' n'est pas disponible.")
                 continue
-            current_price_usd = float(current_price_usd)
-
-            # Récupérer les informations supplémentaires
-            liquidity_usd = pair_info.get('liquidity', {}).get('usd', 0.0)
-            fdv = pair_info.get('fdv', 'N/A')
-            volume_24h = pair_info.get('volume', {}).get('h24', 0.0)
-            txns_24h_info = pair_info.get('txns', {}).get('h24', {})
-            buys_24h = txns_24h_info.get('buys', 0)
-            sells_24h = txns_24h_info.get('sells', 0)
-            txns_24h = buys_24h + sells_24h
-
-            # Convertir les valeurs en float si nécessaire
-            liquidity_usd = float(liquidity_usd) if liquidity_usd not in ['N/A', ''] else 0.0
-            volume_24h = float(volume_24h) if volume_24h not in ['N/A', ''] else 0.0
-            buys_24h = int(buys_24h) if buys_24h not in ['N/A', ''] else 0
-            sells_24h = int(sells_24h) if sells_24h not in ['N/A', ''] else 0
-            txns_24h = int(txns_24h) if txns_24h not in ['N/A', ''] else 0
-            fdv = float(fdv) if fdv not in ['N/A', ''] else 'N/A'
-
-            # Calculer la valeur actuelle de l'investissement
-            current_investment_value = amount_of_tokens * current_price_usd
-
-            # Calculer le gain ou la perte en montant absolu
-            profit_loss_amount = current_investment_value - purchase_amount
-
-            # Calculer le gain ou la perte en pourcentage
-            profit_loss_percentage = (profit_loss_amount / purchase_amount) * 100 if purchase_amount != 0 else 0
 
             # Accumuler les totaux
-            total_purchase_amount += purchase_amount
-            total_current_investment_value += current_investment_value
-
-            # Préparer les résultats
-            result = {
-                "Token Name": token_name,
-                "Chain ID": chain_id,
-                "Pair ID": pair_id,
-                "Purchase Date": purchase_date,
-                "Purchase Price": purchase_price,
-                "Current Price": current_price_usd,
-                "Purchase Amount ($)": purchase_amount,
-                "Current Investment Value ($)": current_investment_value,
-                "Profit/Loss Amount ($)": profit_loss_amount,
-                "Profit/Loss Percentage (%)": profit_loss_percentage,
-                "Amount of Tokens Purchased": amount_of_tokens,
-                "Liquidity USD": liquidity_usd,
-                "Market Cap (FDV)": fdv,
-                "Volume 24h": volume_24h,
-                "Transactions 24h": txns_24h,
-                "Buys 24h": buys_24h,
-                "Sells 24h": sells_24h,
-                "Last Updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            total_purchase_amount += result["Purchase Amount ($)"]
+            total_current_investment_value += result["Current Investment Value ($)"]
 
             results.append(result)
 
             # Afficher les résultats pour ce token
-            print(f"--- Résultats pour le token '{token_name}' ---")
-            print(f"Acheté le : {purchase_date}")
-            print(f"Prix d'achat : ${purchase_price}")
-            print(f"Prix actuel : ${current_price_usd}")
-            print(f"Montant investi : ${purchase_amount}")
-            print(f"Valeur actuelle de l'investissement : ${current_investment_value:.4f}")
-            if profit_loss_amount >= 0:
-                print(f"Gain : ${profit_loss_amount:.4f} (+{profit_loss_percentage:.2f}%)")
-            else:
-                print(f"Perte : ${profit_loss_amount:.4f} ({profit_loss_percentage:.2f}%)")
-            print(f"Liquidité (USD) : ${liquidity_usd}")
-            print(f"Market Cap (FDV) : {fdv if fdv != 'N/A' else 'Non Disponible'}")
-            print(f"Volume sur 24h : ${volume_24h}")
-            print(f"Transactions sur 24h : {txns_24h} (Achats: {buys_24h}, Ventes: {sells_24h})")
-            print("-" * 40)
+            print_result(result)
         else:
             print(f"Les informations pour le token '{token_name}' n'ont pas pu être récupérées.")
 
-    # Calculer le gain ou la perte total
-    total_profit_loss_amount = total_current_investment_value - total_purchase_amount
-    if total_purchase_amount != 0:
-        total_profit_loss_percentage = (total_profit_loss_amount / total_purchase_amount) * 100
-    else:
-        total_profit_loss_percentage = 0
-
-    # Afficher le gain ou la perte total
-    print("\n=== Résultats Totaux ===")
-    print(f"Montant total investi : ${total_purchase_amount}")
-    print(f"Valeur totale actuelle des investissements : ${total_current_investment_value:.4f}")
-    if total_profit_loss_amount >= 0:
-        print(f"Gain total : ${total_profit_loss_amount:.4f} (+{total_profit_loss_percentage:.2f}%)")
-    else:
-        print(f"Perte totale : ${total_profit_loss_amount:.4f} ({total_profit_loss_percentage:.2f}%)")
-    print("========================\n")
+    print_totals(total_purchase_amount, total_current_investment_value)
+    print_request_stats()
+    if cache is not None:
+        print_cache_stats(cache)
 
     # Enregistrer les résultats dans un fichier JSON
     if results:
@@ -160,5 +318,192 @@ def process_simulated_purchases():
             json.dump(results, f, indent=4)
         print("Les résultats ont été enregistrés dans 'purchase_results.json'.")
 
+# Lire les achats un par un sans charger tout le fichier : JSON Lines (un objet par ligne)
+# ou tableau JSON décodé morceau par morceau
+def iter_purchases(path, chunk_size=1 << 16):
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = f.read(chunk_size)
+        position = len(buffer) - len(buffer.lstrip())
+        if not buffer[position:position + 1] == '[':
+            # JSON Lines
+            f.seek(0)
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        position += 1
+        while True:
+            # Sauter les séparateurs, en lisant la suite du fichier si nécessaire
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                buffer, position = f.read(chunk_size), 0
+                if not buffer:
+                    raise ValueError(f"Tableau JSON non terminé dans {path}")
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                purchase, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Objet coupé en fin de morceau : lire la suite
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield purchase
+            position = end
+            if position > chunk_size:
+                buffer, position = buffer[position:], 0
+
+# État du mode flux : prochain achat à traiter, taille du fichier de sortie et totaux courants
+def load_stream_state(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def save_stream_state(path, state):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+# Mode flux : mémoire bornée quel que soit le nombre d'achats.
+# Les achats sont lus au fil de l'eau et enrichis par lots de batch_size ; chaque résultat est
+# ajouté en JSON Lines dans output_path, vidé sur disque à la fin de chaque lot avec l'état
+# (output_path + '.state'). Avec resume=True, le traitement reprend après le dernier lot écrit.
+def stream_simulated_purchases(input_path='simulated_purchases.json', output_path='purchase_results.jsonl',
+                               batch_size=500, workers=1, cache=None, max_staleness=None, resume=False):
+    state_path = f'{output_path}.state'
+    state = load_stream_state(state_path) if resume else None
+    if state is None:
+        state = {'next_index': 0, 'output_offset': 0, 'written': 0, 'skipped': 0,
+                 'total_purchase_amount': 0.0, 'total_current_investment_value': 0.0}
+    elif state['next_index']:
+        print(f"Reprise à l'achat n°{state['next_index']} ({state['written']} résultat(s) déjà écrit(s)).")
+
+    start_time = time()
+    processed_this_run = 0
+    with open(output_path, 'a+b') as out:
+        # Écarter les lignes écrites après le dernier état enregistré (arrêt en cours de lot)
+        out.truncate(state['output_offset'])
+        out.seek(state['output_offset'])
+
+        def process_batch(batch):
+            pairs_by_key = fetch_pairs_for_purchases([purchase for _, purchase in batch], workers=workers,
+                                                     cache=cache, max_staleness=max_staleness, verbose=False)
+            lines = []
+            for index, purchase in batch:
+                chain_id = purchase.get('Chain ID', '')
+                pair_id = purchase.get('Full Hash 1', '')
+                pair_info = pairs_by_key.get(pair_key(chain_id, pair_id)) if chain_id and pair_id else None
+                result = build_result(purchase, pair_info) if pair_info else None
+                if result is None:
+                    state['skipped'] += 1
+                    continue
+                result["Input Index"] = index
+                state['written'] += 1
+                state['total_purchase_amount'] += result["Purchase Amount ($)"]
+                state['total_current_investment_value'] += result["Current Investment Value ($)"]
+                lines.append(json.dumps(result))
+            if lines:
+                out.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            out.flush()
+            os.fsync(out.fileno())
+            state['next_index'] = batch[-1][0] + 1
+            state['output_offset'] = out.tell()
+            save_stream_state(state_path, state)
+
+        batch = []
+        for index, purchase in enumerate(iter_purchases(input_path)):
+            if index < state['next_index']:
+                continue
+            batch.append((index, purchase))
+            if len(batch) >= batch_size:
+                process_batch(batch)
+                processed_this_run += len(batch)
+                batch = []
+                elapsed = time() - start_time
+                print(f"{state['next_index']} achat(s) traité(s), {state['written']} résultat(s) écrit(s) "
+                      f"({processed_this_run / elapsed:.0f} achats/s)")
+        if batch:
+            process_batch(batch)
+            processed_this_run += len(batch)
+
+    print(f"{processed_this_run} achat(s) traité(s) en {time() - start_time:.2f}s ; "
+          f"{state['skipped']} ignoré(s) (paire ou prix indisponible).")
+    print_totals(state['total_purchase_amount'], state['total_current_investment_value'])
+    print_request_stats()
+    if cache is not None:
+        print_cache_stats(cache)
+    print(f"Les résultats ont été enregistrés dans '{output_path}'.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Met à jour les prix des achats simulés via l'API DexScreener.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Nombre de requêtes API simultanées (1 = séquentiel)")
+    parser.add_argument('--cache', action='store_true',
+                        help="Réutiliser les réponses récentes de l'API (cache de paires, désactivé par défaut)")
+    parser.add_argument('--max-staleness', type=float, default=None,
+                        help="Âge maximal (s) d'une réponse en cache pour être réutilisée, au plus --cache-ttl "
+                             "(active le cache ; 0 = toujours interroger l'API)")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL,
+                        help="Durée de vie (s) des réponses en cache")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Nombre maximal de paires gardées en mémoire (LRU)")
+    parser.add_argument('--cache-file', default='pair_cache.sqlite',
+                        help="Fichier SQLite du cache persistant ('' pour un cache en mémoire uniquement)")
+    parser.add_argument('--track', action='store_true',
+                        help="Mode suivi continu : réinterroger les paires à intervalle régulier")
+    parser.add_argument('--interval', type=float, default=60,
+                        help="Intervalle (s) entre deux cycles du mode suivi")
+    parser.add_argument('--history-file', default='price_history.csv',
+                        help="Série temporelle (CSV en ajout seul) alimentée par le mode suivi")
+    parser.add_argument('--stream', action='store_true',
+                        help="Mode flux à mémoire bornée : lecture incrémentale, résultats en JSON Lines")
+    parser.add_argument('--input', default='simulated_purchases.json',
+                        help="Achats du mode flux (tableau JSON ou JSON Lines)")
+    parser.add_argument('--output', default='purchase_results.jsonl',
+                        help="Résultats du mode flux, un objet JSON par ligne")
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help="Achats enrichis puis écrits par lot en mode flux")
+    parser.add_argument('--resume', action='store_true',
+                        help="Mode flux : reprendre après le dernier lot écrit au lieu de repartir de zéro")
+    args = parser.parse_args(argv)
+    if args.max_staleness is not None:
+        if args.max_staleness > args.cache_ttl:
+            parser.error(f"--max-staleness ({args.max_staleness:g}s) ne peut pas dépasser --cache-ttl "
+                         f"({args.cache_ttl:g}s) : les réponses plus anciennes ne sont pas conservées")
+        args.cache = True
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers > 1:
+        dexscreener_api.configure_pool(args.workers)
+    if args.track:
+        track_prices(interval=args.interval, workers=args.workers, history_path=args.history_file)
+        return
+    pair_cache = None
+    if args.cache:
+        pair_cache = PairCache(ttl=args.cache_ttl, max_entries=args.cache_size, db_path=args.cache_file or None)
+    try:
+        if args.stream:
+            stream_simulated_purchases(args.input, args.output, batch_size=args.batch_size, workers=args.workers,
+                                       cache=pair_cache, max_staleness=args.max_staleness, resume=args.resume)
+        else:
+            process_simulated_purchases(workers=args.workers, cache=pair_cache, max_staleness=args.max_staleness)
+    finally:
+        if pair_cache is not None:
+            pair_cache.close()
+
 if __name__ == '__main__':
-    process_simulated_purchases()
+    main()
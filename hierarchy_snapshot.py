@@ -0,0 +1,119 @@
+import io
+import re
+import xml.etree.ElementTree as ET
+
+from appium.webdriver.common.appiumby import AppiumBy
+
+BOUNDS_PATTERN = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+
+# Content-desc of the list headers/tabs that are not token rows
+NON_TOKEN_KEYWORDS = ["Trending", "Moonshot", "Newest"]
+
+
+# One node of a UiAutomator2 page source, with the attributes the scripts use
+class SnapshotNode:
+    __slots__ = ('class_name', 'text', 'content_desc', 'clickable', 'bounds', 'order')
+
+    def __init__(self, class_name, text, content_desc, clickable, bounds, order):
+        self.class_name = class_name
+        self.text = text
+        self.content_desc = content_desc
+        self.clickable = clickable
+        self.bounds = bounds
+        self.order = order
+
+    @property
+    def top(self):
+        return self.bounds[1]
+
+    @property
+    def rect(self):
+        x1, y1, x2, y2 = self.bounds
+        return {'x': x1, 'y': y1, 'width': x2 - x1, 'height': y2 - y1}
+
+    @property
+    def center(self):
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def __repr__(self):
+        return f"SnapshotNode({self.class_name!r}, content_desc={self.content_desc!r}, bounds={self.bounds})"
+
+
+def parse_bounds(bounds):
+    match = BOUNDS_PATTERN.match(bounds or '')
+    if not match:
+        return 0, 0, 0, 0
+    return tuple(int(value) for value in match.groups())
+
+
+# Parse a page source in one pass, returning every node in document order
+def parse_page_source(page_source):
+    if isinstance(page_source, str):
+        page_source = page_source.encode('utf-8')
+    nodes = []
+    for _, element in ET.iterparse(io.BytesIO(page_source), events=('start',)):
+        attributes = element.attrib
+        if 'bounds' not in attributes:
+            continue
+        nodes.append(SnapshotNode(
+            attributes.get('class', element.tag),
+            attributes.get('text', ''),
+            attributes.get('content-desc', ''),
+            attributes.get('clickable') == 'true',
+            parse_bounds(attributes['bounds']),
+            len(nodes)
+        ))
+    return nodes
+
+
+# Fetch the whole hierarchy with a single driver round trip
+def take_snapshot(driver):
+    return parse_page_source(driver.page_source)
+
+
+# Equivalent of //android.view.ViewGroup[@content-desc] over a snapshot
+def content_desc_view_groups(nodes, clickable=None):
+    return [
+        node for node in nodes
+        if node.class_name == 'android.view.ViewGroup' and node.content_desc
+        and (clickable is None or node.clickable == clickable)
+    ]
+
+
+# Token rows of the list screen, in on-screen order
+def token_rows(nodes, screen_bottom_y=None):
+    rows = []
+    for node in content_desc_view_groups(nodes):
+        if screen_bottom_y is not None and node.top >= screen_bottom_y:
+            continue
+        if any(keyword in node.content_desc for keyword in NON_TOKEN_KEYWORDS):
+            continue
+        rows.append(node)
+    return rows
+
+
+# First TextView whose text matches, or None
+def find_text_view(nodes, text):
+    for node in nodes:
+        if node.class_name == 'android.widget.TextView' and node.text == text:
+            return node
+    return None
+
+
+# Build an XPath string literal that is valid whatever quotes the value contains
+def xpath_literal(value):
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    parts = value.split('"')
+    return 'concat(' + ', \'"\', '.join(f'"{part}"' for part in parts) + ')'
+
+
+# Resolve the live element behind a snapshot node, only when it must be clicked
+def resolve_element(driver, node):
+    return driver.find_element(
+        AppiumBy.XPATH,
+        f'//{node.class_name}[@content-desc={xpath_literal(node.content_desc)}]'
+    )
@@ -0,0 +1,368 @@
+import json
+import logging
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter, time
+
+import dexscreener_api
+
+# Histogram bucket upper bounds. Appium round trips take tens of milliseconds to seconds,
+# a whole token drill-down tens of seconds.
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROUND_TRIP_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+MAX_TRACKED_TOKENS = 200  # Tokens whose per-operation breakdown is kept; the oldest are dropped first
+
+METRIC_PREFIX = 'dexscreener'
+
+# Token being processed by the current thread, used to attribute commands to it
+current_token = ContextVar('current_token', default=None)
+
+
+# Cumulative histogram in the Prometheus sense: counts per upper bound, plus sum and count
+class Histogram:
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    # Approximate quantile: upper bound of the bucket holding it
+    def quantile(self, fraction):
+        if not self.count:
+            return 0.0
+        rank, seen = fraction * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)},
+        }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Thread-safe registry of operation timings.
+# Every observation costs a lock and a bisect, negligible next to a device or network round trip,
+# so the profiler can stay enabled in production. Per-token breakdowns are bounded by max_tokens.
+class Profiler:
+    def __init__(self, max_tokens=MAX_TRACKED_TOKENS):
+        self.max_tokens = max_tokens
+        self.started = time()
+        self.lock = threading.Lock()
+        self.operations = {}  # operation -> Histogram
+        self.tokens = OrderedDict()  # token -> {'wall_s': seconds, 'operations': {operation: [count, seconds]}}
+        self.token_walls = Histogram()
+        self.round_trips = {'appium': 0, 'http': 0}
+        self.cycles = 0
+        self.cycle_round_trips = {kind: Histogram(ROUND_TRIP_BUCKETS) for kind in self.round_trips}
+        self.cycle_walls = Histogram()
+
+    def _token_entry(self, token):
+        entry = self.tokens.get(token)
+        if entry is None:
+            entry = self.tokens[token] = {'wall_s': 0.0, 'operations': {}}
+            while len(self.tokens) > self.max_tokens:
+                self.tokens.popitem(last=False)
+        return entry
+
+    # Record one operation; `kind` ('appium' or 'http') marks it as a round trip
+    def observe(self, operation, seconds, kind=None):
+        token = current_token.get()
+        with self.lock:
+            histogram = self.operations.get(operation)
+            if histogram is None:
+                histogram = self.operations[operation] = Histogram()
+            histogram.observe(seconds)
+            if kind is not None:
+                self.round_trips[kind] += 1
+            if token is not None:
+                totals = self._token_entry(token)['operations'].setdefault(operation, [0, 0.0])
+                totals[0] += 1
+                totals[1] += seconds
+
+    @contextmanager
+    def timed(self, operation, kind=None):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(operation, perf_counter() - start, kind)
+
+    # Attribute everything done inside the block to token_name and record its wall time
+    @contextmanager
+    def token(self, token_name):
+        reset = current_token.set(token_name)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            wall = perf_counter() - start
+            current_token.reset(reset)
+            with self.lock:
+                self._token_entry(token_name)['wall_s'] += wall
+                self.token_walls.observe(wall)
+            logging.info(self.token_breakdown(token_name))
+
+    # Record the wall time and the number of round trips of one capture or monitor cycle
+    @contextmanager
+    def cycle(self):
+        with self.lock:
+            before = dict(self.round_trips)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            wall = perf_counter() - start
+            with self.lock:
+                self.cycles += 1
+                self.cycle_walls.observe(wall)
+                for kind, histogram in self.cycle_round_trips.items():
+                    histogram.observe(self.round_trips[kind] - before[kind])
+
+    # One log line: where a token's time went, largest operations first
+    def token_breakdown(self, token_name, limit=5):
+        with self.lock:
+            entry = self.tokens.get(token_name)
+            if entry is None:
+                return f"Token '{token_name}': no timings"
+            operations = sorted(entry['operations'].items(), key=lambda item: item[1][1], reverse=True)
+            accounted = sum(seconds for _, (_, seconds) in operations)
+            parts = ', '.join(f"{operation} {count}x {seconds:.2f}s" for operation, (count, seconds) in operations[:limit])
+            return f"Token '{token_name}': {entry['wall_s']:.2f}s, {accounted:.2f}s in round trips ({parts})"
+
+    def profile(self):
+        with self.lock:
+            return {
+                'started': self.started,
+                'uptime_s': time() - self.started,
+                'round_trips': dict(self.round_trips),
+                'operations': {operation: histogram.to_dict()
+                               for operation, histogram in sorted(self.operations.items())},
+                'cycles': {
+                    'count': self.cycles,
+                    'wall_s': self.cycle_walls.to_dict(),
+                    'round_trips': {kind: histogram.to_dict() for kind, histogram in self.cycle_round_trips.items()},
+                },
+                'token_wall_s': self.token_walls.to_dict(),
+                'tokens': {token: {'wall_s': entry['wall_s'],
+                                   'operations': {operation: {'count': count, 'seconds': seconds}
+                                                  for operation, (count, seconds) in entry['operations'].items()}}
+                           for token, entry in self.tokens.items()},
+            }
+
+    def dump(self, path):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.profile(), f, indent=4)
+        os.replace(tmp_path, path)
+
+    # Prometheus text exposition format. Per-token breakdowns roll with the token LRU and would make
+    # one series per token, so they are only served by profile() (/profile.json).
+    def prometheus(self):
+        lines = []
+
+        def histogram(name, help_text, histograms, label):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for value, h in histograms:
+                labels = f'{label}="{_label(value)}",' if label else ''
+                cumulative = 0
+                for bound, count in zip(h.buckets + ('+Inf',), h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+                labels = f'{{{labels[:-1]}}}' if labels else ''
+                lines.append(f'{name}_sum{labels} {h.sum}')
+                lines.append(f'{name}_count{labels} {h.count}')
+
+        with self.lock:
+            histogram(f'{METRIC_PREFIX}_operation_seconds', 'Duration of Appium commands and API requests.',
+                      sorted(self.operations.items()), 'operation')
+            histogram(f'{METRIC_PREFIX}_token_seconds', 'Wall time spent drilling into one token.',
+                      [(None, self.token_walls)], None)
+            histogram(f'{METRIC_PREFIX}_cycle_seconds', 'Wall time of one capture or monitor cycle.',
+                      [(None, self.cycle_walls)], None)
+            histogram(f'{METRIC_PREFIX}_cycle_round_trips', 'Round trips issued during one cycle.',
+                      sorted(self.cycle_round_trips.items()), 'kind')
+
+            name = f'{METRIC_PREFIX}_round_trips_total'
+            lines += [f'# HELP {name} Round trips issued since start.', f'# TYPE {name} counter']
+            lines += [f'{name}{{kind="{kind}"}} {count}' for kind, count in sorted(self.round_trips.items())]
+        return '\n'.join(lines) + '\n'
+
+
+# Token and cycle scopes that only cost something when the driver is instrumented
+def profile_token(driver, token_name):
+    profiler = getattr(driver, 'profiler', None)
+    return profiler.token(token_name) if profiler is not None else _no_profile()
+
+
+def profile_cycle(driver):
+    profiler = getattr(driver, 'profiler', None)
+    return profiler.cycle() if profiler is not None else _no_profile()
+
+
+@contextmanager
+def _no_profile():
+    yield
+
+
+# Element returned by InstrumentedDriver: times every command sent for it
+class InstrumentedElement:
+    def __init__(self, profiler, element):
+        self._profiler = profiler
+        self._element = element
+
+    def _command(self, name, function, *args):
+        with self._profiler.timed(f'appium.{name}', 'appium'):
+            return function(*args)
+
+    def click(self):
+        return self._command('click', self._element.click)
+
+    def get_attribute(self, name):
+        return self._command('get_attribute', self._element.get_attribute, name)
+
+    @property
+    def rect(self):
+        return self._command('rect', lambda: self._element.rect)
+
+    @property
+    def location(self):
+        return self._command('location', lambda: self._element.location)
+
+    @property
+    def size(self):
+        return self._command('size', lambda: self._element.size)
+
+    @property
+    def text(self):
+        return self._command('text', lambda: self._element.text)
+
+    def __getattr__(self, name):
+        return getattr(self._element, name)
+
+
+# Wraps an Appium driver (or a replay driver) and times every command it sends,
+# keyed by command and by the token being processed
+class InstrumentedDriver:
+    def __init__(self, driver, profiler):
+        self._driver = driver
+        self.profiler = profiler
+
+    def _command(self, name, function, *args):
+        with self.profiler.timed(f'appium.{name}', 'appium'):
+            return function(*args)
+
+    @property
+    def session_id(self):
+        return self._driver.session_id
+
+    @property
+    def page_source(self):
+        return self._command('page_source', lambda: self._driver.page_source)
+
+    def find_element(self, by, value):
+        return InstrumentedElement(self.profiler, self._command('find_element', self._driver.find_element, by, value))
+
+    def find_elements(self, by, value):
+        elements = self._command('find_elements', self._driver.find_elements, by, value)
+        return [InstrumentedElement(self.profiler, element) for element in elements]
+
+    def get_window_size(self):
+        return self._command('get_window_size', self._driver.get_window_size)
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=0):
+        return self._command('swipe', self._driver.swipe, start_x, start_y, end_x, end_y, duration)
+
+    def tap(self, positions, duration=None):
+        return self._command('tap', self._driver.tap, positions, duration)
+
+    def back(self):
+        return self._command('back', self._driver.back)
+
+    def set_clipboard_text(self, text):
+        return self._command('set_clipboard_text', self._driver.set_clipboard_text, text)
+
+    def get_clipboard_text(self):
+        return self._command('get_clipboard_text', self._driver.get_clipboard_text)
+
+    def quit(self):
+        return self._command('quit', self._driver.quit)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+# Time every DexScreener API request, keyed by endpoint (addresses are dropped from the path)
+def instrument_api(profiler):
+    def observe(path, latency, ok):
+        endpoint = '/' + '/'.join(path.strip('/').split('/')[:3])
+        profiler.observe(f'http.{endpoint}', latency, 'http')
+
+    dexscreener_api.request_observers.append(observe)
+    return observe
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    profiler = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] == '/metrics':
+            body, content_type = self.profiler.prometheus(), 'text/plain; version=0.0.4'
+        elif self.path.split('?')[0] == '/profile.json':
+            body, content_type = json.dumps(self.profiler.profile()), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve /metrics (Prometheus) and /profile.json from a background thread
+def serve_metrics(profiler, port, host='127.0.0.1'):
+    handler = type('MetricsHandler', (_MetricsHandler,), {'profiler': profiler})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logging.info(f"Metrics served on http://{host}:{server.server_port}/metrics")
+    return server
+
+
+# Profile a driver and the API requests made alongside it, optionally serving the metrics
+def instrument(driver, metrics_port=None):
+    profiler = Profiler()
+    instrument_api(profiler)
+    if metrics_port:
+        serve_metrics(profiler, metrics_port)
+    return InstrumentedDriver(driver, profiler)
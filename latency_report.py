@@ -0,0 +1,216 @@
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+
+import dexscreener_api
+from adaptive_polling import percentile
+from get_updated_token_price import fetch_pairs_for_purchases, iter_purchases, pair_key
+from pair_cache import PairCache
+from token_identity import DATE_FORMAT, parse_age
+
+# Lags measured for every purchase: stage -> (start, end) of the timeline
+STAGES = {
+    'listing_to_detection': ('listed', 'detected'),
+    'detection_to_drill': ('detected', 'drill'),
+    'drill_to_purchase': ('drill', 'purchased'),
+    'listing_to_purchase': ('listed', 'purchased'),
+}
+
+# The one number a change to the capture loop is judged by
+HEADLINE = ('listing_to_purchase', 95)
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Objectives, in seconds: (stage, percentile) -> maximum lag
+DEFAULT_SLOS = {
+    ('listing_to_purchase', 50): 120,
+    ('listing_to_purchase', 95): 300,
+    ('detection_to_drill', 95): 60,
+    ('drill_to_purchase', 95): 20,
+}
+
+# Pair creation times never change, so cached pairs are reused for this long
+CREATION_CACHE_TTL = 30 * 86_400
+
+
+def parse_date(text):
+    try:
+        return datetime.strptime(text, DATE_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+# "listing_to_purchase:p95=300" -> (('listing_to_purchase', 95), 300.0)
+def parse_slo(text):
+    try:
+        target, seconds = text.split('=')
+        stage, pct = target.split(':')
+        pct = int(pct.lstrip('p'))
+        seconds = float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected STAGE:pNN=SECONDS, got '{text}'")
+    if stage not in STAGES:
+        raise argparse.ArgumentTypeError(f"unknown stage '{stage}' (choose from {', '.join(STAGES)})")
+    return (stage, pct), seconds
+
+
+# Timestamps of one purchase. The listing time is the API pairCreatedAt when the pair is known,
+# otherwise the detection time minus the age displayed in the list (precise to the displayed unit).
+def purchase_timeline(purchase, pair=None):
+    detected = parse_date(purchase.get('Detected At'))
+    timeline = {
+        'listed': None,
+        'detected': detected,
+        'drill': parse_date(purchase.get('Drill Started At')),
+        'purchased': parse_date(purchase.get('Purchase Date')),
+        'ground_truth': None,
+        'age_estimate': None,
+    }
+    age = parse_age(purchase.get('Time'))
+    if detected is not None and age is not None:
+        timeline['age_estimate'] = detected - age
+    if pair is not None and pair.get('pairCreatedAt'):
+        timeline['listed'], timeline['ground_truth'] = pair['pairCreatedAt'] / 1000, 'api'
+    elif timeline['age_estimate'] is not None:
+        timeline['listed'], timeline['ground_truth'] = timeline['age_estimate'], 'age'
+    return timeline
+
+
+# Lag of each stage in seconds, None when one of its timestamps is missing
+def stage_lags(timeline):
+    lags = {}
+    for stage, (start, end) in STAGES.items():
+        if timeline[start] is not None and timeline[end] is not None:
+            lags[stage] = timeline[end] - timeline[start]
+        else:
+            lags[stage] = None
+    return lags
+
+
+# Fetch the pairs of the purchases to get their pairCreatedAt, from the cache when possible
+def fetch_creation_pairs(purchases, workers=1, cache_file='pair_cache.sqlite'):
+    if workers > 1:
+        dexscreener_api.configure_pool(workers)
+    cache = PairCache(ttl=CREATION_CACHE_TTL, db_path=cache_file or None)
+    try:
+        pairs_by_key = fetch_pairs_for_purchases(purchases, workers=workers, cache=cache, verbose=False)
+    finally:
+        cache.close()
+    return {index: pairs_by_key.get(pair_key(purchase['Chain ID'], purchase['Full Hash 1']))
+            for index, purchase in enumerate(purchases) if purchase.get('Chain ID') and purchase.get('Full Hash 1')}
+
+
+def load_purchases(path, since=None):
+    since = parse_date(since) if since else None
+    purchases = []
+    for purchase in iter_purchases(path):
+        purchased = parse_date(purchase.get('Purchase Date'))
+        if since is not None and (purchased is None or purchased < since):
+            continue
+        purchases.append({field: purchase.get(field) for field in (
+            'Token Name', 'Chain ID', 'Full Hash 1', 'Time', 'Detected At', 'Drill Started At', 'Purchase Date')})
+    return purchases
+
+
+# Percentiles of every stage, ground-truth counts and SLO verdicts
+def build_report(timelines, slos=None):
+    slos = DEFAULT_SLOS if slos is None else slos
+    values = {stage: [] for stage in STAGES}
+    age_errors = []
+    for timeline in timelines:
+        for stage, lag in stage_lags(timeline).items():
+            if lag is not None:
+                values[stage].append(lag)
+        if timeline['ground_truth'] == 'api' and timeline['age_estimate'] is not None:
+            age_errors.append(abs(timeline['age_estimate'] - timeline['listed']))
+
+    stages = {}
+    for stage, lags in values.items():
+        stages[stage] = {'count': len(lags), 'max_s': max(lags, default=None)}
+        for pct in PERCENTILES:
+            stages[stage][f'p{pct}_s'] = percentile(lags, pct / 100) if lags else None
+
+    breaches = []
+    for (stage, pct), limit in sorted(slos.items()):
+        value = percentile(values[stage], pct / 100) if values[stage] else None
+        if value is not None and value > limit:
+            breaches.append({'stage': stage, 'percentile': pct, 'value_s': value, 'limit_s': limit})
+
+    stage, pct = HEADLINE
+    return {
+        'purchases': len(timelines),
+        'headline': {'stage': stage, 'percentile': pct,
+                     'value_s': percentile(values[stage], pct / 100) if values[stage] else None,
+                     'limit_s': slos.get(HEADLINE)},
+        'stages': stages,
+        'ground_truth': {
+            'api': sum(timeline['ground_truth'] == 'api' for timeline in timelines),
+            'age': sum(timeline['ground_truth'] == 'age' for timeline in timelines),
+            'none': sum(timeline['ground_truth'] is None for timeline in timelines),
+            'age_error_p50_s': percentile(age_errors, 0.5) if age_errors else None,
+        },
+        'slos': [{'stage': stage, 'percentile': pct, 'limit_s': limit} for (stage, pct), limit in sorted(slos.items())],
+        'breaches': breaches,
+    }
+
+
+def print_report(report):
+    headline = report['headline']
+    value = headline['value_s']
+    verdict = '' if headline['limit_s'] is None or value is None else (
+        f" (SLO {headline['limit_s']:.0f}s: {'BREACH' if value > headline['limit_s'] else 'ok'})")
+    print(f"{headline['stage']} p{headline['percentile']}: "
+          f"{'n/a' if value is None else f'{value:.0f}s'}{verdict} over {report['purchases']} purchases\n")
+
+    print(f"{'stage':<24}{'n':>6}" + ''.join(f"{f'p{pct}':>8}" for pct in PERCENTILES) + f"{'max':>8}")
+    for stage, s in report['stages'].items():
+        cells = [s[f'p{pct}_s'] for pct in PERCENTILES] + [s['max_s']]
+        print(f"{stage:<24}{s['count']:>6}" + ''.join(f"{'-':>8}" if cell is None else f"{cell:>7.0f}s" for cell in cells))
+
+    truth = report['ground_truth']
+    error = '' if truth['age_error_p50_s'] is None else f", median error of the age estimate {truth['age_error_p50_s']:.0f}s"
+    print(f"\nListing time: {truth['api']} from pairCreatedAt, {truth['age']} estimated from the displayed age"
+          f"{error}, {truth['none']} unknown")
+    for breach in report['breaches']:
+        print(f"SLO breach: {breach['stage']} p{breach['percentile']} "
+              f"{breach['value_s']:.0f}s > {breach['limit_s']:.0f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Report the lags between listing, detection, drill-down and simulated purchase.')
+    parser.add_argument('--input', default='simulated_purchases.json',
+                        help='Simulated purchases (JSON array or JSON Lines)')
+    parser.add_argument('--since', default=None, help="Only purchases made since this date ('YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument('--no-api', action='store_true',
+                        help='Estimate listing times from the displayed age only, without API requests')
+    parser.add_argument('--workers', type=int, default=1, help='Concurrent API requests')
+    parser.add_argument('--cache-file', default='pair_cache.sqlite',
+                        help="Persistent pair cache ('' for an in-memory cache only)")
+    parser.add_argument('--slo', type=parse_slo, action='append', default=None, metavar='STAGE:pNN=SECONDS',
+                        help='Objective replacing the defaults, e.g. listing_to_purchase:p95=300 (repeatable)')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the report to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    purchases = load_purchases(args.input, args.since)
+    pairs = {} if args.no_api else fetch_creation_pairs(purchases, args.workers, args.cache_file)
+    timelines = [purchase_timeline(purchase, pairs.get(index)) for index, purchase in enumerate(purchases)]
+    report = build_report(timelines, dict(args.slo) if args.slo else None)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=4)
+    if report['breaches']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import logging
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+
+from hierarchy_snapshot import parse_page_source, resolve_element, token_rows
+from token_parsing import parse_row
+from waits import page_source_changed, wait_for
+
+SCREEN_BOTTOM_Y = 2040  # Start of the button area at the bottom of the screen
+MAX_SCROLLS = 5  # Home-page scrolls per search before giving up
+MAX_FLINGS = 3  # Flings allowed to get back to the top of the list
+FLING_DURATION = 120  # Milliseconds; a short swipe is a fling that travels several screens
+
+_window_sizes = {}
+
+
+# Screen geometry, fetched once per session instead of before every swipe
+def window_size(driver):
+    key = getattr(driver, 'session_id', None) or id(driver)
+    if key not in _window_sizes:
+        _window_sizes[key] = driver.get_window_size()
+    return _window_sizes[key]
+
+
+def swipe_vertical(driver, start_fraction, end_fraction, duration=600):
+    size = window_size(driver)
+    x = size["width"] // 2
+    driver.swipe(x, int(size["height"] * start_fraction), x, int(size["height"] * end_fraction), duration)
+
+
+# Token name of a row, read by the parser that produced the names being searched for
+def _row_name(node):
+    return parse_row(node.content_desc).name
+
+
+# First list row of the token, matched on the name field of its content-desc
+def _matching_row(nodes, token_name):
+    for node in token_rows(nodes):
+        if _row_name(node) == token_name:
+            return node
+    return None
+
+
+# Navigates the token list of one driver while keeping track of how far it scrolled.
+# Rows are only searched downwards from the current position, so tokens handled in
+# on-screen order never cause a rewind; the list is rewound only after a miss, and
+# reaching the top takes a fling or two instead of a series of swipes.
+class ListNavigator:
+    def __init__(self, driver):
+        self.driver = driver
+        self.offset = 0  # Home-page scrolls performed since the list was last at the top
+        self.top_row = None  # Name of the first row at the top of the list, used to recognise it again
+
+    def scroll_down(self):
+        # Start the scroll higher on the screen to avoid the bottom buttons
+        swipe_vertical(self.driver, 0.5, 0.2)
+        self.offset += 1
+
+    def fling_up(self):
+        swipe_vertical(self.driver, 0.25, 0.9, FLING_DURATION)
+
+    def _remember_top(self, nodes):
+        if self.offset == 0 and self.top_row is None:
+            rows = token_rows(nodes, SCREEN_BOTTOM_Y)
+            if rows:
+                self.top_row = _row_name(rows[0])
+
+    # Search the visible rows, then scroll down until the token is found or the list stops moving
+    def _scan_down(self, token_name):
+        page_source = self.driver.page_source
+        for attempt in range(MAX_SCROLLS + 1):
+            nodes = parse_page_source(page_source)
+            self._remember_top(nodes)
+            node = _matching_row(nodes, token_name)
+            if node is not None and node.center[1] < SCREEN_BOTTOM_Y:
+                try:
+                    element = resolve_element(self.driver, node)
+                    logging.info(f"Token '{token_name}' found after {attempt} scrolls (offset {self.offset}).")
+                    return element
+                except (NoSuchElementException, StaleElementReferenceException):
+                    logging.warning("Token row changed before it could be resolved, rescanning...")
+                    page_source = self.driver.page_source
+                    continue
+            if attempt == MAX_SCROLLS:
+                break
+
+            # A row hidden by the bottom buttons only needs one more scroll
+            self.scroll_down()
+            new_page_source = wait_for(self.driver, page_source_changed(page_source), 'scroll_settle')
+            if new_page_source is None:
+                # The list did not move: this scroll does not count towards the offset
+                self.offset -= 1
+                logging.info(f"End of the list reached while looking for '{token_name}'.")
+                break
+            page_source = new_page_source
+        return None
+
+    # Return a live element for the token's row, or None if it is not in the list.
+    # The list is rewound at most once, and only if it is not already at the top.
+    def find_row(self, token_name):
+        element = self._scan_down(token_name)
+        if element is None and self.offset > 0:
+            logging.info(f"Token '{token_name}' not found below offset {self.offset}, returning to the top.")
+            self.return_to_top()
+            element = self._scan_down(token_name)
+        if element is None:
+            logging.warning(f"Token '{token_name}' not found in the list.")
+        return element
+
+    # Fling back to the top. The top is recognised when the row that was first there is visible
+    # again (new listings only push it down) or when a fling no longer moves the list.
+    def return_to_top(self):
+        if self.offset == 0:
+            return
+        page_source = self.driver.page_source
+        for fling in range(1, MAX_FLINGS + 1):
+            self.fling_up()
+            new_page_source = wait_for(self.driver, page_source_changed(page_source), 'scroll_settle')
+            if new_page_source is None:
+                break
+            page_source = new_page_source
+            if self.top_row and any(_row_name(node) == self.top_row
+                                    for node in token_rows(parse_page_source(page_source), SCREEN_BOTTOM_Y)):
+                break
+        logging.info(f"Returned to the top of the list from offset {self.offset} with {fling} flings.")
+        self.offset = 0
+        self.top_row = None
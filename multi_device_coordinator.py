@@ -0,0 +1,202 @@
+import argparse
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from selenium.common.exceptions import WebDriverException
+
+from appium_session import DEFAULT_SERVER_URL, create_driver
+from dedupe_index import DedupeIndex
+from dexscreenerlistener import (claim_new_rows, extract_basic_token_data, process_token, release_dropped_claims,
+                                 save_results)
+from drilldown_scheduler import DrillScheduler
+from list_navigator import ListNavigator
+from waits import token_list_present, wait_for
+
+ROLE_MONITOR = 'monitor'
+ROLE_DRILL = 'drill'
+
+# Consecutive Appium errors after which a worker gives up and stops the coordinator
+MAX_CONSECUTIVE_ERRORS = 5
+
+
+# Read the device list. Each entry needs a deviceName and may set udid, server_url,
+# systemPort (unique per session on one Appium host) and role ('monitor' or 'drill').
+# When no role is given, the first device monitors and the others drill down.
+def load_device_config(path):
+    with open(path, 'r') as f:
+        devices = json.load(f)
+    if not any(device.get('role') == ROLE_MONITOR for device in devices):
+        devices[0]['role'] = ROLE_MONITOR
+    for device in devices:
+        device.setdefault('role', ROLE_DRILL)
+        device.setdefault('server_url', DEFAULT_SERVER_URL)
+    return devices
+
+
+# Buffers processed tokens from every drill worker and appends them to the result files
+class ResultSink:
+    def __init__(self):
+        self.token_infos = []
+        self.purchases = []
+        self.lock = threading.Lock()
+
+    def add(self, token_info, purchase_data):
+        with self.lock:
+            self.token_infos.append(token_info)
+            if purchase_data is not None:
+                self.purchases.append(purchase_data)
+
+    def flush(self):
+        with self.lock:
+            token_infos, purchases = self.token_infos, self.purchases
+            self.token_infos, self.purchases = [], []
+        if token_infos:
+            save_results(token_infos, purchases, append=True)
+        return len(token_infos)
+
+
+# Count an Appium error of a worker; raises once there were too many in a row
+def record_error(device, failures, error):
+    failures += 1
+    logging.warning(f"[{device['deviceName']}] Appium error ({failures} in a row): {error}")
+    if failures >= MAX_CONSECUTIVE_ERRORS:
+        raise error
+    return failures
+
+
+# Monitor role: poll the Newest list and schedule every token claimed for the first time
+def run_monitor(device, driver, scheduler, dedupe, stop_event, poll_interval):
+    failures = 0
+    while not stop_event.is_set():
+        try:
+            token_data = extract_basic_token_data(driver)
+        except WebDriverException as e:
+            failures = record_error(device, failures, e)
+            stop_event.wait(poll_interval)
+            continue
+        failures = 0
+        for node, token_info in claim_new_rows(dedupe, token_data):
+            token_info["Detected By"] = device['deviceName']
+            if scheduler.push(node, token_info):
+                logging.info(f"Queued token '{token_info['Token Name']}' ({len(scheduler)} waiting)")
+            else:
+                # Filtered out for good (dust or rugging): the claim stands
+                token_info.pop("Claim Key", None)
+        stop_event.wait(poll_interval)
+
+
+# Drill role: take the best scheduled token and open its detail page for the hashes and chain.
+# A token whose drill-down fails is not recorded and its claim is released, so a later poll
+# can queue it again. Session errors count toward MAX_CONSECUTIVE_ERRORS until a drill succeeds.
+def run_drill_worker(device, driver, scheduler, dedupe, sink, stop_event):
+    navigator = ListNavigator(driver)
+    failures = 0
+    while not stop_event.is_set():
+        item = scheduler.pop()
+        if item is None:
+            stop_event.wait(1)
+            continue
+        _, token_info = item
+        claim_key = token_info.pop("Claim Key", None)
+        token_info["Processed By"] = device['deviceName']
+        start_time = time()
+        try:
+            purchase_data = process_token(driver, token_info, navigator)
+        except WebDriverException as e:
+            dedupe.release(claim_key)
+            failures = record_error(device, failures, e)
+            continue
+        scheduler.record_drill(time() - start_time)
+        if purchase_data is None:
+            dedupe.release(claim_key)
+            logging.info(f"[{device['deviceName']}] Drill-down of '{token_info['Token Name']}' failed, claim released")
+            continue
+        failures = 0
+        sink.add(token_info, purchase_data)
+        logging.info(f"[{device['deviceName']}] Processed '{token_info['Token Name']}' in {time() - start_time:.2f} seconds")
+
+
+# Thread body of a worker: an error it cannot recover from is logged and stops the coordinator
+# instead of silently ending the thread
+def run_worker(target, args, stop_event):
+    try:
+        target(*args)
+    except Exception:
+        logging.exception(f"{threading.current_thread().name} failed, stopping the coordinator")
+        stop_event.set()
+
+
+# Start one Appium session per device, in parallel
+def start_sessions(devices):
+    def start(device):
+        driver = create_driver(
+            device['deviceName'], device['server_url'], udid=device.get('udid'), system_port=device.get('systemPort')
+        )
+        wait_for(driver, token_list_present, 'app_ready')
+        return driver
+
+    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        return list(executor.map(start, devices))
+
+
+def run_coordinator(devices, dedupe, poll_interval=2, flush_interval=30, duration=None):
+    if not any(device['role'] == ROLE_DRILL for device in devices):
+        raise ValueError("At least one device must have the 'drill' role")
+
+    drivers = start_sessions(devices)
+    scheduler = DrillScheduler(on_drop=release_dropped_claims(dedupe))
+    sink = ResultSink()
+    stop_event = threading.Event()
+    threads = []
+    try:
+        for device, driver in zip(devices, drivers):
+            if device['role'] == ROLE_MONITOR:
+                target, args = run_monitor, (device, driver, scheduler, dedupe, stop_event, poll_interval)
+            else:
+                target, args = run_drill_worker, (device, driver, scheduler, dedupe, sink, stop_event)
+            thread = threading.Thread(target=run_worker, args=(target, args, stop_event),
+                                      name=f"{device['role']}-{device['deviceName']}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        start_time = time()
+        while not stop_event.is_set() and (duration is None or time() - start_time < duration):
+            stop_event.wait(flush_interval)
+            flushed = sink.flush()
+            if flushed:
+                logging.info(f"Saved {flushed} processed tokens ({len(scheduler)} still queued)")
+        if stop_event.is_set():
+            logging.error("A worker stopped; the coordinator is shutting down")
+    except KeyboardInterrupt:
+        logging.info("Stopping the coordinator...")
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join(timeout=60)
+        sink.flush()
+        for driver in drivers:
+            driver.quit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Shard DexScreener capture across several devices or emulators.')
+    parser.add_argument('--config', default='devices.json', help='JSON list of devices (see devices.example.json)')
+    parser.add_argument('--dedupe-db', default='capture_claims.sqlite', help='SQLite file of already claimed tokens')
+    parser.add_argument('--poll-interval', type=float, default=2, help='Seconds between two polls of the Newest list')
+    parser.add_argument('--flush-interval', type=float, default=30, help='Seconds between two saves of the results')
+    parser.add_argument('--duration', type=float, default=None, help='Stop after this many seconds')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s')
+    dedupe = DedupeIndex(args.dedupe_db)
+    try:
+        run_coordinator(load_device_config(args.config), dedupe, args.poll_interval, args.flush_interval, args.duration)
+    finally:
+        dedupe.close()
+
+
+if __name__ == '__main__':
+    main()
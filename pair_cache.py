@@ -0,0 +1,104 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import time
+
+# Default lifetime of a cached pair response, in seconds
+DEFAULT_TTL = 300
+
+# Default number of pairs kept in the in-process LRU
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+# TTL cache of DexScreener pair responses keyed by (chain_id, pair_id).
+# Entries live in an in-process LRU and, when db_path is given, in a SQLite
+# file so that back-to-back runs can reuse each other's responses.
+class PairCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, db_path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS pairs ('
+                'chain_id TEXT NOT NULL, pair_id TEXT NOT NULL, fetched_at REAL NOT NULL, data TEXT NOT NULL, '
+                'PRIMARY KEY (chain_id, pair_id))'
+            )
+            self.db.execute('DELETE FROM pairs WHERE fetched_at < ?', (time() - ttl,))
+            self.db.commit()
+
+    # Return the cached pair if it is younger than max_staleness (defaults to the TTL).
+    # Entries are dropped once older than the TTL, so a larger max_staleness is rejected.
+    def get(self, key, max_staleness=None):
+        if max_staleness is not None and max_staleness > self.ttl:
+            raise ValueError(f"max_staleness ({max_staleness}s) exceeds the cache TTL ({self.ttl}s)")
+        max_age = self.ttl if max_staleness is None else max_staleness
+        now = time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                fetched_at, data = entry
+                if now - fetched_at <= max_age:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return data
+                if now - fetched_at > self.ttl:
+                    del self.entries[key]
+
+            if self.db is not None:
+                row = self.db.execute(
+                    'SELECT fetched_at, data FROM pairs WHERE chain_id = ? AND pair_id = ?', key
+                ).fetchone()
+                if row is not None and now - row[0] <= max_age:
+                    data = json.loads(row[1])
+                    self._remember(key, row[0], data)
+                    self.hits += 1
+                    return data
+
+            self.misses += 1
+            return None
+
+    # Store a freshly fetched pair in memory and on disk
+    def put(self, key, data, fetched_at=None):
+        fetched_at = time() if fetched_at is None else fetched_at
+        with self.lock:
+            self._remember(key, fetched_at, data)
+            if self.db is not None:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO pairs (chain_id, pair_id, fetched_at, data) VALUES (?, ?, ?, ?)',
+                    (key[0], key[1], fetched_at, json.dumps(data))
+                )
+
+    # Flush pending disk writes; call once per batch of put() calls
+    def commit(self):
+        if self.db is not None:
+            with self.lock:
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.commit()
+            self.db.close()
+            self.db = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries),
+        }
+
+    # Insert into the LRU and evict the least recently used entries beyond max_entries
+    def _remember(self, key, fetched_at, data):
+        self.entries[key] = (fetched_at, data)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
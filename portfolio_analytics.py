@@ -0,0 +1,256 @@
+import argparse
+import json
+import logging
+import os
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzlocal
+
+from columnar_store import ColumnarStore
+from get_updated_token_price import iter_purchases
+
+DEFAULT_PURCHASES_PATH = 'simulated_purchases.json'
+DEFAULT_HISTORY_PATH = 'price_history.csv'
+DEFAULT_RESULTS_PATH = 'purchase_results.json'
+DEFAULT_REPORT_PATH = 'portfolio_report.json'
+
+# Holding-age buckets, in hours
+AGE_BUCKET_EDGES = [0, 1, 6, 24, 24 * 7, np.inf]
+AGE_BUCKET_LABELS = ['<1h', '1-6h', '6-24h', '1-7d', '>7d']
+
+PURCHASE_COLUMNS = {
+    'Token Name': 'token_name',
+    'Chain ID': 'chain_id',
+    'Full Hash 1': 'pair_id',
+    'Purchase Price': 'purchase_price',
+    'Purchase Amount ($)': 'amount_usd',
+    'Amount of Tokens Purchased': 'tokens',
+    'Purchase Date': 'purchase_date',
+}
+
+
+# Same identity as get_updated_token_price.pair_key, on whole columns: EVM addresses are lowercased
+def pair_keys(chain_ids, pair_ids):
+    pair_ids = pair_ids.fillna('').astype(str)
+    pair_ids = pair_ids.where(~pair_ids.str.startswith('0x'), pair_ids.str.lower())
+    return chain_ids.fillna('').astype(str) + ':' + pair_ids
+
+
+# Local "%Y-%m-%d %H:%M:%S" dates to Unix timestamps. Each date gets the UTC offset in force at
+# that date, as datetime.timestamp() does: an ambiguous date is read as the first of the two
+# (daylight saving) times, like datetime's default fold=0.
+def local_dates_to_timestamps(dates):
+    parsed = pd.to_datetime(dates, format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    localized = parsed.dt.tz_localize(tzlocal(), ambiguous=True, nonexistent='shift_forward')
+    return (localized - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+
+
+def load_purchases(path=DEFAULT_PURCHASES_PATH):
+    frame = pd.DataFrame.from_records(list(iter_purchases(path)))
+    frame = frame.reindex(columns=list(PURCHASE_COLUMNS)).rename(columns=PURCHASE_COLUMNS)
+    for column in ('purchase_price', 'amount_usd', 'tokens'):
+        frame[column] = pd.to_numeric(frame[column], errors='coerce')
+    frame['purchased_at'] = local_dates_to_timestamps(frame['purchase_date'])
+    frame['pair_key'] = pair_keys(frame['chain_id'], frame['pair_id'])
+    return frame
+
+
+def load_history(path=DEFAULT_HISTORY_PATH):
+    frame = pd.read_csv(path, dtype={'chain_id': str, 'pair_id': str})
+    frame['pair_key'] = pair_keys(frame['chain_id'], frame['pair_id'])
+    return frame.dropna(subset=['price_usd'])
+
+
+# Same frames from a columnar store written by columnar_store.py: only the typed columns
+# used here are read, with no JSON or CSV parsing
+def load_purchases_from_store(store):
+    frame = store.to_frame('purchases', ['token_name', 'chain_id', 'pair_id', 'purchase_price', 'amount_usd',
+                                         'tokens', 'purchased_at'])
+    frame['pair_key'] = pair_keys(frame['chain_id'], frame['pair_id'])
+    return frame
+
+
+def load_history_from_store(store):
+    frame = store.to_frame('prices')
+    frame['pair_key'] = pair_keys(frame['chain_id'], frame['pair_id'])
+    return frame.dropna(subset=['price_usd'])
+
+
+# Latest price and liquidity per pair, from price_history.csv or, failing that, purchase_results.json
+def latest_prices(history=None, results_path=None):
+    if history is not None and len(history):
+        latest = history.sort_values('timestamp').drop_duplicates('pair_key', keep='last')
+        return latest.set_index('pair_key')[['price_usd', 'liquidity_usd', 'timestamp']]
+    with open(results_path, 'r') as f:
+        results = pd.DataFrame.from_records(json.load(f))
+    results['pair_key'] = pair_keys(results['Chain ID'], results['Pair ID'])
+    results['timestamp'] = local_dates_to_timestamps(results['Last Updated'])
+    results = results.rename(columns={'Current Price': 'price_usd', 'Liquidity USD': 'liquidity_usd'})
+    return results.drop_duplicates('pair_key', keep='last').set_index('pair_key')[
+        ['price_usd', 'liquidity_usd', 'timestamp']]
+
+
+# Current value, PnL, return and holding age of every purchase that has a current price
+def compute_positions(purchases, prices, now=None):
+    positions = purchases.join(prices, on='pair_key', how='inner')
+    positions = positions[positions['price_usd'].notna() & (positions['amount_usd'] > 0)].copy()
+    now = now if now is not None else datetime.now().timestamp()
+
+    positions['value_usd'] = positions['tokens'] * positions['price_usd']
+    positions['pnl_usd'] = positions['value_usd'] - positions['amount_usd']
+    positions['return'] = positions['pnl_usd'] / positions['amount_usd']
+    positions['hit'] = positions['return'] > 0
+    positions['liquidity_usd'] = positions['liquidity_usd'].fillna(0.0)
+    positions['age_hours'] = (now - positions['purchased_at']) / 3600
+    positions['age_bucket'] = pd.cut(positions['age_hours'], AGE_BUCKET_EDGES, labels=AGE_BUCKET_LABELS, right=False)
+    return positions
+
+
+# Observations of each position's pair made after its purchase, ordered by position then time
+def position_paths(positions, history):
+    path = positions[['pair_key', 'purchased_at', 'purchase_price', 'tokens', 'amount_usd']].reset_index().merge(
+        history[['pair_key', 'timestamp', 'price_usd']], on='pair_key')
+    return path[path['timestamp'] >= path['purchased_at']].sort_values(['index', 'timestamp'])
+
+
+# Deepest fall of each position's price from its running peak; the purchase price is the starting peak
+def position_drawdowns(positions, path):
+    running_peak = np.maximum(path.groupby('index')['price_usd'].cummax(), path['purchase_price'])
+    drawdown = path['price_usd'] / running_peak - 1
+    return drawdown.groupby(path['index']).min().reindex(positions.index).fillna(0.0)
+
+
+# Largest drop of the cumulative portfolio PnL, in dollars and relative to the amount invested.
+# Each observation contributes the change of its position's PnL since the previous observation,
+# so the running sum is the portfolio PnL marked at the latest known prices.
+def portfolio_drawdown(positions, path):
+    if path.empty:
+        return {'max_drawdown_usd': 0.0, 'max_drawdown_pct': 0.0}
+    pnl = path['tokens'] * path['price_usd'] - path['amount_usd']
+    delta = pnl - pnl.groupby(path['index']).shift(fill_value=0.0)
+    order = np.argsort(path['timestamp'].to_numpy(), kind='stable')
+    curve = np.cumsum(delta.to_numpy()[order])
+    drawdown = np.maximum.accumulate(np.maximum(curve, 0.0)) - curve
+    max_drawdown = float(drawdown.max())
+    invested = float(positions['amount_usd'].sum())
+    return {'max_drawdown_usd': max_drawdown, 'max_drawdown_pct': max_drawdown / invested * 100 if invested else 0.0}
+
+
+# Aggregates of a group of positions, as columns of a DataFrame
+def aggregate(positions, by=None):
+    positions = positions.assign(weighted_return=positions['return'] * positions['liquidity_usd'])
+    grouped = positions.groupby(by, observed=True) if by else positions.groupby(lambda _: 'all')
+    table = grouped.agg(
+        positions=('return', 'size'),
+        invested_usd=('amount_usd', 'sum'),
+        value_usd=('value_usd', 'sum'),
+        pnl_usd=('pnl_usd', 'sum'),
+        mean_return_pct=('return', 'mean'),
+        median_return_pct=('return', 'median'),
+        hit_rate_pct=('hit', 'mean'),
+        liquidity_usd=('liquidity_usd', 'sum'),
+        weighted_return=('weighted_return', 'sum'),
+    )
+    table['mean_return_pct'] *= 100
+    table['median_return_pct'] *= 100
+    table['hit_rate_pct'] *= 100
+    table['pnl_pct'] = np.where(table['invested_usd'] > 0, table['pnl_usd'] / table['invested_usd'] * 100, 0.0)
+    table['liquidity_weighted_return_pct'] = np.where(
+        table['liquidity_usd'] > 0, table['weighted_return'] / table['liquidity_usd'] * 100, np.nan)
+    if 'drawdown' in positions:
+        table['worst_drawdown_pct'] = grouped['drawdown'].min() * 100
+    return table.drop(columns=['weighted_return', 'liquidity_usd'])
+
+
+def build_report(purchases, history=None, results_path=None, now=None):
+    prices = latest_prices(history, results_path)
+    positions = compute_positions(purchases, prices, now)
+    if history is not None and len(history):
+        path = position_paths(positions, history)
+        positions['drawdown'] = position_drawdowns(positions, path)
+        portfolio = portfolio_drawdown(positions, path)
+    else:
+        portfolio = {'max_drawdown_usd': None, 'max_drawdown_pct': None}
+
+    report = {
+        'generated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'purchases': int(len(purchases)),
+        'priced_positions': int(len(positions)),
+        'overall': aggregate(positions).iloc[0].to_dict() if len(positions) else {},
+        'portfolio': portfolio,
+        'by_chain': aggregate(positions, 'chain_id'),
+        'by_age_bucket': aggregate(positions, 'age_bucket'),
+    }
+    return report, positions
+
+
+def _json_value(column, value):
+    if pd.isna(value):
+        return None
+    return int(value) if column == 'positions' else float(value)
+
+
+def _records(table):
+    return {str(key): {column: _json_value(column, value) for column, value in row.items()}
+            for key, row in table.iterrows()}
+
+
+def write_report(report, path=DEFAULT_REPORT_PATH):
+    serializable = dict(report)
+    serializable['overall'] = {key: _json_value(key, value) for key, value in report['overall'].items()}
+    serializable['by_chain'] = _records(report['by_chain'])
+    serializable['by_age_bucket'] = _records(report['by_age_bucket'])
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(serializable, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def print_report(report):
+    print(f"{report['priced_positions']} priced positions out of {report['purchases']} purchases")
+    overall = report['overall']
+    if overall:
+        print(f"Invested ${overall['invested_usd']:.2f}, value ${overall['value_usd']:.2f}, "
+              f"PnL ${overall['pnl_usd']:.2f} ({overall['pnl_pct']:+.2f}%), hit rate {overall['hit_rate_pct']:.1f}%")
+    if report['portfolio']['max_drawdown_usd'] is not None:
+        print(f"Max portfolio drawdown ${report['portfolio']['max_drawdown_usd']:.2f} "
+              f"({report['portfolio']['max_drawdown_pct']:.2f}% of invested)")
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 160):
+        print("\nBy chain:")
+        print(report['by_chain'].to_string())
+        print("\nBy holding age:")
+        print(report['by_age_bucket'].to_string())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Portfolio analytics over simulated purchases and tracked prices.')
+    parser.add_argument('--purchases', default=DEFAULT_PURCHASES_PATH)
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH,
+                        help='Price time series written by get_updated_token_price.py --track')
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH,
+                        help='Current prices used when there is no price history')
+    parser.add_argument('--report', default=DEFAULT_REPORT_PATH, help='Machine-readable JSON report')
+    parser.add_argument('--store', default=None,
+                        help='Read purchases and price history from this columnar store (columnar_store.py export)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    start_time = perf_counter()
+    if args.store:
+        store = ColumnarStore(args.store)
+        purchases = load_purchases_from_store(store)
+        history = load_history_from_store(store) if 'prices' in store.datasets() else None
+    else:
+        purchases = load_purchases(args.purchases)
+        history = load_history(args.history) if os.path.exists(args.history) else None
+    report, _ = build_report(purchases, history, args.results)
+    print_report(report)
+    write_report(report, args.report)
+    logging.info(f"Report written to {args.report} in {perf_counter() - start_time:.2f} seconds")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import csv
+import os
+
+# Column order of the append-only price time series
+OBSERVATION_FIELDS = [
+    'timestamp', 'chain_id', 'pair_id', 'price_usd', 'liquidity_usd',
+    'fdv', 'volume_h24', 'buys_h24', 'sells_h24'
+]
+
+NUMERIC_FIELDS = {
+    'timestamp': float, 'price_usd': float, 'liquidity_usd': float, 'fdv': float,
+    'volume_h24': float, 'buys_h24': int, 'sells_h24': int
+}
+
+
+# Convert an API value to a number, treating missing values as empty cells
+def _number(value):
+    if value in (None, '', 'N/A'):
+        return ''
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return ''
+
+
+# Build one observation row from a DexScreener pair object
+def observation_from_pair(pair, timestamp, chain_id=None, pair_id=None):
+    txns_24h = (pair.get('txns') or {}).get('h24') or {}
+    return {
+        'timestamp': round(timestamp, 3),
+        'chain_id': chain_id or pair.get('chainId', ''),
+        'pair_id': pair_id or pair.get('pairAddress', ''),
+        'price_usd': _number(pair.get('priceUsd')),
+        'liquidity_usd': _number((pair.get('liquidity') or {}).get('usd')),
+        'fdv': _number(pair.get('fdv')),
+        'volume_h24': _number((pair.get('volume') or {}).get('h24')),
+        'buys_h24': txns_24h.get('buys', ''),
+        'sells_h24': txns_24h.get('sells', ''),
+    }
+
+
+# Append observations to the CSV time series; the file is never rewritten
+def append_observations(path, observations):
+    if not observations:
+        return 0
+    write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=OBSERVATION_FIELDS)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(observations)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(observations)
+
+
+# Stream observations back with numeric fields converted (empty cells become None)
+def read_observations(path):
+    with open(path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            for field, cast in NUMERIC_FIELDS.items():
+                value = row.get(field, '')
+                row[field] = cast(float(value)) if value not in ('', None) else None
+            yield row
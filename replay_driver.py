@@ -0,0 +1,361 @@
+import hashlib
+import json
+from collections import Counter, defaultdict
+from time import perf_counter, sleep
+
+from lxml import etree
+from selenium.common.exceptions import NoSuchElementException
+
+from hierarchy_snapshot import parse_bounds
+
+# Recording format (JSON Lines):
+#   {"type": "screen", "id": 0, "source": "<hierarchy ...>"}
+#   {"type": "command", "name": "find_elements", "elapsed": 0.081}
+#   {"type": "action", "kind": "click", "screen": 0, "target": "/hierarchy/...", "next": 1, "clipboard": "0x..."}
+# Screens are the distinct page sources seen during the session. Actions (click, tap,
+# back, swipe) link the screen they were performed on to the screen observed next,
+# which lets the replay driver simulate the app whatever calls the capture code makes.
+
+ACTION_KINDS = ('click', 'tap', 'back', 'swipe')
+
+
+def _parse_tree(page_source):
+    if isinstance(page_source, str):
+        page_source = page_source.encode('utf-8')
+    return etree.fromstring(page_source, parser=etree.XMLParser(huge_tree=True)).getroottree()
+
+
+# Deepest node whose bounds contain the point, preferring clickable ones
+def _node_path_at(tree, x, y):
+    best, best_area = None, None
+    for node in tree.iter():
+        if 'bounds' not in node.attrib:
+            continue
+        x1, y1, x2, y2 = parse_bounds(node.attrib['bounds'])
+        if x1 <= x < x2 and y1 <= y < y2:
+            area = (x2 - x1) * (y2 - y1) - (1 if node.attrib.get('clickable') == 'true' else 0)
+            if best_area is None or area <= best_area:
+                best, best_area = node, area
+    return tree.getpath(best) if best is not None else None
+
+
+def _swipe_direction(start_y, end_y):
+    return 'down' if start_y > end_y else 'up'
+
+
+# Element returned by RecordingDriver: forwards to the real element and records timings
+class RecordingElement:
+    def __init__(self, recorder, element, target):
+        self._recorder = recorder
+        self._element = element
+        self._target = target
+
+    def click(self):
+        self._recorder._begin_action('click', self._target)
+        return self._recorder._command('click', self._element.click)
+
+    def get_attribute(self, name):
+        return self._recorder._command('get_attribute', self._element.get_attribute, name)
+
+    @property
+    def rect(self):
+        return self._recorder._command('rect', lambda: self._element.rect)
+
+    @property
+    def location(self):
+        return self._recorder._command('location', lambda: self._element.location)
+
+    @property
+    def size(self):
+        return self._recorder._command('size', lambda: self._element.size)
+
+    @property
+    def text(self):
+        return self._recorder._command('text', lambda: self._element.text)
+
+    def __getattr__(self, name):
+        return getattr(self._element, name)
+
+
+# Wraps a live Appium driver and writes screens, actions, clipboard contents and
+# per-command timings to a recording file. When an action's resulting screen was not
+# observed by the capture code, one extra page_source is fetched to record it.
+class RecordingDriver:
+    def __init__(self, driver, path):
+        self._driver = driver
+        self._file = open(path, 'w', encoding='utf-8')
+        self._screen_ids = {}
+        self._screen = None
+        self._tree = None
+        self._dirty = True
+        self._pending_action = None
+
+    @property
+    def session_id(self):
+        return self._driver.session_id
+
+    def _write(self, event):
+        self._file.write(json.dumps(event) + '\n')
+
+    def _command(self, name, function, *args):
+        start = perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._write({'type': 'command', 'name': name, 'elapsed': round(perf_counter() - start, 6)})
+
+    def _observe(self, page_source):
+        digest = hashlib.sha1(page_source.encode('utf-8')).hexdigest()
+        if digest not in self._screen_ids:
+            self._screen_ids[digest] = len(self._screen_ids)
+            self._write({'type': 'screen', 'id': self._screen_ids[digest], 'source': page_source})
+        self._screen = self._screen_ids[digest]
+        self._tree = _parse_tree(page_source)
+        self._dirty = False
+
+    def _settle(self):
+        if self._dirty:
+            self.page_source
+
+    def _finish_action(self):
+        if self._pending_action is None:
+            return
+        self._settle()
+        self._pending_action['next'] = self._screen
+        self._write(self._pending_action)
+        self._pending_action = None
+
+    def _begin_action(self, kind, target):
+        self._finish_action()
+        self._settle()
+        self._pending_action = {'type': 'action', 'kind': kind, 'screen': self._screen, 'target': target}
+        self._dirty = True
+
+    @property
+    def page_source(self):
+        page_source = self._command('page_source', lambda: self._driver.page_source)
+        self._observe(page_source)
+        return page_source
+
+    # Paths of the nodes of the current screen that the locator matches, in document order, which
+    # is the order the driver returns them in; actions on the returned elements target these paths
+    def _targets(self, by, value):
+        self._settle()
+        if by != 'xpath':
+            return []
+        return [self._tree.getpath(node) for node in self._tree.xpath(value) if isinstance(node, etree._Element)]
+
+    def find_element(self, by, value):
+        targets = self._targets(by, value)
+        element = self._command('find_element', self._driver.find_element, by, value)
+        return RecordingElement(self, element, targets[0] if targets else None)
+
+    def find_elements(self, by, value):
+        targets = self._targets(by, value)
+        elements = self._command('find_elements', self._driver.find_elements, by, value)
+        return [RecordingElement(self, element, targets[index] if index < len(targets) else None)
+                for index, element in enumerate(elements)]
+
+    def get_window_size(self):
+        return self._command('get_window_size', self._driver.get_window_size)
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=0):
+        self._begin_action('swipe', _swipe_direction(start_y, end_y))
+        return self._command('swipe', self._driver.swipe, start_x, start_y, end_x, end_y, duration)
+
+    def tap(self, positions, duration=None):
+        self._settle()
+        x, y = positions[0]
+        self._begin_action('tap', _node_path_at(self._tree, x, y))
+        return self._command('tap', self._driver.tap, positions, duration)
+
+    def back(self):
+        self._begin_action('back', None)
+        return self._command('back', self._driver.back)
+
+    def set_clipboard_text(self, text):
+        return self._command('set_clipboard_text', self._driver.set_clipboard_text, text)
+
+    def get_clipboard_text(self):
+        text = self._command('get_clipboard_text', self._driver.get_clipboard_text)
+        if text and self._pending_action is not None:
+            self._pending_action.setdefault('clipboard', text)
+        return text
+
+    def quit(self):
+        self.close()
+        return self._driver.quit()
+
+    def close(self):
+        if not self._file.closed:
+            self._finish_action()
+            self._file.close()
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+# Element of a replayed screen; attributes come from the recorded page source
+class ReplayElement:
+    def __init__(self, replay, screen, path, attributes):
+        self._replay = replay
+        self._screen = screen
+        self._path = path
+        self._attributes = attributes
+        self.id = f'{screen}:{path}'
+
+    def click(self):
+        self._replay._round_trip('click')
+        self._replay._perform('click', self._path, screen=self._screen)
+
+    def get_attribute(self, name):
+        self._replay._round_trip('get_attribute')
+        return self._attributes.get(name)
+
+    def _rect(self):
+        x1, y1, x2, y2 = parse_bounds(self._attributes.get('bounds'))
+        return {'x': x1, 'y': y1, 'width': x2 - x1, 'height': y2 - y1}
+
+    @property
+    def rect(self):
+        self._replay._round_trip('rect')
+        return self._rect()
+
+    @property
+    def location(self):
+        self._replay._round_trip('location')
+        rect = self._rect()
+        return {'x': rect['x'], 'y': rect['y']}
+
+    @property
+    def size(self):
+        self._replay._round_trip('size')
+        rect = self._rect()
+        return {'width': rect['width'], 'height': rect['height']}
+
+    @property
+    def text(self):
+        self._replay._round_trip('text')
+        return self._attributes.get('text', '')
+
+
+# Drop-in stand-in for the subset of appium.webdriver.Remote used by the capture scripts.
+# Screens and transitions come from a recording; every call counts as one round trip and
+# sleeps for a recorded latency of that command multiplied by latency_scale.
+class ReplayDriver:
+    def __init__(self, path, latency_scale=1.0):
+        self.latency_scale = latency_scale
+        self.screens = {}
+        self.transitions = {}
+        self.latencies = defaultdict(list)
+        initial_screen = None
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                event = json.loads(line)
+                if event['type'] == 'screen':
+                    self.screens[event['id']] = event['source']
+                    if initial_screen is None:
+                        initial_screen = event['id']
+                elif event['type'] == 'command':
+                    self.latencies[event['name']].append(event['elapsed'])
+                elif event['type'] == 'action':
+                    self.transitions.setdefault(
+                        (event['kind'], event['screen'], event.get('target')),
+                        (event['next'], event.get('clipboard'))
+                    )
+        all_latencies = [elapsed for values in self.latencies.values() for elapsed in values]
+        self.default_latency = sum(all_latencies) / len(all_latencies) if all_latencies else 0.0
+        self.initial_screen = initial_screen
+        self.session_id = 'replay'
+        self._trees = {}
+        self._latency_index = Counter()
+        self.reset()
+
+    # Return to the first recorded screen and clear the counters
+    def reset(self):
+        self.screen = self.initial_screen
+        self.clipboard = ''
+        self.round_trips = 0
+        self.command_counts = Counter()
+        self.unknown_transitions = 0
+
+    def _tree(self, screen=None):
+        screen = self.screen if screen is None else screen
+        if screen not in self._trees:
+            self._trees[screen] = _parse_tree(self.screens[screen])
+        return self._trees[screen]
+
+    def _round_trip(self, name):
+        self.round_trips += 1
+        self.command_counts[name] += 1
+        if self.latency_scale:
+            recorded = self.latencies.get(name)
+            if recorded:
+                latency = recorded[self._latency_index[name] % len(recorded)]
+                self._latency_index[name] += 1
+            else:
+                latency = self.default_latency
+            sleep(latency * self.latency_scale)
+
+    def _perform(self, kind, target, screen=None):
+        transition = self.transitions.get((kind, self.screen if screen is None else screen, target))
+        if transition is None:
+            self.unknown_transitions += 1
+            return
+        self.screen, clipboard = transition
+        if clipboard:
+            self.clipboard = clipboard
+
+    def _elements(self, by, value):
+        if by != 'xpath':
+            raise ValueError(f"ReplayDriver only supports XPath locators, got '{by}'")
+        tree = self._tree()
+        return [
+            ReplayElement(self, self.screen, tree.getpath(node), dict(node.attrib))
+            for node in tree.xpath(value) if isinstance(node, etree._Element)
+        ]
+
+    @property
+    def page_source(self):
+        self._round_trip('page_source')
+        return self.screens[self.screen]
+
+    def find_element(self, by, value):
+        self._round_trip('find_element')
+        elements = self._elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No element matches {value}")
+        return elements[0]
+
+    def find_elements(self, by, value):
+        self._round_trip('find_elements')
+        return self._elements(by, value)
+
+    def get_window_size(self):
+        self._round_trip('get_window_size')
+        root = self._tree().getroot()
+        return {'width': int(root.get('width', 1080)), 'height': int(root.get('height', 2187))}
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=0):
+        self._round_trip('swipe')
+        self._perform('swipe', _swipe_direction(start_y, end_y))
+
+    def tap(self, positions, duration=None):
+        self._round_trip('tap')
+        x, y = positions[0]
+        self._perform('tap', _node_path_at(self._tree(), x, y))
+
+    def back(self):
+        self._round_trip('back')
+        self._perform('back', None)
+
+    def set_clipboard_text(self, text):
+        self._round_trip('set_clipboard_text')
+        self.clipboard = text
+
+    def get_clipboard_text(self):
+        self._round_trip('get_clipboard_text')
+        return self.clipboard
+
+    def quit(self):
+        self._round_trip('quit')
@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dedupe_index  # noqa: E402
+from dedupe_index import DedupeIndex  # noqa: E402
+
+
+def test_a_key_is_claimed_once():
+    index = DedupeIndex()
+    assert index.claim('h:a')
+    assert not index.claim('h:a')
+
+
+def test_a_key_whose_alias_was_claimed_is_not_claimed():
+    index = DedupeIndex()
+    assert index.claim('h:a')
+    assert not index.claim('h:b', aliases=('h:a',))
+    assert 'h:b' in index
+
+
+def test_a_released_key_can_be_claimed_again():
+    index = DedupeIndex()
+    assert index.claim('h:a')
+    index.release('h:a')
+    assert index.claim('h:a')
+
+
+def test_a_released_key_can_be_claimed_again_with_a_database(tmp_path):
+    index = DedupeIndex(str(tmp_path / 'claims.sqlite'))
+    assert index.claim('h:a')
+    index.release('h:a')
+    assert index.claim('h:a')
+    index.close()
+
+
+def test_claims_are_shared_through_the_database(tmp_path):
+    first = DedupeIndex(str(tmp_path / 'claims.sqlite'))
+    second = DedupeIndex(str(tmp_path / 'claims.sqlite'))
+    assert first.claim('h:a')
+    assert not second.claim('h:a')
+    first.close()
+    second.close()
+
+
+def test_a_claim_expires_after_the_window(monkeypatch):
+    clock = [1_000.0]
+    monkeypatch.setattr(dedupe_index, 'time', lambda: clock[0])
+    index = DedupeIndex(window=60, bloom_capacity=10)
+    assert index.claim('h:a')
+    clock[0] += 30
+    assert not index.claim('h:a')
+    # The Bloom filter generation holding the key is dropped after two windows
+    for step in range(3):
+        clock[0] += 61
+        index.claim(f'h:other{step}')
+    assert index.claim('h:a')
@@ -0,0 +1,88 @@
+import os
+import sys
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dexscreenerlistener  # noqa: E402
+from dedupe_index import DedupeIndex  # noqa: E402
+from dexscreenerlistener import process_tokens, release_dropped_claims  # noqa: E402
+from drilldown_scheduler import DrillScheduler  # noqa: E402
+
+NOW = 1_700_000_000.0
+
+
+def row(name, liquidity=10_000.0, age='1m', detected_at='2024-05-01 12:00:00', **fields):
+    return {"Token Name": name, "Liquidity USD": liquidity, "Time": age, "Detected At": detected_at, **fields}
+
+
+def node(top):
+    return SimpleNamespace(top=top)
+
+
+def test_deeper_pools_are_drilled_first():
+    scheduler = DrillScheduler()
+    scheduler.push(node(0), row('SHALLOW', liquidity=2_000.0), now=NOW)
+    scheduler.push(node(1), row('DEEP', liquidity=500_000.0), now=NOW)
+    scheduler.push(node(2), row('MIDDLE', liquidity=50_000.0), now=NOW)
+    assert [token_info["Token Name"] for _, token_info in scheduler.next_batch(now=NOW)] == [
+        'DEEP', 'MIDDLE', 'SHALLOW']
+
+
+def test_dust_and_rugging_rows_are_not_queued():
+    scheduler = DrillScheduler()
+    assert not scheduler.push(node(0), row('DUST', liquidity=10.0), now=NOW)
+    assert not scheduler.push(node(1), row('RUG', **{"Change Indicator": '▼', "Change": '80%'}), now=NOW)
+    assert len(scheduler) == 0
+
+
+def test_a_row_that_cannot_be_drilled_before_its_deadline_is_dropped():
+    scheduler = DrillScheduler(max_entry_age=600, drill_seconds=15)
+    scheduler.push(node(0), row('OLD', age='9m'), now=NOW)
+    scheduler.push(node(1), row('NEW', age='1m'), now=NOW)
+    assert [token_info["Token Name"] for _, token_info in scheduler.next_batch(now=NOW + 50)] == ['NEW']
+
+
+def test_the_batch_only_holds_rows_that_fit_in_the_budget():
+    scheduler = DrillScheduler(drill_seconds=10)
+    for index in range(5):
+        scheduler.push(node(index), row(f'T{index}'), now=NOW)
+    assert len(scheduler.next_batch(budget=35, now=NOW)) == 3
+    assert len(scheduler) == 2
+
+
+def test_the_claim_of_an_evicted_row_is_released():
+    seen = DedupeIndex()
+    scheduler = DrillScheduler(max_pending=1, on_drop=release_dropped_claims(seen))
+    for name, liquidity in (('LOW', 2_000.0), ('HIGH', 500_000.0)):
+        seen.claim(f'h:{name}')
+        scheduler.push(node(0), row(name, liquidity=liquidity, **{"Claim Key": f'h:{name}'}), now=NOW)
+    assert 'h:LOW' not in seen
+    assert 'h:HIGH' in seen
+
+
+def test_the_claim_of_a_stale_row_is_kept():
+    seen = DedupeIndex()
+    scheduler = DrillScheduler(max_entry_age=60, on_drop=release_dropped_claims(seen))
+    seen.claim('h:OLD')
+    scheduler.push(node(0), row('OLD', **{"Claim Key": 'h:OLD'}), now=NOW)
+    assert scheduler.next_batch(now=NOW + 120) == []
+    assert 'h:OLD' in seen
+
+
+# Positions of rows deferred from an earlier snapshot are not comparable with the current ones:
+# current rows are drilled by position, then deferred rows newest first after a rewind
+def test_batch_rows_are_sorted_by_position_within_their_snapshot(monkeypatch):
+    drilled = []
+    monkeypatch.setattr(dexscreenerlistener, 'process_token',
+                        lambda driver, token_info, navigator: drilled.append(token_info["Token Name"]) or {})
+    scheduler = DrillScheduler(drill_seconds=10)
+    scheduler.push(node(100), row('OLDER', detected_at='2024-05-01 11:58:00'))
+    scheduler.push(node(900), row('OLD', detected_at='2024-05-01 11:59:00'))
+    current = [(node(500), row('LOW')), (node(50), row('TOP'))]
+
+    navigator = mock.Mock()
+    process_tokens(mock.Mock(), current, navigator=navigator, scheduler=scheduler)
+    assert drilled == ['TOP', 'LOW', 'OLD', 'OLDER']
+    assert navigator.return_to_top.call_count == 2
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import get_updated_token_price  # noqa: E402
+from get_updated_token_price import iter_purchases, pair_key, stream_simulated_purchases  # noqa: E402
+
+PURCHASES = [
+    {"Token Name": f"T{index}", "Chain ID": 'solana', "Full Hash 1": f"Pair{index}",
+     "Project Name": 'a, b ] {c} "d"', "Purchase Amount ($)": 1.0, "Amount of Tokens Purchased": 2.0}
+    for index in range(7)
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 50, 1 << 16])
+def test_a_json_array_is_read_whatever_the_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / 'purchases.json'
+    path.write_text(json.dumps(PURCHASES, indent=4))
+    assert list(iter_purchases(str(path), chunk_size=chunk_size)) == PURCHASES
+
+
+def test_json_lines_are_read_like_a_json_array(tmp_path):
+    array_path, lines_path = tmp_path / 'purchases.json', tmp_path / 'purchases.jsonl'
+    array_path.write_text(json.dumps(PURCHASES))
+    lines_path.write_text('\n'.join(json.dumps(purchase) for purchase in PURCHASES) + '\n\n')
+    assert list(iter_purchases(str(lines_path))) == list(iter_purchases(str(array_path))) == PURCHASES
+
+
+def test_an_unterminated_json_array_is_an_error(tmp_path):
+    path = tmp_path / 'purchases.json'
+    path.write_text(json.dumps(PURCHASES)[:-1])
+    with pytest.raises(ValueError):
+        list(iter_purchases(str(path), chunk_size=16))
+
+
+def fake_fetch(purchases, **kwargs):
+    return {pair_key(purchase['Chain ID'], purchase['Full Hash 1']): {'priceUsd': '1.5'} for purchase in purchases}
+
+
+# An interrupted batch left a partial line after the last saved state: it is cut off and
+# the batch is processed again, so every purchase has exactly one result
+def test_resume_truncates_the_output_back_to_the_saved_offset(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_updated_token_price, 'fetch_pairs_for_purchases', fake_fetch)
+    input_path, output_path = tmp_path / 'purchases.json', tmp_path / 'results.jsonl'
+    input_path.write_text(json.dumps(PURCHASES[:4]))
+    stream_simulated_purchases(str(input_path), str(output_path), batch_size=2)
+    with open(output_path, 'a') as f:
+        f.write('{"Token Name": "T4", "Inp')
+    input_path.write_text(json.dumps(PURCHASES))
+
+    stream_simulated_purchases(str(input_path), str(output_path), batch_size=2, resume=True)
+    results = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [result["Input Index"] for result in results] == list(range(len(PURCHASES)))
+    state = json.loads((tmp_path / 'results.jsonl.state').read_text())
+    assert state['next_index'] == len(PURCHASES)
+    assert state['output_offset'] == output_path.stat().st_size
+
+
+def test_without_resume_the_output_is_written_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_updated_token_price, 'fetch_pairs_for_purchases', fake_fetch)
+    input_path, output_path = tmp_path / 'purchases.json', tmp_path / 'results.jsonl'
+    input_path.write_text(json.dumps(PURCHASES[:3]))
+    stream_simulated_purchases(str(input_path), str(output_path), batch_size=2)
+    stream_simulated_purchases(str(input_path), str(output_path), batch_size=2)
+    assert len(output_path.read_text().splitlines()) == 3
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from token_parsing import parse_price, parse_row  # noqa: E402
+
+
+# "$0.0₄5123" is $0.00005123: the row shows "$0.05123" then the subscript "4"
+def test_subscript_zero_count_is_the_total_number_of_zeros():
+    assert parse_price('$0.05123', '4') == pytest.approx(0.00005123)
+    assert parse_price('$0.08812', '6') == pytest.approx(0.0000008812)
+
+
+def test_price_without_subscript_is_unchanged():
+    assert parse_price('$0.0012') == pytest.approx(0.0012)
+    assert parse_price('$152.30', '') == pytest.approx(152.30)
+
+
+def test_row_price_resolves_the_subscript():
+    row = parse_row('PEPE2, 3m, $0.05123, 4, ▲, 12%, Pepe Two, LIQ, $10.2K, VOL, $1.1K, MCAP, $51K')
+    assert row.zero_count == '4'
+    assert row.price == pytest.approx(0.00005123)
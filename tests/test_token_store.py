@@ -0,0 +1,81 @@
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from token_identity import listing_identities, token_key  # noqa: E402
+from token_store import SCHEMA_VERSION, TokenStore  # noqa: E402
+
+
+def api_record(name, chain_id, pair_address, created='2024-05-01 12:00:00'):
+    return {"Token Name": name, "Chain ID": chain_id, "Full Hash 1": pair_address,
+            "Pair Created At": created, "Analyzed Date": '2024-05-01 12:00:30', "Time": '30s'}
+
+
+def device_row(name, analyzed='2024-05-01 12:00:40', age='40s'):
+    return {"Token Name": name, "Analyzed Date": analyzed, "Time": age}
+
+
+EVM_PAIR = '0x' + 'ab' * 20
+SOLANA_PAIR = '7' * 44
+
+
+# A device row (chain unknown) stands for one listing: the first API record matching it is the
+# same token, a same-name token listed at the same time on another chain is a different one
+def test_same_name_tokens_on_two_chains_are_both_stored(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.sqlite'))
+    assert store.append([device_row('FOO')])
+    assert store.append([api_record('FOO', 'ethereum', EVM_PAIR)]) == []
+    assert store.append([api_record('FOO', 'solana', SOLANA_PAIR)])
+    assert [token.get('Chain ID') for token in store.iter_tokens()] == [None, 'solana']
+    store.close()
+
+
+def test_a_token_already_stored_is_not_stored_again(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.sqlite'))
+    assert store.append([api_record('FOO', 'ethereum', EVM_PAIR)])
+    assert store.append([api_record('FOO', 'ethereum', EVM_PAIR.upper().replace('0X', '0x'))]) == []
+    assert len(store) == 1
+    store.close()
+
+
+def test_tokens_of_a_legacy_store_get_their_keys_recomputed(tmp_path):
+    path = str(tmp_path / 'tokens.sqlite')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE tokens (id INTEGER PRIMARY KEY AUTOINCREMENT, token_key TEXT NOT NULL, '
+               'token_name TEXT, analyzed_date TEXT, data TEXT NOT NULL)')
+    token = api_record('FOO', 'ethereum', EVM_PAIR)
+    db.execute('INSERT INTO tokens (token_key, token_name, analyzed_date, data) VALUES (?, ?, ?, ?)',
+               ('FOO', 'FOO', token['Analyzed Date'], json.dumps(token)))
+    db.commit()
+    db.close()
+
+    store = TokenStore(path)
+    assert store.db.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    assert store.db.execute('SELECT token_key, listing_key, listing_chain FROM tokens').fetchone() == (
+        token_key(token), listing_identities(token)[0], 'ethereum')
+    assert store.append([token]) == []
+    store.close()
+
+
+def test_a_listing_found_by_the_device_is_not_stored_again_from_the_api(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.sqlite'))
+    assert store.append([device_row('FOO')])
+    assert store.append([api_record('FOO', 'ethereum', EVM_PAIR)]) == []
+    store.close()
+
+
+def test_a_listing_found_by_the_api_is_not_stored_again_from_the_device(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.sqlite'))
+    assert store.append([api_record('FOO', 'ethereum', EVM_PAIR)])
+    assert store.append([device_row('FOO', analyzed='2024-05-01 15:20:00', age='3h')]) == []
+    store.close()
+
+
+def test_a_listing_at_another_time_is_stored_from_the_other_path(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.sqlite'))
+    assert store.append([device_row('FOO')])
+    assert store.append([api_record('FOO', 'ethereum', EVM_PAIR, created='2024-05-01 14:00:00')])
+    store.close()
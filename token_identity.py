@@ -0,0 +1,155 @@
+import hashlib
+import re
+from datetime import datetime
+from time import time
+
+from address_extraction import FULL_ADDRESS_PATTERN
+
+# Age shown in the token list: "45s", "3m", "2h", "1d", "3mo", "1y"
+AGE_PATTERN = re.compile(r'^\s*(\d+)\s*(mo|[smhdy])\s*$', re.IGNORECASE)
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3_600, 'd': 86_400, 'mo': 2_592_000, 'y': 31_536_000}
+
+# Width of the creation-time buckets used by content identities. The age is only shown
+# to the minute, so neighbouring buckets are also checked through the aliases.
+CREATION_BUCKET_SECONDS = 600
+
+# Units of AGE_UNITS from the finest to the coarsest
+AGE_UNIT_ORDER = ('s', 'm', 'h', 'd', 'mo', 'y')
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Fields holding the time a row was read, in order of preference
+OBSERVED_AT_FIELDS = ("Analyzed Date", "Detected At")
+
+
+# Convert a displayed age to seconds, or None if it cannot be parsed
+def parse_age(text):
+    match = AGE_PATTERN.match(text or '')
+    if match is None:
+        return None
+    return int(match.group(1)) * AGE_UNITS[match.group(2).lower()]
+
+
+# Unit of a displayed age ('s', 'm', 'h', ...), or None if it cannot be parsed
+def age_unit(text):
+    match = AGE_PATTERN.match(text or '')
+    return None if match is None else match.group(2).lower()
+
+
+# Time at which the row was read, as a Unix timestamp
+def observed_at(token, default=None):
+    for field in OBSERVED_AT_FIELDS:
+        value = token.get(field)
+        if value:
+            try:
+                return datetime.strptime(value, DATE_FORMAT).timestamp()
+            except ValueError:
+                continue
+    return time() if default is None else default
+
+
+# Estimated creation time of the pair: time the row was read minus its displayed age
+def creation_time(token, now=None):
+    age = parse_age(token.get("Time"))
+    if age is None:
+        return None
+    return observed_at(token, now) - age
+
+
+# Identity of a known pair; EVM addresses are case-insensitive
+def pair_identity(chain_id, pair_address):
+    if pair_address.startswith('0x'):
+        pair_address = pair_address.lower()
+    return f"{chain_id}:{pair_address}"
+
+
+def content_identity(token_name, chain_id, bucket):
+    content = '\x1f'.join((token_name or '', chain_id or '', '' if bucket is None else str(bucket)))
+    return 'h:' + hashlib.blake2b(content.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def _pair_address(token):
+    address = token.get("Full Hash 1") or ''
+    return address if FULL_ADDRESS_PATTERN.fullmatch(address) else None
+
+
+# Bucket width for an age shown in `unit`. An age shown as "3h" is anywhere from 3h to 4h, so the
+# creation time estimated from it drifts by up to an hour between polls: buckets are as wide as
+# the unit, and never narrower than CREATION_BUCKET_SECONDS.
+def _bucket_width(unit):
+    return max(CREATION_BUCKET_SECONDS, AGE_UNITS[unit])
+
+
+# Buckets of `width` seconds holding the times from start to end; the bucket is tagged with its
+# width unless it has the default one, so that keys computed at the default width do not change
+def _buckets(width, start, end):
+    return [bucket if width == CREATION_BUCKET_SECONDS else f"{width}:{bucket}"
+            for bucket in range(int(start // width), int(end // width) + 1)]
+
+
+# Creation-time buckets of a row read from the Newest list, as (bucket, alias buckets).
+# An estimate from an age shown in `unit` lies between the creation time and one unit later,
+# so estimates of the same token fall into the same or a neighbouring bucket. Once the age moves
+# to the next unit ("59m" then "1h"), the buckets of the finer unit the earlier estimates fell
+# into are aliases too. Returns (None, ()) when the age cannot be parsed.
+def _displayed_buckets(token, now=None):
+    created = creation_time(token, now)
+    if created is None:
+        return None, ()
+    unit = age_unit(token.get("Time"))
+    width = _bucket_width(unit)
+    bucket = int(created // width)
+    aliases = _buckets(width, (bucket - 1) * width, (bucket + 1) * width)
+    key = aliases.pop(1)
+    finer = AGE_UNIT_ORDER.index(unit) - 1
+    if finer >= 0 and _bucket_width(AGE_UNIT_ORDER[finer]) < width:
+        finer_unit = AGE_UNIT_ORDER[finer]
+        aliases += _buckets(_bucket_width(finer_unit), created - AGE_UNITS[unit], created + AGE_UNITS[finer_unit])
+    return key, aliases
+
+
+# Creation-time buckets of a listing whose creation time is known exactly, as (bucket, alias
+# buckets): the default-width bucket, with the buckets of every width that a row read from the
+# Newest list can estimate for it as aliases
+def _exact_buckets(created):
+    bucket = int(created // CREATION_BUCKET_SECONDS)
+    aliases = [bucket - 1, bucket + 1]
+    for width in sorted({_bucket_width(unit) for unit in AGE_UNIT_ORDER} - {CREATION_BUCKET_SECONDS}):
+        aliases += _buckets(width, created, created + width)
+    return bucket, aliases
+
+
+# Stable identity of a token: chain + pair address once the detail page has been read,
+# otherwise a hash of name, chain and creation-time bucket. Two tickers with the same
+# name on different chains, or listed at different times, get different identities.
+# Returns (key, aliases); aliases are the identities the same token has when its estimated
+# creation time falls into a neighbouring bucket.
+def token_identities(token, now=None):
+    chain_id = token.get("Chain ID") or ''
+    pair_address = _pair_address(token)
+    if chain_id and pair_address:
+        return pair_identity(chain_id, pair_address), ()
+    name = token.get("Token Name")
+    bucket, aliases = _displayed_buckets(token, now)
+    return content_identity(name, chain_id, bucket), tuple(content_identity(name, chain_id, alias)
+                                                           for alias in aliases)
+
+
+# Identity the Newest list gives a token, whichever path found it: name and creation-time bucket,
+# without the chain the list does not show. A device row and an API record of the same listing
+# share it. The bucket comes from the API creation time when known, else from the displayed age.
+# Returns (key, aliases), or (None, ()) when the creation time is unknown.
+def listing_identities(token, now=None):
+    created = token.get("Pair Created At")
+    if created:
+        bucket, aliases = _exact_buckets(datetime.strptime(created, DATE_FORMAT).timestamp())
+    else:
+        bucket, aliases = _displayed_buckets(token, now)
+    if bucket is None:
+        return None, ()
+    name = token.get("Token Name")
+    return content_identity(name, '', bucket), tuple(content_identity(name, '', alias) for alias in aliases)
+
+
+def token_key(token, now=None):
+    return token_identities(token, now)[0]
@@ -0,0 +1,119 @@
+import re
+from functools import lru_cache
+
+# Separator between the fields of a row's content-desc
+FIELD_SEPARATOR = ', '
+
+# Fields the app inserts that carry no information
+JUNK_FIELDS = frozenset(['', ' ', '?', ' ?', '? '])
+
+# "$12.3K", "1,234", "<$1", "$0.0"
+AMOUNT_PATTERN = re.compile(r'^(<)?\s*\$?\s*([0-9][0-9,]*(?:\.[0-9]*)?|\.[0-9]+)\s*([KMBT]?)', re.IGNORECASE)
+ZERO_COUNT_PATTERN = re.compile(r'^[0-9]+$')
+
+MULTIPLIERS = {'': 1, 'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000, 'T': 1_000_000_000_000}
+
+
+# Convert a displayed amount such as "$12.3K" to a float.
+# Values shown as "<$1" (below the display threshold) and unparsable values give 0.0.
+# Rows repeat from one poll to the next, so results are memoized.
+@lru_cache(maxsize=8192)
+def parse_amount(text):
+    if not text:
+        return 0.0
+    match = AMOUNT_PATTERN.match(text.strip())
+    if match is None or match.group(1):
+        return 0.0
+    return float(match.group(2).replace(',', '')) * MULTIPLIERS[match.group(3).upper()]
+
+
+# Convert the displayed price to a float, resolving the subscript-zero notation.
+# DexScreener shows $0.00005123 as "$0.0₄5123": the subscript is the total number of zeros
+# after the decimal point. The app exposes it as "$0.05123" followed by a "4" field, so the
+# text already holds one of the zeros. Returns None when the price cannot be parsed.
+@lru_cache(maxsize=8192)
+def parse_price(price_text, zero_count_text=''):
+    if not price_text:
+        return None
+    match = AMOUNT_PATTERN.match(price_text.strip())
+    if match is None or match.group(1):
+        return None
+    price = float(match.group(2).replace(',', '')) * MULTIPLIERS[match.group(3).upper()]
+    if zero_count_text and ZERO_COUNT_PATTERN.match(zero_count_text):
+        price *= 10.0 ** (1 - int(zero_count_text))
+    return price
+
+
+# One parsed row of the token list, with the numeric fields already resolved
+class TokenRow:
+    __slots__ = (
+        'raw', 'name', 'age', 'price_text', 'zero_count', 'change_indicator', 'change', 'project_name',
+        'liquidity_text', 'volume_text', 'market_cap_text', 'price', 'liquidity', 'volume', 'market_cap'
+    )
+
+    # Legacy record layout used by the JSON/SQLite outputs, plus the resolved numeric values
+    def to_dict(self):
+        return {
+            "Token Name": self.name,
+            "Time": self.age,
+            "Price": self.price_text,
+            "Additional Value": self.zero_count,
+            "Change Indicator": self.change_indicator,
+            "Change": self.change,
+            "Project Name": self.project_name,
+            "Liquidity": self.liquidity_text,
+            "Volume": self.volume_text,
+            "Market Cap": self.market_cap_text,
+            "Price USD": self.price,
+            "Liquidity USD": self.liquidity,
+            "Volume USD": self.volume,
+            "Market Cap USD": self.market_cap,
+        }
+
+    def __repr__(self):
+        return (f"TokenRow(name={self.name!r}, price={self.price!r}, liquidity={self.liquidity!r}, "
+                f"volume={self.volume!r}, market_cap={self.market_cap!r})")
+
+
+# Parse one content-desc in a single walk over its fields
+def parse_row(content_desc):
+    fields = [field for field in content_desc.split(FIELD_SEPARATOR) if field not in JUNK_FIELDS]
+    count = len(fields)
+
+    row = TokenRow.__new__(TokenRow)
+    row.raw = content_desc
+    row.name = fields[0] if count > 0 else "N/A"
+    row.age = fields[1] if count > 1 else "N/A"
+    row.price_text = fields[2] if count > 2 else "N/A"
+
+    index = 3
+    if count > index and fields[index].isdigit():
+        row.zero_count = fields[index]
+        index += 1
+    else:
+        row.zero_count = ""
+    row.change_indicator = fields[index] if count > index else ""
+    row.change = fields[index + 1] if count > index + 1 else ""
+    row.project_name = fields[index + 2] if count > index + 2 else ""
+
+    # Key/value tail: LIQ, <value>, VOL, <value>, MCAP, <value>
+    metrics = {}
+    for index in range(index + 3, count - 1, 2):
+        metrics[fields[index]] = fields[index + 1]
+    row.liquidity_text = metrics.get('LIQ', "")
+    row.volume_text = metrics.get('VOL', "")
+    row.market_cap_text = metrics.get('MCAP', "")
+
+    row.price = parse_price(row.price_text, row.zero_count)
+    row.liquidity = parse_amount(row.liquidity_text)
+    row.volume = parse_amount(row.volume_text)
+    row.market_cap = parse_amount(row.market_cap_text)
+    return row
+
+
+# Parse a whole screen of rows; rows below min_liquidity are dropped when it is given
+def parse_rows(content_descs, min_liquidity=None):
+    rows = [parse_row(content_desc) for content_desc in content_descs]
+    if min_liquidity is not None:
+        rows = [row for row in rows if row.liquidity >= min_liquidity]
+    return rows
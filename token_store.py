@@ -0,0 +1,182 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from token_identity import DATE_FORMAT, listing_identities, token_key
+
+DEFAULT_DB_PATH = 'tokens_data.sqlite'
+LEGACY_JSON_PATH = 'tokens_data.json'
+
+# Bumped when the way token_key or listing_key is computed changes; stored keys are then recomputed
+SCHEMA_VERSION = 4
+
+
+# Append-only SQLite store for tokens detected by get_newest_tokens.py and api_discovery.py.
+# WAL mode keeps each detection a small append, and the unique index on
+# token_key rejects tokens that are already stored.
+#
+# Device rows are keyed on name, chain and creation time, API records on chain and pair, so the
+# same listing found both ways gets two different keys. Every row also stores its listing_key
+# (token_identity.listing_identities) and its listing_chain, and a token is rejected when a row
+# from the other path already holds the same listing on the same chain, whichever process stored
+# it. The Newest list does not show the chain, so a row whose chain is unknown matches any chain,
+# once: it then takes the chain of the row it matched, and a same-name token listed at the same
+# time on another chain is still stored.
+class TokenStore:
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS tokens ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'token_key TEXT NOT NULL, '
+            'token_name TEXT, '
+            'analyzed_date TEXT, '
+            'data TEXT NOT NULL, '
+            'listing_key TEXT, '
+            'listing_chain TEXT)'
+        )
+        columns = {row[1] for row in self.db.execute('PRAGMA table_info(tokens)')}
+        for column in ('listing_key', 'listing_chain'):
+            if column not in columns:
+                self.db.execute(f'ALTER TABLE tokens ADD COLUMN {column} TEXT')
+        self.db.execute('CREATE UNIQUE INDEX IF NOT EXISTS tokens_token_key ON tokens (token_key)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS tokens_listing_key ON tokens (listing_key)')
+        self.db.commit()
+        self._migrate()
+
+    # Version 0 stores keyed tokens by name only, and stores before version 4 bucketed ages shown
+    # in hours or more at 10 minutes: recompute the keys from the stored rows.
+    # Rows whose new key collides with an earlier one keep their old key.
+    # Version 1 stores have no listing_key and version 2 stores no listing_chain: compute them
+    # from the stored rows.
+    def _migrate(self):
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        with self.db:
+            rows = self.db.execute('SELECT id, data FROM tokens ORDER BY id').fetchall()
+            for row_id, data in rows:
+                token = json.loads(data)
+                if version < 4:
+                    self.db.execute('UPDATE OR IGNORE tokens SET token_key = ? WHERE id = ?', (token_key(token), row_id))
+                self.db.execute('UPDATE tokens SET listing_key = ?, listing_chain = ? WHERE id = ?',
+                                (listing_identities(token)[0], token.get('Chain ID') or None, row_id))
+            self.db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        if rows:
+            logging.info(f"Recomputed the identity of {len(rows)} stored tokens")
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM tokens').fetchone()[0]
+
+    # Keys of the tokens analyzed during the last `window` seconds, oldest first
+    def recent_keys(self, window):
+        since = (datetime.now() - timedelta(seconds=window)).strftime(DATE_FORMAT)
+        return [row[0] for row in self.db.execute(
+            'SELECT token_key FROM tokens WHERE analyzed_date >= ? ORDER BY id', (since,)
+        )]
+
+    # Row found by the other discovery path (device rows have content keys, API records pair keys)
+    # that already holds one of these listing identities on `chain_id`, as (id, listing_chain),
+    # or None. An unknown chain on either side matches any chain; rows with a known chain are
+    # preferred.
+    def _listed_by_other_path(self, token_key_value, listing_keys, chain_id):
+        placeholders = ', '.join('?' * len(listing_keys))
+        return self.db.execute(
+            f"SELECT id, listing_chain FROM tokens WHERE listing_key IN ({placeholders}) "
+            f"AND (substr(token_key, 1, 2) = 'h:') != ? "
+            f"AND (? IS NULL OR listing_chain IS NULL OR listing_chain = ?) "
+            f"ORDER BY listing_chain IS NULL LIMIT 1",
+            (*listing_keys, token_key_value.startswith('h:'), chain_id, chain_id)
+        ).fetchone()
+
+    # Insert new tokens in one transaction; tokens whose key is already stored, or whose listing
+    # was already stored by the other discovery path, are ignored.
+    # Returns the tokens that were actually inserted.
+    def append(self, tokens, key=token_key):
+        inserted = []
+        with self.db:
+            for token in tokens:
+                token_key_value = key(token)
+                listing_key, listing_aliases = listing_identities(token)
+                chain_id = token.get('Chain ID') or None
+                if listing_key is not None:
+                    listed = self._listed_by_other_path(token_key_value, (listing_key, *listing_aliases), chain_id)
+                    if listed is not None:
+                        row_id, listed_chain = listed
+                        if listed_chain is None and chain_id is not None:
+                            self.db.execute('UPDATE tokens SET listing_chain = ? WHERE id = ?', (chain_id, row_id))
+                        continue
+                cursor = self.db.execute(
+                    'INSERT OR IGNORE INTO tokens (token_key, token_name, analyzed_date, data, listing_key, '
+                    'listing_chain) VALUES (?, ?, ?, ?, ?, ?)',
+                    (token_key_value, token.get('Token Name'), token.get('Analyzed Date'), json.dumps(token),
+                     listing_key, chain_id)
+                )
+                if cursor.rowcount:
+                    inserted.append(token)
+        return inserted
+
+    # Stored tokens in insertion order
+    def iter_tokens(self):
+        for (data,) in self.db.execute('SELECT data FROM tokens ORDER BY id'):
+            yield json.loads(data)
+
+    # Import a legacy tokens_data.json array
+    def import_json(self, path=LEGACY_JSON_PATH):
+        with open(path, 'r') as f:
+            tokens = json.load(f)
+        return len(self.append(tokens))
+
+    # Write every stored token to a legacy-format JSON array
+    def export_json(self, path=LEGACY_JSON_PATH):
+        tokens = list(self.iter_tokens())
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(tokens, f, indent=4)
+        os.replace(tmp_path, path)
+        return len(tokens)
+
+    def close(self):
+        self.db.close()
+
+
+# Open the store, importing the legacy JSON file the first time the database is created
+def open_token_store(path=DEFAULT_DB_PATH, legacy_json_path=LEGACY_JSON_PATH):
+    store = TokenStore(path)
+    if len(store) == 0 and legacy_json_path and os.path.exists(legacy_json_path):
+        try:
+            imported = store.import_json(legacy_json_path)
+            logging.info(f"Imported {imported} tokens from legacy file {legacy_json_path}")
+        except (json.JSONDecodeError, KeyError) as e:
+            logging.warning(f"Could not import legacy file {legacy_json_path}: {e}")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the token store written by get_newest_tokens.py.')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite token store path')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Export the store to a legacy JSON array')
+    export_parser.add_argument('path', nargs='?', default=LEGACY_JSON_PATH)
+    import_parser = subparsers.add_parser('import', help='Import a legacy JSON array into the store')
+    import_parser.add_argument('path', nargs='?', default=LEGACY_JSON_PATH)
+    args = parser.parse_args()
+
+    store = TokenStore(args.db)
+    try:
+        if args.command == 'export':
+            print(f"Exported {store.export_json(args.path)} tokens to {args.path}")
+        else:
+            print(f"Imported {store.import_json(args.path)} new tokens from {args.path}")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import logging
+from collections import defaultdict
+from time import time
+
+from appium.webdriver.common.appiumby import AppiumBy
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Per-step timeouts, in seconds
+STEP_TIMEOUTS = {
+    'app_ready': 20,
+    'detail_page': 10,
+    'list_after_back': 8,
+    'pair_section': 5,
+    'scroll_settle': 3,
+    'clipboard': 3,
+}
+
+POLL_FREQUENCY = 0.2
+
+# Seconds actually spent in each wait, by step name
+wait_timings = defaultdict(list)
+
+
+# Wait until condition(driver) returns a truthy value or the step timeout expires.
+# Returns the condition's value, or None on timeout. Every wait is logged and timed.
+def wait_for(driver, condition, step, timeout=None):
+    timeout = STEP_TIMEOUTS.get(step, 5) if timeout is None else timeout
+    start = time()
+    try:
+        result = WebDriverWait(
+            driver, timeout, poll_frequency=POLL_FREQUENCY,
+            ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+        ).until(condition)
+    except TimeoutException:
+        result = None
+    elapsed = time() - start
+    wait_timings[step].append(elapsed)
+    if result is None:
+        logging.warning(f"Wait '{step}' timed out after {elapsed:.2f}s")
+    else:
+        logging.info(f"Wait '{step}' ready after {elapsed:.2f}s")
+    return result
+
+
+# Condition: a TextView with one of the given texts is on screen
+def text_view_present(*texts):
+    predicate = ' or '.join(f'@text="{text}"' for text in texts)
+
+    def condition(driver):
+        return driver.find_elements(AppiumBy.XPATH, f'//android.widget.TextView[{predicate}]')
+    return condition
+
+
+# Condition: the token list is rendered (at least one row exposing a liquidity field)
+def token_list_present(driver):
+    return driver.find_elements(AppiumBy.XPATH, '//android.view.ViewGroup[contains(@content-desc, "LIQ")]')
+
+
+# Condition: the page source differs from a previous one (e.g. a scroll moved the list).
+# Returns the new page source so that callers can reuse it.
+def page_source_changed(previous_source):
+    def condition(driver):
+        page_source = driver.page_source
+        return page_source if page_source != previous_source else None
+    return condition
+
+
+# Condition: the clipboard holds non-empty text; returns that text
+def clipboard_not_empty(driver):
+    return driver.get_clipboard_text() or None
+
+
+# Log the count, mean and max duration of each wait step
+def log_wait_summary():
+    for step, durations in sorted(wait_timings.items()):
+        logging.info(
+            f"Wait '{step}': {len(durations)} waits, mean {sum(durations) / len(durations):.2f}s, "
+            f"max {max(durations):.2f}s, total {sum(durations):.2f}s"
+        )